@@ -0,0 +1,124 @@
+import re
+
+from hash_table import ChainingHashTable
+
+
+# Long forms mapped to the abbreviation used as the canonical token
+_ABBREVIATIONS = {
+    'north': 'n',
+    'south': 's',
+    'east': 'e',
+    'west': 'w',
+    'street': 'st',
+    'avenue': 'ave',
+    'boulevard': 'blvd',
+    'road': 'rd',
+    'drive': 'dr',
+    'lane': 'ln',
+    'parkway': 'pkwy',
+}
+
+# Tokens that start a unit designator ("#104", "Apt 3", "Suite 200", "Ste200"); the words must be whole
+# tokens, optionally followed by a number, so street names like "Sterling" or "United" are kept
+_UNIT_TOKEN = re.compile(r'#|(?:apt|suite|ste|unit)(?:\d\w*)?$')
+
+
+class UnknownAddressError(KeyError):
+    """Raised when an address does not match any location in the address file."""
+
+
+def normalize_address(address):
+    """
+    Build the lookup key for an address.
+    Lower-cases, collapses whitespace, drops punctuation and replaces
+    directional/street-type words with their abbreviations, so
+    "5100 South 2700 West" and "5100 S 2700 W" share a key.
+
+    Args:
+        address (str): Address as written in a CSV file
+
+    Returns:
+        str: Normalized address key
+    """
+    tokens = address.lower().replace('.', ' ').replace(',', ' ').split()
+    return ' '.join(_ABBREVIATIONS.get(token, token) for token in tokens)
+
+
+def _strip_unit(key):
+    """Remove a trailing unit designator from a normalized address key."""
+    tokens = key.split(' ')
+    for i, token in enumerate(tokens):
+        if i > 0 and _UNIT_TOKEN.match(token):
+            return ' '.join(tokens[:i])
+    return key
+
+
+class AddressIndex:
+    """
+    Address -> location ID index built once when the address file is loaded.
+    Keys are normalized addresses, so lookups are a single hash probe
+    instead of a scan over every address.
+    """
+
+    def __init__(self, addresses):
+        """
+        Build the index for the given addresses.
+
+        Args:
+            addresses (list): Addresses where list index corresponds to location ID
+        """
+        self.addresses = list(addresses)
+        self._exact = ChainingHashTable(initial_capacity=max(40, len(self.addresses) * 2))
+        self._without_unit = ChainingHashTable(initial_capacity=max(40, len(self.addresses) * 2))
+
+        for location_id, address in enumerate(self.addresses):
+            key = normalize_address(address)
+            # First occurrence wins if two rows normalize to the same key
+            if key not in self._exact:
+                self._exact.insert(key, location_id)
+            short_key = _strip_unit(key)
+            if short_key not in self._without_unit:
+                self._without_unit.insert(short_key, location_id)
+
+    def find(self, address):
+        """
+        Get the location ID for an address.
+
+        Args:
+            address (str): Address to find
+
+        Returns:
+            int: Location ID, or None if the address is unknown
+        """
+        key = normalize_address(address)
+        location_id = self._exact.lookup(key)
+        if location_id is None:
+            location_id = self._without_unit.lookup(_strip_unit(key))
+        return location_id
+
+    def resolve(self, address):
+        """
+        Get the location ID for an address, failing loudly when it is unknown.
+
+        Args:
+            address (str): Address to find
+
+        Returns:
+            int: Location ID
+
+        Raises:
+            UnknownAddressError: If the address does not match any location
+        """
+        location_id = self.find(address)
+        if location_id is None:
+            raise UnknownAddressError(address)
+        return location_id
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def __getitem__(self, location_id):
+        return self.addresses[location_id]
+
+    def __iter__(self):
+        return iter(self.addresses)
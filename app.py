@@ -1,254 +1,295 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import csv
 import datetime
+import functools
+import math
 import os
+import shutil
+import threading
+import time
+import uuid
+from address_index import AddressIndex, UnknownAddressError
+from assignment import assign_packages
+from constraints import NONE, SAMPLE_ADDRESS_CORRECTIONS, compile_constraints
 from hash_table import ChainingHashTable
+from jobs import JobQueue
+from live_stream import MAX_SPEED, MIN_TICK, ReplayHub
+from metrics import PHASE_SECONDS, registry
+from package_index import MAX_PAGE_SIZE, QueryError
+from package_loader import stream_package_data
+from package_store import PackageStore, parse_deadline_minutes
+from plan_snapshot import PlanSnapshot
+from rerouting import RouteChange, RouteChangeConflict, RouteChangeError, apply_change
+from routing import NEAREST_NEIGHBOR, ROUTING_MODES
+from response_cache import ResponseCache
+from response_encoding import choose_encoding, compress, dumps
+from shortest_paths import expand_legs, load_shortest_paths
+from simulation import simulate_day
+from timeline import STATUS_NAMES, build_timeline
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for React frontend
+CORS(app, expose_headers=['ETag', 'X-Plan-Version'])  # Enable CORS for React frontend
 
-# Global variables to store data
-package_hash_table = None
-distance_matrix = None
-address_list = None
-trucks = []
+# The three CSV files, by upload form field
+DATA_FILES = {
+    'packages': 'WGUPS_Package_File.csv',
+    'distances': 'WGUPS_Distance_Table.csv',
+    'addresses': 'WGUPS_Address_File.csv',
+}
+UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
+SAMPLE_PACKAGE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), DATA_FILES['packages'])
+UPLOADS_KEPT = 5  # Upload directories kept before the oldest is deleted
+HUB_LOCATION = 0  # Location ID every truck starts from, the first row of the address file
+app.config['MAX_CONTENT_LENGTH'] = 512 * 1024 * 1024
+app.config['DATA_FILES'] = DATA_FILES  # The files /api/initialize reloads; create_app can point elsewhere
+app.config['FLEET'] = {'truck_count': 3, 'capacity': 16, 'driver_count': 2}  # Trucks every plan is built for
+app.config['PLAN_READ_ONLY'] = False  # Set when several worker processes each serve their own copy of the plan
 
-def load_package_data(filename, hash_table):
-    """Load package data from CSV file into the hash table."""
-    with open(filename, 'r') as csvfile:
-        reader = csv.reader(csvfile)
-        next(reader)  # Skip header row
-        for row in reader:
-            package_id = int(row[0])
-            package_data = [
-                row[1],  # address
-                row[5],  # deadline
-                row[2],  # city
-                row[4],  # zip
-                row[6],  # weight
-                "At the hub",  # initial status
-                None,  # departure_time
-                None   # delivery_time
-            ]
-            hash_table.insert(package_id, package_data)
+# The plan being served. Replaced as a whole by install_plan; each request reads it once
+# through current() and uses only that snapshot, so it never needs a lock.
+current_plan = None
+plan_lock = threading.RLock()  # Held while a plan is derived from the current one and installed
+status_cache = ResponseCache()
+jobs = JobQueue()  # Loading and routing run here, off the request path
+replays = ReplayHub()  # Live status streams, one shared clock per plan and replay settings
+
+# Exported by /api/metrics with the loading, routing and snapshot timings recorded by the other modules
+REQUEST_SECONDS = registry.histogram('wgups_request_seconds', "Seconds from request start until the response is "
+                                     "returned", ('endpoint', 'method', 'status'))
+INITIALIZE_FAILURES = registry.counter('wgups_initialize_failures_total', "Plans that failed to build at startup")
+registry.gauge('wgups_plan_version', "Version of the plan being served (0 before one is installed)",
+               lambda: current_plan.version if current_plan is not None else 0)
+registry.gauge('wgups_packages', "Packages in the plan being served",
+               lambda: len(current_plan.package_store) if current_plan is not None else 0)
+registry.gauge('wgups_status_cache_hits', "Hits in the /api/packages/status response cache", lambda: status_cache.hits)
+registry.gauge('wgups_status_cache_misses', "Misses in the /api/packages/status response cache",
+               lambda: status_cache.misses)
+registry.gauge('wgups_stream_clients', "Connected live status stream clients", lambda: replays.stats()['clients'])
+
+def load_package_data(filename, package_store, address_index, progress=None):
+    """Stream package data into the package store in validated chunks. Returns the LoadReport."""
+    return stream_package_data(filename, package_store, address_index, progress=progress, progress_every=10000)
 
 def load_distance_data(filename):
-    """Load distance data from CSV file into a 2D matrix."""
-    distance_matrix = []
-    with open(filename, 'r') as csvfile:
-        reader = csv.reader(csvfile)
-        for row in reader:
-            distance_row = []
-            for distance in row:
-                if distance.strip():
-                    distance_row.append(float(distance))
-                else:
-                    distance_row.append(0.0)
-            distance_matrix.append(distance_row)
-    return distance_matrix
+    """Load the distance matrix and its shortest-path closure, memory-mapped from cache while the CSV is unchanged."""
+    return load_shortest_paths(filename)
 
+@PHASE_SECONDS.timed('load_addresses')
 def load_address_data(filename):
-    """Load address data from CSV file into a list."""
+    """Load address data from CSV file into an address index."""
     addresses = []
     with open(filename, 'r') as csvfile:
         reader = csv.reader(csvfile)
         next(reader)  # Skip header row
         for row in reader:
             addresses.append(row[1])
-    return addresses
-
-def get_address_index(address, address_list):
-    """Get the index of an address in the address list."""
-    try:
-        return address_list.index(address)
-    except ValueError:
-        for i, addr in enumerate(address_list):
-            if address.lower() in addr.lower() or addr.lower() in address.lower():
-                return i
-        return 0
+    return AddressIndex(addresses)
 
 def get_distance(from_index, to_index, distance_matrix):
     """Get distance between two locations from the distance matrix."""
-    if from_index < len(distance_matrix) and to_index < len(distance_matrix[from_index]):
-        distance = distance_matrix[from_index][to_index]
-        if distance == 0.0 and from_index != to_index:
-            distance = distance_matrix[to_index][from_index]
-        return distance
-    return 0.0
-
-def is_delayed_package(package_id):
+    return distance_matrix[from_index, to_index]
+
+def is_delayed_package(package_id, constraints):
     """Check if a package is delayed on flight."""
-    delayed_packages = [6, 25, 28, 32]
-    return package_id in delayed_packages
-
-def get_package_address_at_time(package_id, package_data, query_time):
-    """Get the correct package address at a specific time."""
-    if package_id == 9:
-        time_1020 = datetime.timedelta(hours=10, minutes=20)
-        if query_time < time_1020:
-            return "300 State St"
-        else:
-            return "410 S State St"
-    return package_data[0]
-
-def get_package_status_at_time(package_id, package_data, query_time):
-    """Get package status at a specific time, accounting for special constraints."""
-    if is_delayed_package(package_id):
-        delayed_until = datetime.timedelta(hours=9, minutes=5)
-        if query_time < delayed_until:
-            return "Delayed on flight"
-    
-    departure_time = package_data[6] if package_data[6] else datetime.timedelta(hours=8)
-    delivery_time = package_data[7] if package_data[7] else datetime.timedelta(hours=17)
-    
-    if query_time < departure_time:
-        return "At the hub"
-    elif departure_time <= query_time < delivery_time:
-        return "En route"
-    else:
-        return f"Delivered at {delivery_time}"
-
-def get_package_truck_number(package_id):
-    """Get the truck number for a specific package."""
-    # Truck assignments
-    truck1_packages = [1, 13, 14, 15, 16, 19, 20, 29, 30, 31, 34, 37, 40]
-    truck2_packages = [3, 6, 12, 17, 18, 21, 22, 23, 24, 25, 26, 27, 28, 32, 35, 36, 38, 39]
-    truck3_packages = [2, 4, 5, 7, 8, 9, 10, 11, 33]
-    
-    if package_id in truck1_packages:
-        return 1
-    elif package_id in truck2_packages:
-        return 2
-    elif package_id in truck3_packages:
-        return 3
-    else:
-        return 0  # Unknown
-
-def deliver_packages(truck, package_hash_table, distance_matrix, address_list, current_time):
-    """Implement nearest neighbor algorithm to deliver packages for a single truck."""
-    truck_time = current_time
-    
-    # Set departure time for all packages on this truck
-    for package_id in truck['packages']:
-        package_data = package_hash_table.lookup(package_id)
-        if package_data:
-            package_data[6] = truck_time
-    
-    # Continue until all packages are delivered
-    packages_to_deliver = truck['packages'].copy()
-    while packages_to_deliver:
-        nearest_distance = float('inf')
-        nearest_package_id = None
-        nearest_package_index = None
-        
-        for package_id in packages_to_deliver:
-            package_data = package_hash_table.lookup(package_id)
-            if package_data:
-                package_address = package_data[0]
-                
-                # Handle Package #9 constraint
-                if package_id == 9:
-                    time_1020 = datetime.timedelta(hours=10, minutes=20)
-                    if truck_time < time_1020:
-                        # Skip package 9 entirely if before 10:20 AM
-                        continue
-                    else:
-                        # Update to correct address after 10:20 AM
-                        package_data[0] = "410 S State St"
-                        package_address = package_data[0]
-                
-                package_index = get_address_index(package_address, address_list)
-                distance = get_distance(truck['current_location'], package_index, distance_matrix)
-                
-                if distance < nearest_distance:
-                    nearest_distance = distance
-                    nearest_package_id = package_id
-                    nearest_package_index = package_index
-        
-        if nearest_package_id is not None:
-            truck['mileage'] += nearest_distance
-            truck['current_location'] = nearest_package_index
-            
-            travel_time_hours = nearest_distance / 18
-            travel_time = datetime.timedelta(hours=travel_time_hours)
-            truck_time += travel_time
-            
-            package_data = package_hash_table.lookup(nearest_package_id)
-            if package_data:
-                package_data[5] = "Delivered"
-                package_data[7] = truck_time
-            
-            packages_to_deliver.remove(nearest_package_id)
-    
-    return truck_time
-
-def initialize_data():
-    """Initialize the routing data and run simulation."""
-    global package_hash_table, distance_matrix, address_list, trucks
+    return constraints.delayed_until(package_id) is not None
+
+def current():
+    """Get the plan being served (or None) and record its version for the X-Plan-Version header."""
+    plan = current_plan
+    if plan is not None:
+        g.plan_version = plan.version
+    return plan
+
+def get_package_address_at_time(package_id, query_time, plan):
+    """Get the correct package address at a specific time (wrong-address corrections applied)."""
+    return plan.timeline.address_at(package_id, query_time)
+
+def get_package_status_at_time(package_id, query_time, plan):
+    """Get package status at a specific time with a bisect over its precomputed transitions."""
+    return plan.timeline.status_at(package_id, query_time)
+
+def get_package_truck_number(package_id, plan):
+    """Get the truck number for a specific package (0 = unknown)."""
+    return plan.truck_of(package_id)
+
+@PHASE_SECONDS.timed('build_plan')
+def build_plan(files=None, improve=False, time_budget=1.0, progress=None, routing=NEAREST_NEIGHBOR):
+    """Load the CSV files and run assignment, simulation and indexing without touching the plan being served."""
+    files = files or app.config['DATA_FILES']
+    report = progress or (lambda fraction, phase: None)
+    
+    report(0.0, 'Loading addresses')
+    new_address_index = load_address_data(files['addresses'])
     
+    report(0.05, 'Loading packages')
+    package_bytes = max(1, os.path.getsize(files['packages']))
+    new_package_store = PackageStore(ChainingHashTable())
+    load_report = load_package_data(files['packages'], new_package_store, new_address_index,
+                                    lambda loaded: report(0.05 + 0.3 * loaded.offset / package_bytes,
+                                                          f"Loading packages ({loaded.rows} rows)"))
+    for error in load_report.errors:
+        print(f"Warning: Skipped package row - {error}")
+    if load_report.unresolved:
+        raise UnknownAddressError(', '.join(f"package {package_id}: {address}"
+                                            for package_id, address in load_report.unresolved))
+    # Only the bundled sample file gets its known address correction; other files must carry their own
+    is_sample = os.path.abspath(files['packages']) == SAMPLE_PACKAGE_FILE
+    new_constraints = compile_constraints(new_package_store, SAMPLE_ADDRESS_CORRECTIONS if is_sample else None)
+    for problem in new_constraints.problems:
+        print(f"Warning: {problem}")
+    
+    report(0.35, 'Loading distances')
+    new_paths = load_distance_data(files['distances'])
+    new_distance_matrix = new_paths.distances  # Routes drive through other addresses where that is shorter
+    
+    # Load trucks automatically from the package constraints
+    report(0.45, 'Assigning packages to trucks')
+    fleet = app.config['FLEET']
+    new_assignment = assign_packages(new_package_store, new_constraints, new_address_index, new_distance_matrix,
+                                     **fleet)
+    
+    # Run the discrete-event simulation; every truck advances together in event order
+    report(0.75, 'Simulating the delivery day')
+    new_result = simulate_day(new_assignment, new_package_store, new_constraints, new_distance_matrix,
+                              new_address_index, driver_count=fleet['driver_count'], improve=improve,
+                              time_budget=time_budget, routing=routing)
+    
+    report(0.95, 'Indexing the delivery timeline')
+    timeline = build_timeline(new_result, new_package_store, new_constraints)
+    return PlanSnapshot(new_package_store, new_constraints, new_distance_matrix, new_address_index,
+                        new_assignment, new_result, timeline, new_paths)
+
+def install_plan(plan):
+    """Start serving a PlanSnapshot in place of the current one, with a single reference swap."""
+    global current_plan
+    with plan_lock:
+        current_plan = plan
+    
+    # Cached status responses belong to the previous plan; their keys carry its version, so
+    # requests still holding it can only ever hit entries built from that same plan
+    status_cache.clear()
+
+def initialize_data(improve=False, time_budget=1.0, files=None, routing=NEAREST_NEIGHBOR):
+    """Initialize the routing data and run simulation, optionally with the 2-opt/Or-opt improvement stage."""
     try:
-        package_hash_table = ChainingHashTable()
-        load_package_data('WGUPS_Package_File.csv', package_hash_table)
-        distance_matrix = load_distance_data('WGUPS_Distance_Table.csv')
-        address_list = load_address_data('WGUPS_Address_File.csv')
-        
-        # Create trucks with package assignments
-        trucks = [
-            {
-                'id': 1,
-                'packages': [1, 13, 14, 15, 16, 19, 20, 29, 30, 31, 34, 37, 40],
-                'mileage': 0.0,
-                'current_location': 0,
-                'departure_time': datetime.timedelta(hours=8, minutes=0)
-            },
-            {
-                'id': 2,
-                'packages': [3, 6, 12, 17, 18, 21, 22, 23, 24, 25, 26, 27, 28, 32, 35, 36, 38, 39],
-                'mileage': 0.0,
-                'current_location': 0,
-                'departure_time': datetime.timedelta(hours=9, minutes=5)
-            },
-            {
-                'id': 3,
-                'packages': [2, 4, 5, 7, 8, 9, 10, 11, 33],
-                'mileage': 0.0,
-                'current_location': 0,
-                'departure_time': None
-            }
-        ]
-        
-        # Run simulation
-        truck1_return = deliver_packages(trucks[0], package_hash_table, distance_matrix, address_list, trucks[0]['departure_time'])
-        truck2_return = deliver_packages(trucks[1], package_hash_table, distance_matrix, address_list, trucks[1]['departure_time'])
-        trucks[2]['departure_time'] = truck1_return
-        truck3_return = deliver_packages(trucks[2], package_hash_table, distance_matrix, address_list, trucks[2]['departure_time'])
-        
+        install_plan(build_plan(files, improve, time_budget, routing=routing))
         return True
     except Exception as e:
+        INITIALIZE_FAILURES.inc()
         print(f"Error initializing data: {e}")
         return False
 
+def submit_reoptimization(description, files=None, improve=False, time_budget=1.0, routing=NEAREST_NEIGHBOR):
+    """Queue a background job that builds a new plan and installs it once it is complete."""
+    def run(job):
+        plan = build_plan(files, improve, time_budget, progress=job.update, routing=routing)
+        install_plan(plan)
+        late_packages, _ = plan.simulation_result.late_packages(plan.package_store)
+        result = {
+            'plan_version': plan.version,
+            'packages': len(plan.package_store),
+            'total_mileage': plan.total_mileage,
+            'routing': routing,
+            'late_packages': len(late_packages),
+        }
+        if improve:
+            result['mileage_before'] = sum(truck['unimproved_mileage'] for truck in plan.trucks)
+            result['mileage_after'] = plan.total_mileage
+        return result
+    return jobs.submit(run, description)
+
+def changes_plan(view):
+    """Refuse requests that replace the plan while it is read-only (one copy per worker process)."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if app.config['PLAN_READ_ONLY']:
+            return jsonify({'error': 'The plan is read-only: each worker process serves its own copy, so a change '
+                                     'would reach only one of them. Run a single worker to change the plan.'}), 409
+        return view(*args, **kwargs)
+    return wrapper
+
+def create_app(read_only=False, data_dir=None, trucks=None, capacity=None, drivers=None, improve=False,
+               time_budget=1.0, routing=NEAREST_NEIGHBOR):
+    """
+    Build the plan and return the Flask app, for WSGI servers (see gunicorn.conf.py).
+    
+    Under gunicorn --preload this runs once in the master: the plan and its indexes are
+    built there and every forked worker shares their memory copy-on-write. The package
+    store and timeline keep their data in flat arrays, which reading never writes to, so
+    those pages stay shared. Without --preload each worker builds its own plan.
+    
+    Args:
+        read_only (bool): Refuse /api/initialize, /api/upload and /api/reroute (for several workers)
+        data_dir (str): Directory holding the three CSV files under their standard names
+        trucks (int): Number of trucks (default 3)
+        capacity (int): Packages per truck (default 16)
+        drivers (int): Number of drivers (default 2)
+        improve (bool): Run the 2-opt/Or-opt improvement stage
+        time_budget (float): Seconds of improvement per truck
+        routing (str): Route construction mode, 'nearest_neighbor' or 'deadline_insertion'
+    
+    Raises:
+        RuntimeError: If the plan cannot be built
+    """
+    app.config['PLAN_READ_ONLY'] = read_only
+    if data_dir is not None:
+        app.config['DATA_FILES'] = {field: os.path.join(data_dir, filename) for field, filename in DATA_FILES.items()}
+    for setting, value in (('truck_count', trucks), ('capacity', capacity), ('driver_count', drivers)):
+        if value is not None:
+            app.config['FLEET'][setting] = value
+    if current_plan is None:
+        if not initialize_data(improve, time_budget, app.config['DATA_FILES'], routing):
+            raise RuntimeError("Could not build the routing plan; check the CSV files")
+        
+        # Build the lazily built indexes now, so preloaded workers share them instead of each building its own
+        current_plan.indexes.build()
+    return app
+
+def job_response(job, status=202):
+    """Describe a job, with a Location header pointing at its status endpoint."""
+    response = jsonify({'job': job.to_dict(), 'status_url': f"/api/jobs/{job.id}"})
+    response.status_code = status
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response
+
+def save_uploads(uploaded):
+    """Save the three uploaded CSVs under their standard names in a new upload directory. Returns the paths."""
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    directory = os.path.join(UPLOAD_FOLDER, f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}")
+    os.makedirs(directory)
+    paths = {}
+    for field, filename in DATA_FILES.items():
+        paths[field] = os.path.join(directory, filename)
+        uploaded[field].save(paths[field])
+    
+    # Older uploads are no longer needed once newer ones exist
+    previous = sorted(name for name in os.listdir(UPLOAD_FOLDER) if os.path.isdir(os.path.join(UPLOAD_FOLDER, name)))
+    for name in previous[:max(0, len(previous) - UPLOADS_KEPT)]:
+        shutil.rmtree(os.path.join(UPLOAD_FOLDER, name), ignore_errors=True)
+    return paths
+
 @app.route('/api/package/<int:package_id>')
 def get_package(package_id):
     """Get package information by ID."""
-    if not package_hash_table:
+    plan = current()
+    if plan is None:
         return jsonify({'error': 'Data not initialized'}), 500
     
-    package_data = package_hash_table.lookup(package_id)
+    package_data = plan.package_store.lookup(package_id)
     if not package_data:
         return jsonify({'error': 'Package not found'}), 404
     
     return jsonify({
         'id': package_id,
-        'address': package_data[0],
-        'deadline': package_data[1],
-        'city': package_data[2],
-        'zip': package_data[3],
-        'weight': package_data[4],
-        'status': package_data[5],
-        'departure_time': str(package_data[6]) if package_data[6] else None,
-        'delivery_time': str(package_data[7]) if package_data[7] else None
+        'address': package_data.address,
+        'deadline': package_data.deadline,
+        'city': package_data.city,
+        'zip': package_data.zip,
+        'weight': f"{package_data.weight:g}",
+        'status': package_data.status,
+        'departure_time': str(package_data.departure_time) if package_data.departure_time else None,
+        'delivery_time': str(package_data.delivery_time) if package_data.delivery_time else None
     })
 
 @app.route('/api/package/<int:package_id>/status')
@@ -264,118 +305,479 @@ def get_package_status_api(package_id):
     except:
         return jsonify({'error': 'Invalid time format. Use HH:MM'}), 400
     
-    if not package_hash_table:
+    plan = current()
+    if plan is None:
         return jsonify({'error': 'Data not initialized'}), 500
     
-    package_data = package_hash_table.lookup(package_id)
+    package_data = plan.package_store.lookup(package_id)
     if not package_data:
         return jsonify({'error': 'Package not found'}), 404
     
     # Use the new helper functions
-    status = get_package_status_at_time(package_id, package_data, query_time)
-    address = get_package_address_at_time(package_id, package_data, query_time)
+    status = get_package_status_at_time(package_id, query_time, plan)
+    address = get_package_address_at_time(package_id, query_time, plan)
     
     # Get truck number using the helper function
-    truck_number = get_package_truck_number(package_id)
+    truck_number = get_package_truck_number(package_id, plan)
     
     return jsonify({
         'id': package_id,
         'delivery_address': address,
-        'delivery_deadline': package_data[1],
+        'delivery_deadline': package_data.deadline,
         'truck_number': truck_number,
         'delivery_status': status,
-        'delivery_time': str(package_data[7]) if package_data[7] else None,
+        'delivery_time': str(package_data.delivery_time) if package_data.delivery_time else None,
         'query_time': time_str
     })
 
+def package_summary(row, code, query_time, plan):
+    """Describe one package row at a query time, as listed by the bulk package endpoints."""
+    package_data = plan.package_store.view(row)
+    return {
+        'id': package_data.id,
+        'delivery_address': get_package_address_at_time(package_data.id, query_time, plan),
+        'delivery_deadline': package_data.deadline,
+        'truck_number': get_package_truck_number(package_data.id, plan),
+        'delivery_status': plan.timeline.describe(row, code),
+        'delivery_time': str(package_data.delivery_time) if package_data.delivery_time else None,
+        'city': package_data.city,
+        'zip': package_data.zip,
+        'weight': f"{package_data.weight:g}"
+    }
+
+def build_packages_status(query_time, time_str, plan):
+    """Build the /api/packages/status payload for a query time."""
+    # Status codes for every package come from one cached fleet snapshot
+    snapshot = plan.timeline.snapshot(query_time)
+    packages = [package_summary(row, snapshot[row], query_time, plan) for row in plan.indexes.rows_by_id()]
+    
+    return {
+        'packages': packages,
+        'status_counts': plan.timeline.status_counts(query_time),
+        'query_time': time_str
+    }
+
+def build_packages_columns(query_time, time_str, plan):
+    """
+    Build the columnar /api/packages/status payload: one array per field in package ID order,
+    status as a code into status_names, deadlines as minutes after midnight and delivery times as
+    whole seconds after midnight.
+    """
+    store = plan.package_store
+    strings = store.strings.strings
+    rows = plan.indexes.rows_by_id()
+    snapshot = plan.timeline.snapshot(query_time)
+    ids = [store.ids[row] for row in rows]
+    
+    # Listed and corrected addresses differ only for packages with a correction
+    addresses = [strings[store.address_codes[row]] for row in rows]
+    correction_minutes = plan.constraints.correction_minutes
+    for position, row in enumerate(rows):
+        if correction_minutes[row] != NONE:
+            addresses[position] = get_package_address_at_time(ids[position], query_time, plan)
+    
+    truck_of_row = [0] * len(store)
+    for load in plan.assignment.loads:
+        for package_id in load.package_ids:
+            truck_of_row[store.row_of(package_id)] = load.truck_id
+    
+    delivery_seconds = store.delivery_seconds
+    return {
+        'format': 'columns',
+        'query_time': time_str,
+        'status_counts': plan.timeline.status_counts(query_time),
+        'status_names': list(STATUS_NAMES),
+        'columns': {
+            'id': ids,
+            'delivery_address': addresses,
+            'deadline_minutes': [store.deadline_minutes[row] for row in rows],
+            'truck_number': [truck_of_row[row] for row in rows],
+            'status': [int(snapshot[row]) for row in rows],
+            # Whole seconds, truncated like the H:MM:SS the row format shows
+            'delivery_seconds': [None if math.isnan(delivery_seconds[row]) else int(delivery_seconds[row])
+                                 for row in rows],
+            'city': [strings[store.city_codes[row]] for row in rows],
+            'zip': [strings[store.zip_codes[row]] for row in rows],
+            'weight': [store.weights[row] for row in rows],
+        },
+    }
+
+def encoded_response(cached, mimetype='application/json'):
+    """Send a cached body compressed with the best encoding the client accepts, with that representation's ETag."""
+    encoding = choose_encoding(request.accept_encodings, len(cached.body))
+    body, etag = cached.encoded(encoding)
+    response = Response(body, mimetype=mimetype)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    return response
+
 @app.route('/api/packages/status')
 def get_all_packages_status():
-    """Get status of all packages at a specific time."""
+    """
+    Get status of all packages at a specific time. Responses are cached per minute and carry a strong ETag.
+    format=columns returns one array per field instead of one object per package.
+    """
     time_str = request.args.get('time')
     if not time_str:
         return jsonify({'error': 'Time parameter required (HH:MM format)'}), 400
     
+    layout = request.args.get('format', 'rows')
+    if layout not in ('rows', 'columns'):
+        return jsonify({'error': "format must be 'rows' or 'columns'"}), 400
+    
     try:
         hour, minute = map(int, time_str.split(':'))
         query_time = datetime.timedelta(hours=hour, minutes=minute)
     except:
         return jsonify({'error': 'Invalid time format. Use HH:MM'}), 400
     
-    if not package_hash_table:
+    plan = current()
+    if plan is None:
         return jsonify({'error': 'Data not initialized'}), 500
     
-    packages = []
-    for package_id in range(1, 41):
-        package_data = package_hash_table.lookup(package_id)
-        if package_data:
-            # Use the new helper functions
-            status = get_package_status_at_time(package_id, package_data, query_time)
-            address = get_package_address_at_time(package_id, package_data, query_time)
-            
-            # Find which truck this package is on
-            truck_id = None
-            for truck in trucks:
-                if package_id in truck['packages']:
-                    truck_id = truck['id']
-                    break
-            
-            departure_time = package_data[6] if package_data[6] else datetime.timedelta(hours=8)
-            delivery_time = package_data[7] if package_data[7] else None
-            
-            packages.append({
-                'id': package_id,
-                'delivery_address': address,
-                'delivery_deadline': package_data[1],
-                'truck_number': get_package_truck_number(package_id),
-                'delivery_status': status,
-                'delivery_time': str(package_data[7]) if package_data[7] else None,
-                'city': package_data[2],
-                'zip': package_data[3],
-                'weight': package_data[4]
-            })
+    # The answer only changes when a new plan is installed, so cache it per (plan version, minute)
+    cache_key = (plan.version, hour * 60 + minute, layout)
+    cached = status_cache.get(cache_key)
+    if cached is None:
+        build = build_packages_columns if layout == 'columns' else build_packages_status
+        cached = status_cache.put(cache_key, dumps(build(query_time, f"{hour:02d}:{minute:02d}", plan)))
     
-    return jsonify({
-        'packages': packages,
+    response = encoded_response(cached)
+    response.headers['Cache-Control'] = 'no-cache'  # Revalidate with If-None-Match every time
+    return response.make_conditional(request)
+
+@app.route('/api/packages')
+def query_packages():
+    """
+    Get one page of packages matching the filters: truck, zip, deadline_before (HH:MM or EOD),
+    status (delayed, at_hub, en_route or delivered, at time=HH:MM, default end of day) and ids=1,2,3.
+    Pass the returned next_cursor as cursor for the next page; limit sets the page size.
+    """
+    time_str = request.args.get('time', '23:59')
+    try:
+        hour, minute = map(int, time_str.split(':'))
+        query_time = datetime.timedelta(hours=hour, minutes=minute)
+    except ValueError:
+        return jsonify({'error': 'Invalid time format. Use HH:MM'}), 400
+    
+    filters = {}
+    try:
+        if 'truck' in request.args:
+            filters['truck'] = int(request.args['truck'])
+        if 'zip' in request.args:
+            filters['zip_code'] = request.args['zip'].strip()
+        if 'deadline_before' in request.args:
+            filters['deadline_before'] = parse_deadline_minutes(request.args['deadline_before'])
+        if 'ids' in request.args:
+            filters['ids'] = [int(package_id) for package_id in request.args['ids'].split(',') if package_id.strip()]
+            if len(filters['ids']) > MAX_PAGE_SIZE:
+                return jsonify({'error': f"At most {MAX_PAGE_SIZE} ids per request"}), 400
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return jsonify({'error': 'truck, limit and ids must be integers and deadline_before HH:MM'}), 400
+    if 'status' in request.args:
+        names = [name.lower().replace(' ', '_') for name in STATUS_NAMES]
+        status = request.args['status'].strip().lower().replace(' ', '_')
+        if status == 'delayed':
+            status = names[0]
+        if status not in names:
+            return jsonify({'error': 'status must be one of delayed, at_hub, en_route, delivered'}), 400
+        filters['status'] = names.index(status)
+    
+    plan = current()
+    if plan is None:
+        return jsonify({'error': 'Data not initialized'}), 500
+    
+    try:
+        rows, next_cursor, missing = plan.indexes.query(query_time=query_time, cursor=request.args.get('cursor'),
+                                                        limit=limit, **filters)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    snapshot = plan.timeline.snapshot(query_time)
+    response = {
+        'packages': [package_summary(row, snapshot[row], query_time, plan) for row in rows],
+        'next_cursor': next_cursor,
         'query_time': time_str
-    })
+    }
+    if 'ids' in filters:
+        response['missing'] = missing
+    return jsonify(response)
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    """Get hit/miss counters for the /api/packages/status response cache."""
+    plan = current()
+    return jsonify(dict(status_cache.stats(), plan_version=plan.version if plan else None))
 
 @app.route('/api/trucks')
 def get_trucks():
     """Get information about all trucks."""
-    if not trucks:
+    plan = current()
+    if plan is None:
         return jsonify({'error': 'Data not initialized'}), 500
     
     truck_info = []
-    for truck in trucks:
+    for truck in plan.trucks:
         truck_info.append({
             'id': truck['id'],
-            'packages': truck['packages'],
+            'packages': list(truck['packages']),
             'mileage': truck['mileage'],
             'departure_time': str(truck['departure_time']) if truck['departure_time'] else None
         })
     
     return jsonify({'trucks': truck_info})
 
+@app.route('/api/trucks/<int:truck_id>/manifest')
+def get_truck_manifest(truck_id):
+    """Get a truck's stops in delivery order, with the addresses driven through on each leg."""
+    plan = current()
+    if plan is None:
+        return jsonify({'error': 'Data not initialized'}), 500
+    truck = plan.simulation_result.truck(truck_id)
+    if truck is None:
+        return jsonify({'error': 'Truck not found'}), 404
+    
+    addresses = plan.address_index
+    stops = []
+    for visit, path in expand_legs(truck.visits, plan.paths, HUB_LOCATION):
+        stops.append({
+            'address': addresses[visit.location],
+            'arrival_time': str(visit.arrival_time),
+            'miles': visit.distance,
+            'package_ids': list(visit.package_ids),
+            'via': [addresses[location] for location in path[1:-1]],
+        })
+    return jsonify({
+        'truck_id': truck.id,
+        'driver': truck.driver,
+        'departure_time': str(truck.departure_time) if truck.departure_time else None,
+        'start': addresses[HUB_LOCATION],
+        'mileage': truck.mileage,
+        'stops': stops,
+    })
+
 @app.route('/api/total-mileage')
 def get_total_mileage():
     """Get total mileage for all trucks."""
-    if not trucks:
+    plan = current()
+    if plan is None:
+        return jsonify({'error': 'Data not initialized'}), 500
+    
+    return jsonify({
+        'total_mileage': plan.total_mileage,
+        'individual_mileage': [{'truck_id': truck['id'], 'mileage': truck['mileage']} for truck in plan.trucks]
+    })
+
+@app.route('/api/deadlines')
+def get_deadlines():
+    """Report the packages delivered after their deadline (or never) in the plan being served."""
+    plan = current()
+    if plan is None:
+        return jsonify({'error': 'Data not initialized'}), 500
+    
+    late_packages, late_minutes = plan.simulation_result.late_packages(plan.package_store)
+    return jsonify({
+        'on_time': not late_packages,
+        'late_count': len(late_packages),
+        'late_minutes': round(late_minutes, 1),
+        'late_packages': late_packages,
+    })
+
+@app.route('/api/events')
+def get_events():
+    """Get the simulation event log in time order."""
+    plan = current()
+    if plan is None:
         return jsonify({'error': 'Data not initialized'}), 500
     
-    total_mileage = sum(truck['mileage'] for truck in trucks)
     return jsonify({
-        'total_mileage': total_mileage,
-        'individual_mileage': [{'truck_id': truck['id'], 'mileage': truck['mileage']} for truck in trucks]
+        'events': [
+            {
+                'time': str(event.time),
+                'kind': event.kind,
+                'truck_id': event.truck_id,
+                'driver': event.driver,
+                'location': event.location,
+                'package_ids': list(event.package_ids)
+            }
+            for event in plan.simulation_result.events
+        ]
     })
 
+@app.route('/api/stream')
+def stream_status():
+    """
+    Replay the day as Server-Sent Events: a snapshot event, then a delta event every tick with only the
+    packages whose status changed. speed is simulated seconds per second (default 60), start is HH:MM
+    (default 08:00) and tick is seconds between deltas (default 1). Clients with the same settings share one clock.
+    """
+    try:
+        speed = float(request.args.get('speed', 60))
+        tick = float(request.args.get('tick', 1))
+        hour, minute = map(int, request.args.get('start', '08:00').split(':'))
+    except ValueError:
+        return jsonify({'error': 'speed and tick must be numbers and start HH:MM'}), 400
+    if not 0 < speed <= MAX_SPEED or tick < MIN_TICK:
+        return jsonify({'error': f"speed must be in (0, {MAX_SPEED:g}] and tick at least {MIN_TICK:g} seconds"}), 400
+    
+    plan = current()
+    if plan is None:
+        return jsonify({'error': 'Data not initialized'}), 500
+    
+    replay, client = replays.subscribe(plan, speed, float(hour * 3600 + minute * 60), tick)
+    response = Response(replay.frames(client), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let proxies pass each event through as it is sent
+    return response
+
+@app.route('/api/stream/stats')
+def get_stream_stats():
+    """Count the running replays and connected stream clients."""
+    return jsonify(replays.stats())
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Export request latency, loading and routing phase timings, and counters in the Prometheus text format."""
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/api/initialize')
+@changes_plan
 def initialize():
-    """Initialize or reinitialize the routing data."""
-    success = initialize_data()
-    if success:
-        return jsonify({'message': 'Data initialized successfully'})
-    else:
-        return jsonify({'error': 'Failed to initialize data'}), 500
+    """
+    Reinitialize the routing data from the standard CSV files in a background job.
+    Pass improve=true to run 2-opt/Or-opt, routing=deadline_insertion to build routes that keep
+    deadlines, and wait=true to block until the new plan is served.
+    """
+    improve = request.args.get('improve', 'false').lower() in ('1', 'true', 'yes')
+    wait = request.args.get('wait', 'false').lower() in ('1', 'true', 'yes')
+    try:
+        time_budget = float(request.args.get('time_budget', 1.0))
+    except ValueError:
+        return jsonify({'error': 'Invalid time_budget. Use seconds, e.g. 0.5'}), 400
+    routing = request.args.get('routing', NEAREST_NEIGHBOR)
+    if routing not in ROUTING_MODES:
+        return jsonify({'error': f"Invalid routing. Use one of: {', '.join(ROUTING_MODES)}"}), 400
+    
+    job = submit_reoptimization('Reinitialize from the configured CSV files', improve=improve, time_budget=time_budget,
+                                routing=routing)
+    if not wait:
+        return job_response(job)
+    
+    job.wait()
+    if job.error is not None:
+        return jsonify({'error': f"Failed to initialize data: {job.error}", 'job': job.to_dict()}), 500
+    response = {'message': 'Data initialized successfully', 'job': job.to_dict()}
+    if improve:
+        response['mileage_before'] = job.result['mileage_before']
+        response['mileage_after'] = job.result['mileage_after']
+    return jsonify(response)
+
+@app.route('/api/upload', methods=['POST'])
+@changes_plan
+def upload_files():
+    """
+    Accept the three CSV files as multipart fields (packages, distances, addresses) and queue a re-optimization.
+    Queries keep being answered from the current plan until the job installs the new one.
+    """
+    missing = [field for field in DATA_FILES if not request.files.get(field) or not request.files[field].filename]
+    if missing:
+        return jsonify({'error': f"Missing files: {', '.join(missing)}",
+                        'expected_fields': list(DATA_FILES)}), 400
+    not_csv = [field for field in DATA_FILES if not request.files[field].filename.lower().endswith('.csv')]
+    if not_csv:
+        return jsonify({'error': f"Not CSV files: {', '.join(not_csv)}"}), 400
+    
+    improve = request.form.get('improve', 'false').lower() in ('1', 'true', 'yes')
+    routing = request.form.get('routing', NEAREST_NEIGHBOR)
+    if routing not in ROUTING_MODES:
+        return jsonify({'error': f"Invalid routing. Use one of: {', '.join(ROUTING_MODES)}"}), 400
+    files = save_uploads(request.files)
+    return job_response(submit_reoptimization('Re-optimize uploaded CSV files', files, improve=improve,
+                                              routing=routing))
+
+@app.route('/api/jobs')
+def list_jobs():
+    """Get every known background job, oldest first."""
+    plan = current()
+    return jsonify({'jobs': [job.to_dict() for job in jobs.jobs()], 'plan_version': plan.version if plan else None})
+
+@app.route('/api/jobs/<int:job_id>')
+def get_job(job_id):
+    """Get a background job's state and progress."""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/reroute', methods=['POST'])
+@changes_plan
+def reroute():
+    """
+    Apply a mid-day change and serve the patched plan. The body is a RouteChange definition, e.g.
+    {"kind": "address_change", "time": "10:30", "package_id": 12, "address": "410 S State St"};
+    kind is address_change, new_package, package_delay or truck_breakdown.
+    Only the affected trucks' remaining stops are recomputed; deliveries before the change time stand.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'JSON object body required'}), 400
+    improve = str(data.get('improve', 'false')).lower() in ('1', 'true', 'yes')
+    
+    # Changes are applied one at a time, each to the plan the previous one installed
+    with plan_lock:
+        plan = current()
+        if plan is None:
+            return jsonify({'error': 'Data not initialized'}), 500
+        try:
+            new_plan, report = apply_change(plan, RouteChange.from_dict(data), improve=improve)
+        except RouteChangeConflict as e:
+            return jsonify({'error': str(e)}), 409
+        except RouteChangeError as e:
+            return jsonify({'error': str(e)}), 400
+        install_plan(new_plan)
+    
+    g.plan_version = new_plan.version
+    return jsonify(dict(report.to_dict(), plan_version=new_plan.version, total_mileage=new_plan.total_mileage))
+
+@app.before_request
+def start_request_timer():
+    """Note when the request started, unless metrics are turned off."""
+    if registry.enabled:
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    """Observe the request's latency by route pattern (streamed bodies are timed until their headers)."""
+    start = g.get('request_start')
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint, request.method, response.status_code)
+    return response
+
+@app.after_request
+def add_plan_version(response):
+    """Tell clients which plan version answered, so they can notice a new plan."""
+    version = g.get('plan_version')
+    if version is not None:
+        response.headers['X-Plan-Version'] = str(version)
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Compress large JSON bodies that were not already encoded (streams are sent as they are)."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or response.mimetype != 'application/json' or 'Content-Encoding' in response.headers):
+        return response
+    body = response.get_data()
+    encoding = choose_encoding(request.accept_encodings, len(body))
+    if encoding is not None:
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+    return response
 
 if __name__ == '__main__':
     print("Initializing WGUPS routing data...")
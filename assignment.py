@@ -0,0 +1,571 @@
+import datetime
+import heapq
+import math
+import time
+
+from hash_table import ChainingHashTable
+from metrics import PHASE_SECONDS
+from routing import nearest_neighbor_route
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, neighbor lists fall back to sorting in Python
+    np = None
+
+
+# Extra miles charged per minute a package is delivered after its deadline
+LATENESS_PENALTY = 10.0
+
+# Number of nearby units considered for savings merges and improvement moves
+NEIGHBOR_COUNT = 20
+
+
+class AssignmentError(ValueError):
+    """Raised when the packages cannot be loaded onto the available trucks."""
+
+
+class TruckLoad:
+    """
+    Packages assigned to one truck and when it leaves the hub.
+    A truck without a free driver at its ready time waits for the driver
+    of truck driver_from to finish that truck's route.
+    """
+
+    __slots__ = ('truck_id', 'package_ids', 'ready_time', 'departure_time', 'driver_from')
+
+    def __init__(self, truck_id, package_ids, ready_time, departure_time=None, driver_from=None):
+        self.truck_id = truck_id
+        self.package_ids = package_ids
+        self.ready_time = ready_time
+        self.departure_time = departure_time
+        self.driver_from = driver_from
+
+    def __repr__(self):
+        return (f"TruckLoad(truck_id={self.truck_id}, packages={len(self.package_ids)}, "
+                f"departure_time={self.departure_time}, driver_from={self.driver_from})")
+
+
+class AssignmentPlan:
+    """
+    Result of the assignment solver: one TruckLoad per truck, in departure order,
+    plus the estimated mileage and lateness of routing them with nearest neighbor.
+    """
+
+    def __init__(self, loads, mileage, late_minutes):
+        self.loads = loads
+        self.mileage = mileage
+        self.late_minutes = late_minutes
+        self._truck_of = ChainingHashTable(initial_capacity=max(40, sum(len(load.package_ids) for load in loads)))
+        for load in loads:
+            for package_id in load.package_ids:
+                self._truck_of.insert(package_id, load.truck_id)
+        self._overrides = {}  # Package ID -> truck ID (or None) for loads replaced by with_loads
+
+    def truck_of(self, package_id):
+        """
+        Get the truck a package is loaded on.
+
+        Returns:
+            int: Truck ID, or None if the package is not assigned
+        """
+        if package_id in self._overrides:
+            return self._overrides[package_id]
+        return self._truck_of.lookup(package_id)
+
+    def with_loads(self, loads):
+        """
+        Get a plan with some truck loads replaced.
+        The package index is shared with this plan and only the moved packages
+        are recorded, so the cost grows with the replaced loads, not the fleet.
+
+        Args:
+            loads (list): TruckLoad objects, each replacing the load with the same truck ID
+
+        Returns:
+            AssignmentPlan: New plan; this one is left unchanged
+        """
+        replacements = {load.truck_id: load for load in loads}
+        plan = AssignmentPlan.__new__(AssignmentPlan)
+        plan.mileage = self.mileage
+        plan.late_minutes = self.late_minutes
+        plan._truck_of = self._truck_of
+        plan._overrides = dict(self._overrides)
+        plan.loads = []
+        for load in self.loads:
+            if load.truck_id in replacements:
+                for package_id in load.package_ids:
+                    plan._overrides[package_id] = None
+                load = replacements.pop(load.truck_id)
+            plan.loads.append(load)
+        plan.loads.extend(replacements.values())
+        for load in loads:
+            for package_id in load.package_ids:
+                plan._overrides[package_id] = load.truck_id
+        return plan
+
+    def load_for(self, truck_id):
+        """Get the TruckLoad for a truck ID, or None."""
+        for load in self.loads:
+            if load.truck_id == truck_id:
+                return load
+        return None
+
+
+class _Unit:
+    """Packages that must travel together: a must-ship-with group, or packages sharing a stop."""
+
+    __slots__ = ('package_ids', 'location', 'required_truck', 'ready_seconds', 'deadline_seconds', 'splittable')
+
+    def __init__(self, package_ids, location, required_truck, ready_seconds, deadline_seconds, splittable=False):
+        self.package_ids = package_ids
+        self.location = location
+        self.required_truck = required_truck
+        self.ready_seconds = ready_seconds
+        self.deadline_seconds = deadline_seconds
+        self.splittable = splittable  # Packages only share a stop, so they may ride different trucks
+
+
+def _build_units(package_store, constraints, address_index, capacity):
+    """Group packages into units that are assigned to trucks as a whole."""
+    units = []
+    grouped = set()
+
+    def describe(package_id):
+        package = package_store.lookup(package_id)
+        correction = constraints.address_correction(package_id)
+        location = address_index.resolve(correction[1]) if correction else package.address_index
+        delayed = constraints.delayed_until(package_id)
+        ready = delayed.total_seconds() if delayed else 0.0
+        return location, constraints.required_truck(package_id), ready, package.deadline_minutes * 60.0
+
+    # Must-ship-with groups become single units
+    for members in constraints.groups:
+        if len(members) > capacity:
+            raise AssignmentError(f"Packages {members} must ship together but exceed truck capacity {capacity}")
+        required = None
+        ready = 0.0
+        deadline = math.inf
+        location = None
+        for package_id in members:
+            member_location, member_required, member_ready, member_deadline = describe(package_id)
+            if member_required is not None:
+                if required is not None and required != member_required:
+                    raise AssignmentError(f"Packages {members} must ship together but require different trucks")
+                required = member_required
+            ready = max(ready, member_ready)
+            deadline = min(deadline, member_deadline)
+            if location is None:
+                location = member_location
+            grouped.add(package_id)
+        units.append(_Unit(list(members), location, required, ready, deadline))
+
+    # Remaining packages sharing a location (and the same truck/ready restrictions) share a unit
+    open_units = {}
+    for package_id in package_store.package_ids():
+        if package_id in grouped:
+            continue
+        location, required, ready, deadline = describe(package_id)
+        key = (location, required, ready)
+        unit = open_units.get(key)
+        if unit is None or len(unit.package_ids) >= capacity:
+            unit = _Unit([], location, required, ready, deadline, splittable=True)
+            open_units[key] = unit
+            units.append(unit)
+        unit.package_ids.append(package_id)
+        unit.deadline_seconds = min(unit.deadline_seconds, deadline)
+    return units
+
+
+def _neighbor_lists(distance_matrix, units, count):
+    """For every unit, the indexes of the nearest other units by stop distance."""
+    locations = [unit.location for unit in units]
+    size = len(units)
+    k = min(count, size - 1)
+    if k <= 0:
+        return [[] for _ in range(size)]
+    if np is not None and isinstance(distance_matrix, np.ndarray):
+        index = np.asarray(locations, dtype=np.intp)
+        neighbors = []
+        # Process in blocks so large fleets do not build a full units x units matrix at once
+        for start in range(0, size, 512):
+            block = distance_matrix[np.ix_(index[start:start + 512], index)].copy()
+            for row in range(block.shape[0]):
+                block[row, start + row] = np.inf
+            nearest = np.argpartition(block, k - 1, axis=1)[:, :k]
+            for row in range(block.shape[0]):
+                order = nearest[row][np.argsort(block[row, nearest[row]], kind='stable')]
+                neighbors.append(order.tolist())
+        return neighbors
+    neighbors = []
+    for i, a in enumerate(locations):
+        ranked = sorted((distance_matrix[a, b], j) for j, b in enumerate(locations) if j != i)
+        neighbors.append([j for _, j in ranked[:k]])
+    return neighbors
+
+
+def _savings_routes(units, neighbors, distance_matrix, hub, capacity):
+    """
+    Clarke-Wright savings construction over units.
+    Only the neighbor pairs are considered, so the number of candidate
+    merges grows linearly with the number of units.
+    """
+    savings = []
+    for i, unit in enumerate(units):
+        for j in neighbors[i]:
+            if j <= i:
+                continue
+            other = units[j]
+            saving = (distance_matrix[hub, unit.location] + distance_matrix[hub, other.location]
+                      - distance_matrix[unit.location, other.location])
+            savings.append((-saving, i, j))
+    savings.sort()
+
+    route_of = list(range(len(units)))
+    routes = {i: [i] for i in range(len(units))}
+    sizes = {i: len(unit.package_ids) for i, unit in enumerate(units)}
+    required = {i: unit.required_truck for i, unit in enumerate(units)}
+    ready = {i: unit.ready_seconds for i, unit in enumerate(units)}
+    deadline = {i: unit.deadline_seconds for i, unit in enumerate(units)}
+
+    for _, i, j in savings:
+        a = route_of[i]
+        b = route_of[j]
+        if a == b or sizes[a] + sizes[b] > capacity:
+            continue
+        if required[a] is not None and required[b] is not None and required[a] != required[b]:
+            continue
+        # Do not hold early-deadline packages back for packages that arrive late
+        if max(ready[a], ready[b]) >= min(deadline[a], deadline[b]):
+            continue
+        route_a = routes[a]
+        route_b = routes[b]
+        # Merge only at route ends, keeping each route a chain
+        if route_a[-1] == i and route_b[0] == j:
+            merged = route_a + route_b
+        elif route_a[0] == i and route_b[-1] == j:
+            merged = route_b + route_a
+        elif route_a[-1] == i and route_b[-1] == j:
+            merged = route_a + route_b[::-1]
+        elif route_a[0] == i and route_b[0] == j:
+            merged = route_a[::-1] + route_b
+        else:
+            continue
+        routes[a] = merged
+        for unit_index in route_b:
+            route_of[unit_index] = a
+        sizes[a] += sizes.pop(b)
+        required[a] = required[a] if required[a] is not None else required[b]
+        ready[a] = max(ready[a], ready.pop(b))
+        deadline[a] = min(deadline[a], deadline.pop(b))
+        del routes[b]
+        del required[b]
+    return list(routes.values())
+
+
+class _Evaluator:
+    """Routes each truck with nearest neighbor and schedules drivers to price a plan."""
+
+    def __init__(self, units, package_store, constraints, address_index, distance_matrix,
+                 hub, start_time, speed, driver_count):
+        self.units = units
+        self.package_store = package_store
+        self.constraints = constraints
+        self.address_index = address_index
+        self.distance_matrix = distance_matrix
+        self.hub = hub
+        self.start_seconds = start_time.total_seconds()
+        self.speed = speed
+        self.driver_count = driver_count
+        self._cache = {}
+
+    def route(self, unit_indexes, departure_seconds):
+        """
+        Nearest neighbor route for a truck carrying the given units.
+
+        Returns:
+            tuple: (mileage, duration seconds, [(arrival offset seconds, deadline seconds)], gated)
+        """
+        key = tuple(sorted(unit_indexes))
+        cached = self._cache.get(key)
+        if cached is not None and (not cached[3] or cached[4] == departure_seconds):
+            return cached
+        departure = datetime.timedelta(seconds=departure_seconds)
+        stops = []
+        gated = []
+        deadlines = {}
+        order = 0
+        for unit_index in unit_indexes:
+            unit = self.units[unit_index]
+            for package_id in unit.package_ids:
+                package = self.package_store.lookup(package_id)
+                deadlines[package_id] = package.deadline_minutes * 60.0
+                correction = self.constraints.address_correction(package_id)
+                if correction is not None:
+                    gated.append((package_id, self.address_index.resolve(correction[1]), correction[0], order))
+                else:
+                    stops.append((package_id, package.address_index))
+                order += 1
+        visits = nearest_neighbor_route(self.distance_matrix, self.hub, departure, self.speed, stops, gated)
+        mileage = 0.0
+        arrivals = []
+        for visit in visits:
+            mileage += visit.distance
+            offset = (visit.arrival_time - departure).total_seconds()
+            for package_id in visit.package_ids:
+                arrivals.append((offset, deadlines[package_id]))
+        duration = arrivals[-1][0] if arrivals else 0.0
+        result = (mileage, duration, arrivals, bool(gated), departure_seconds)
+        self._cache[key] = result
+        return result
+
+    def schedule(self, assignment, truck_ids):
+        """
+        Price a plan: route every truck and hand drivers over as they finish.
+
+        Args:
+            assignment (dict): Truck ID -> list of unit indexes
+            truck_ids (list): All truck IDs
+
+        Returns:
+            tuple: (cost, mileage, late minutes, [TruckLoad in departure order])
+        """
+        trucks = []
+        for truck_id in truck_ids:
+            unit_indexes = assignment[truck_id]
+            if not unit_indexes:
+                continue
+            ready = max([self.start_seconds] + [self.units[u].ready_seconds for u in unit_indexes])
+            deadline = min(self.units[u].deadline_seconds for u in unit_indexes)
+            trucks.append((deadline, ready, truck_id))
+        trucks.sort()
+
+        drivers = [(self.start_seconds, -1, None) for _ in range(self.driver_count)]
+        heapq.heapify(drivers)
+        total_mileage = 0.0
+        late_seconds = 0.0
+        loads = []
+        for sequence, (_, ready, truck_id) in enumerate(trucks):
+            free_at, _, driver_from = heapq.heappop(drivers)
+            departure = max(free_at, ready)
+            mileage, duration, arrivals, _, _ = self.route(assignment[truck_id], departure)
+            total_mileage += mileage
+            for offset, deadline in arrivals:
+                if departure + offset > deadline:
+                    late_seconds += departure + offset - deadline
+            package_ids = [package_id for u in assignment[truck_id] for package_id in self.units[u].package_ids]
+            loads.append(TruckLoad(truck_id, package_ids, datetime.timedelta(seconds=ready),
+                                   datetime.timedelta(seconds=departure),
+                                   driver_from if free_at > ready else None))
+            heapq.heappush(drivers, (departure + duration, sequence, truck_id))
+        late_minutes = late_seconds / 60.0
+        return total_mileage + LATENESS_PENALTY * late_minutes, total_mileage, late_minutes, loads
+
+
+@PHASE_SECONDS.timed('assign_packages')
+def assign_packages(package_store, constraints, address_index, distance_matrix, truck_count=3,
+                    capacity=16, driver_count=2, start_time=datetime.timedelta(hours=8),
+                    speed=18, hub=0, time_budget=1.0):
+    """
+    Assign packages to trucks and decide departure times.
+
+    Packages are first grouped into units (must-ship-with groups and packages
+    sharing a stop), then joined into truck loads with a Clarke-Wright savings
+    heuristic. Relocate and swap moves between trucks then lower total
+    nearest neighbor mileage plus a lateness penalty until the time budget runs
+    out or no move helps.
+
+    Args:
+        package_store (PackageStore): Loaded packages with resolved locations
+        constraints (PackageConstraints): Compiled special-notes constraints
+        address_index (AddressIndex): Address lookup for corrected addresses
+        distance_matrix (numpy.ndarray or PyDistanceMatrix): Mirrored distance matrix
+        truck_count (int): Number of trucks available
+        capacity (int): Maximum packages per truck
+        driver_count (int): Number of drivers (trucks that can be out at once)
+        start_time (datetime.timedelta): Earliest departure from the hub
+        speed (float): Truck speed in miles per hour
+        hub (int): Location ID of the hub
+        time_budget (float): Seconds to spend improving the construction
+
+    Returns:
+        AssignmentPlan: Truck loads in departure order with estimated mileage
+
+    Raises:
+        AssignmentError: If the packages cannot fit on the trucks under the constraints
+    """
+    if truck_count < 1 or driver_count < 1 or capacity < 1:
+        raise AssignmentError("truck_count, driver_count and capacity must be positive")
+    if len(package_store) > truck_count * capacity:
+        raise AssignmentError(f"{len(package_store)} packages do not fit on {truck_count} trucks "
+                              f"of capacity {capacity}")
+
+    deadline_clock = time.perf_counter() + time_budget
+    truck_ids = list(range(1, truck_count + 1))
+    units = _build_units(package_store, constraints, address_index, capacity)
+    for unit in units:
+        if unit.required_truck is not None and unit.required_truck not in truck_ids:
+            raise AssignmentError(f"Packages {unit.package_ids} require truck {unit.required_truck}, "
+                                  f"but only trucks 1-{truck_count} exist")
+    neighbors = _neighbor_lists(distance_matrix, units, NEIGHBOR_COUNT)
+    routes = _savings_routes(units, neighbors, distance_matrix, hub, capacity)
+
+    def route_size(route):
+        return sum(len(units[u].package_ids) for u in route)
+
+    def route_required(route):
+        for u in route:
+            if units[u].required_truck is not None:
+                return units[u].required_truck
+        return None
+
+    # Pin routes that need a specific truck. Routes pinned to the same truck are
+    # combined, and their unrestricted units only stay while there is room.
+    assignment = {truck_id: [] for truck_id in truck_ids}
+    free_routes = []
+    companions = {truck_id: [] for truck_id in truck_ids}
+    for route in routes:
+        required = route_required(route)
+        if required is None:
+            free_routes.append(route)
+            continue
+        for u in route:
+            if units[u].required_truck is None:
+                companions[required].append(u)
+            else:
+                assignment[required].append(u)
+    overflow = []
+    for truck_id in truck_ids:
+        room = capacity - route_size(assignment[truck_id])
+        for u in companions[truck_id]:
+            if len(units[u].package_ids) <= room:
+                assignment[truck_id].append(u)
+                room -= len(units[u].package_ids)
+            else:
+                overflow.append(u)
+
+    # Give the most urgent routes the lowest free truck IDs
+    free_routes.sort(key=lambda route: (min(units[u].deadline_seconds for u in route),
+                                        max(units[u].ready_seconds for u in route)))
+    for route in free_routes:
+        target = next((truck_id for truck_id in truck_ids if not assignment[truck_id]), None)
+        if target is None:
+            overflow.extend(route)
+        else:
+            assignment[target] = list(route)
+
+    # Insert leftover units next to their nearest unit on a truck with room
+    sizes = {truck_id: route_size(assignment[truck_id]) for truck_id in truck_ids}
+    truck_of_unit = {}
+    for truck_id in truck_ids:
+        for u in assignment[truck_id]:
+            truck_of_unit[u] = truck_id
+    for u in sorted(overflow, key=lambda u: -len(units[u].package_ids)):
+        size = len(units[u].package_ids)
+        candidates = [truck_of_unit[v] for v in neighbors[u] if v in truck_of_unit] + truck_ids
+        target = next((truck_id for truck_id in candidates if sizes[truck_id] + size <= capacity), None)
+        if target is None and units[u].splittable:
+            # No single truck has room: split the stop across the trucks with the most room
+            unit = units[u]
+            for truck_id in sorted(truck_ids, key=lambda truck_id: sizes[truck_id]):
+                room = capacity - sizes[truck_id]
+                if room <= 0 or len(unit.package_ids) <= room:
+                    break
+                if unit.required_truck is not None and unit.required_truck != truck_id:
+                    continue
+                piece = _Unit(unit.package_ids[:room], unit.location, unit.required_truck,
+                              unit.ready_seconds, unit.deadline_seconds, splittable=True)
+                del unit.package_ids[:room]
+                units.append(piece)
+                neighbors.append(neighbors[u])
+                assignment[truck_id].append(len(units) - 1)
+                sizes[truck_id] += len(piece.package_ids)
+                truck_of_unit[len(units) - 1] = truck_id
+            size = len(unit.package_ids)
+            target = next((truck_id for truck_id in candidates if sizes[truck_id] + size <= capacity), None)
+        if target is None:
+            raise AssignmentError("Packages do not fit on the trucks with their must-ship-with groups")
+        assignment[target].append(u)
+        sizes[target] += size
+        truck_of_unit[u] = target
+
+    for truck_id in truck_ids:
+        if sizes[truck_id] > capacity:
+            raise AssignmentError(f"Truck {truck_id} must carry {sizes[truck_id]} packages, "
+                                  f"more than its capacity of {capacity}")
+
+    evaluator = _Evaluator(units, package_store, constraints, address_index, distance_matrix,
+                           hub, start_time, speed, driver_count)
+    best_cost, _, _, _ = evaluator.schedule(assignment, truck_ids)
+
+    def movable(u, target):
+        required = units[u].required_truck
+        return required is None or required == target
+
+    # Relocate/swap improvement over neighboring units on other trucks
+    improved = True
+    while improved and time.perf_counter() < deadline_clock:
+        improved = False
+        for u in range(len(units)):
+            if time.perf_counter() >= deadline_clock:
+                break
+            source = truck_of_unit[u]
+            size = len(units[u].package_ids)
+            targets = []
+            for v in neighbors[u]:
+                target = truck_of_unit[v]
+                if target != source and target not in targets:
+                    targets.append(target)
+            for truck_id in truck_ids:
+                if not assignment[truck_id] and truck_id not in targets and truck_id != source:
+                    targets.append(truck_id)
+
+            moved = False
+            for target in targets:
+                if not movable(u, target):
+                    continue
+                # Relocate u onto target
+                if sizes[target] + size <= capacity:
+                    assignment[source].remove(u)
+                    assignment[target].append(u)
+                    cost = evaluator.schedule(assignment, truck_ids)[0]
+                    if cost < best_cost - 1e-9:
+                        best_cost = cost
+                        sizes[source] -= size
+                        sizes[target] += size
+                        truck_of_unit[u] = target
+                        moved = True
+                        break
+                    assignment[target].remove(u)
+                    assignment[source].append(u)
+                # Swap u with a neighboring unit on target
+                for v in neighbors[u]:
+                    if truck_of_unit[v] != target or not movable(v, source):
+                        continue
+                    other_size = len(units[v].package_ids)
+                    if (sizes[target] - other_size + size > capacity
+                            or sizes[source] - size + other_size > capacity):
+                        continue
+                    assignment[source].remove(u)
+                    assignment[target].remove(v)
+                    assignment[source].append(v)
+                    assignment[target].append(u)
+                    cost = evaluator.schedule(assignment, truck_ids)[0]
+                    if cost < best_cost - 1e-9:
+                        best_cost = cost
+                        sizes[source] += other_size - size
+                        sizes[target] += size - other_size
+                        truck_of_unit[u] = target
+                        truck_of_unit[v] = source
+                        moved = True
+                        break
+                    assignment[source].remove(v)
+                    assignment[target].remove(u)
+                    assignment[source].append(u)
+                    assignment[target].append(v)
+                if moved:
+                    break
+            if moved:
+                improved = True
+
+    _, mileage, late_minutes, loads = evaluator.schedule(assignment, truck_ids)
+    return AssignmentPlan(loads, mileage, late_minutes)
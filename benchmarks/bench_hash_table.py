@@ -0,0 +1,75 @@
+"""
+Benchmark ChainingHashTable against OpenAddressingHashTable.
+
+Times bulk insert, successful lookup and missed lookup at 1k, 100k and 1M keys.
+Run from the repository root:
+
+    python benchmarks/bench_hash_table.py [--sizes 1000 100000 1000000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hash_table import ChainingHashTable, OpenAddressingHashTable
+
+
+def time_backend(table_class, keys, missing_keys):
+    """
+    Time insert and lookup operations for one hash table backend.
+
+    Args:
+        table_class (type): Hash table class to benchmark
+        keys (list): Keys to insert and then look up
+        missing_keys (list): Keys that are not present in the table
+
+    Returns:
+        dict: Seconds spent in each phase
+    """
+    table = table_class()
+
+    start = time.perf_counter()
+    for key in keys:
+        table.insert(key, key)
+    insert_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        table.lookup(key)
+    hit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in missing_keys:
+        table.lookup(key)
+    miss_seconds = time.perf_counter() - start
+
+    assert len(table) == len(keys)
+    return {'insert': insert_seconds, 'lookup_hit': hit_seconds, 'lookup_miss': miss_seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--seed', type=int, default=12172824)
+    args = parser.parse_args()
+
+    backends = [ChainingHashTable, OpenAddressingHashTable]
+    print(f"{'Keys':>9} {'Backend':<24} {'Insert (s)':>11} {'Hit (s)':>9} {'Miss (s)':>9}")
+    print("-" * 66)
+    for size in args.sizes:
+        rng = random.Random(args.seed)
+        keys = list(range(1, size + 1))
+        rng.shuffle(keys)
+        missing_keys = [key + size for key in keys[:min(size, 100000)]]
+        for backend in backends:
+            result = time_backend(backend, keys, missing_keys)
+            print(f"{size:>9} {backend.__name__:<24} {result['insert']:>11.3f} "
+                  f"{result['lookup_hit']:>9.3f} {result['lookup_miss']:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare deadline-aware cheapest insertion with nearest neighbor routing on one truck.
+
+Each size routes packages spread over random locations. A share of them get
+deadlines drawn across the nearest neighbor tour's duration, so that tour
+misses many of them; the rest are due at the end of the day. The suite
+reports late packages, total minutes late, mileage and routing time for both
+modes, and checks that insertion misses no more deadlines than nearest
+neighbor. Run from the repository root:
+
+    python benchmarks/bench_insertion.py [--stops 500 1000 2000 5000] [--tight 0.3]
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_routing import random_distance_matrix
+from routing import deadline_insertion_route, nearest_neighbor_route
+
+SPEED = 18
+START_TIME = datetime.timedelta(hours=8)
+
+
+def lateness(visits, deadlines):
+    """Late packages and total minutes late of a route."""
+    late = [(visit.arrival_time - deadlines[package_id]).total_seconds() / 60
+            for visit in visits for package_id in visit.package_ids if visit.arrival_time > deadlines[package_id]]
+    return len(late), sum(late)
+
+
+def run(stop_count, tight_share, rng):
+    distance_matrix = random_distance_matrix(stop_count + 1, rng)
+    stops = [(package_id, package_id) for package_id in range(1, stop_count + 1)]
+
+    # Deadlines are set against the nearest neighbor tour, so they fit a day of this many stops
+    visits = nearest_neighbor_route(distance_matrix, 0, START_TIME, SPEED, stops)
+    day = visits[-1].arrival_time - START_TIME
+    deadlines = {}
+    for package_id, _ in stops:
+        share = rng.uniform(0.05, 1.0) if rng.random() < tight_share else 1.25
+        deadlines[package_id] = START_TIME + day * share
+
+    start = time.perf_counter()
+    nearest = nearest_neighbor_route(distance_matrix, 0, START_TIME, SPEED, stops)
+    nearest_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    insertion, reported_late = deadline_insertion_route(distance_matrix, 0, START_TIME, SPEED, stops,
+                                                        deadlines=deadlines)
+    insertion_seconds = time.perf_counter() - start
+
+    nearest_late = lateness(nearest, deadlines)
+    insertion_late = lateness(insertion, deadlines)
+    assert insertion_late[0] == len(reported_late), "Reported violations differ from the route's arrival times"
+    return [
+        ('nearest_neighbor', nearest_late, sum(visit.distance for visit in nearest), nearest_seconds),
+        ('deadline_insertion', insertion_late, sum(visit.distance for visit in insertion), insertion_seconds),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stops', type=int, nargs='+', default=[500, 1000, 2000, 5000])
+    parser.add_argument('--tight', type=float, default=0.3, help='Share of packages with a deadline before EOD')
+    parser.add_argument('--seed', type=int, default=12172824)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"  {'stops':>6} {'mode':<18} {'late':>6} {'late min':>10} {'miles':>9} {'seconds':>8}")
+    for stop_count in args.stops:
+        for mode, (late_count, late_minutes), mileage, seconds in run(stop_count, args.tight, rng):
+            print(f"  {stop_count:>6} {mode:<18} {late_count:>6} {late_minutes:>10.1f} {mileage:>9.1f} {seconds:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
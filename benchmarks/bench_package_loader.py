@@ -0,0 +1,119 @@
+"""
+Benchmark the streaming package loader against the original csv.reader loop.
+
+Generates a package file (1M rows by default), loads it both ways, and reports
+rows per second with the traced peak and retained memory of each load. Also
+checks that a load interrupted part-way resumes from its byte offset to the
+same result. Run from the repository root:
+
+    python benchmarks/bench_package_loader.py [--packages 1000000] [--chunk-size 1048576]
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_data import generate_dataset
+from hash_table import ChainingHashTable
+from main import load_address_data
+from package_loader import stream_package_data
+from package_store import PackageStore
+
+
+class _StopLoading(Exception):
+    pass
+
+
+def legacy_load(filename, package_store, address_index):
+    """The original load_package_data loop."""
+    unresolved = []
+    with open(filename, 'r') as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader)  # Skip header row
+        for row in reader:
+            package = package_store.add(int(row[0]), row[1], row[5], row[2], row[4], row[6],
+                                        row[7] if len(row) > 7 else '')
+            location_id = address_index.find(package.address)
+            if location_id is None:
+                unresolved.append((package.id, package.address))
+            else:
+                package.address_index = location_id
+    return unresolved
+
+
+def measure(load):
+    """
+    Time a load into a fresh store, then repeat it under tracemalloc.
+    Tracing slows Python down several times, so the two runs are kept apart.
+
+    Returns:
+        tuple: (seconds, peak traced bytes, bytes the store retains, store of the timed run, load result)
+    """
+    package_store = PackageStore(ChainingHashTable())
+    start = time.perf_counter()
+    result = load(package_store)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    traced_store = PackageStore(ChainingHashTable())
+    load(traced_store)
+    current, peak = tracemalloc.get_traced_memory()  # Whatever is still held belongs to the store
+    tracemalloc.stop()
+    del traced_store
+    return seconds, peak, current, package_store, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--packages', type=int, default=1000000, help='Rows in the package file')
+    parser.add_argument('--locations', type=int, default=100, help='Locations in the address file')
+    parser.add_argument('--chunk-size', type=int, default=1 << 20, help='Bytes read per chunk')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'wgups-loader-bench'))
+    args = parser.parse_args()
+
+    directory = os.path.join(args.data_dir, f"{args.packages}x{args.locations}")
+    files = generate_dataset(directory, args.packages, args.locations)
+    address_index = load_address_data(files['addresses'])
+    size_mb = os.path.getsize(files['packages']) / 1e6
+
+    legacy_seconds, legacy_peak, legacy_held, legacy_store, _ = measure(
+        lambda store: legacy_load(files['packages'], store, address_index))
+    stream_seconds, stream_peak, stream_held, stream_store, report = measure(
+        lambda store: stream_package_data(files['packages'], store, address_index, chunk_size=args.chunk_size))
+    assert report.rows == args.packages and not report.errors, "Streaming load skipped rows"
+    assert list(stream_store.ids) == list(legacy_store.ids), "Streaming load differs from the original"
+
+    # Interrupt a load half way, then resume it from the reported offset
+    resumed_store = PackageStore(ChainingHashTable())
+    interrupted = []
+
+    def stop_half_way(progress):
+        interrupted.append(progress.offset)
+        raise _StopLoading()
+
+    try:
+        stream_package_data(files['packages'], resumed_store, address_index, chunk_size=args.chunk_size,
+                            progress=stop_half_way, progress_every=max(1, args.packages // 2))
+    except _StopLoading:
+        pass
+    resumed = stream_package_data(files['packages'], resumed_store, address_index, chunk_size=args.chunk_size,
+                                  start_offset=interrupted[0])
+    assert list(resumed_store.ids) == list(stream_store.ids), "Resumed load differs from a full load"
+
+    print(f"Package file: {args.packages} rows, {size_mb:.1f} MB")
+    print(f"Original loader:  {legacy_seconds:8.2f} s  {args.packages / legacy_seconds:10,.0f} rows/s  "
+          f"peak {legacy_peak / 1e6:7.1f} MB  retained {legacy_held / 1e6:7.1f} MB")
+    print(f"Streaming loader: {stream_seconds:8.2f} s  {args.packages / stream_seconds:10,.0f} rows/s  "
+          f"peak {stream_peak / 1e6:7.1f} MB  retained {stream_held / 1e6:7.1f} MB")
+    print(f"Resumed from byte {interrupted[0]}: {resumed.rows} remaining rows loaded")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Time mid-day route changes on a large fleet against rebuilding the whole plan.
+
+Generates a synthetic data set, plans and simulates the day once, then applies
+each kind of change (address change, new package, delayed package, truck
+breakdown) many times to that plan, each to a fresh copy, and reports the
+median and worst time per change. Only the affected trucks are rerouted, so
+the times should stay in milliseconds while the full rebuild grows with the
+fleet. Run from the repository root:
+
+    python benchmarks/bench_rerouting.py [--packages 20000] [--locations 500] [--repeats 50]
+"""
+
+import argparse
+import datetime
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from assignment import assign_packages
+from constraints import compile_constraints
+from generate_data import generate_dataset
+from hash_table import ChainingHashTable
+from main import load_address_data, load_distance_data, load_package_data
+from package_store import PackageStore
+from plan_snapshot import PlanSnapshot
+from rerouting import (ADDRESS_CHANGE, NEW_PACKAGE, PACKAGE_DELAY, TRUCK_BREAKDOWN, RouteChange, RouteChangeError,
+                       apply_change)
+from simulation import simulate_day
+from timeline import build_timeline
+
+CAPACITY = 16
+TRUCK_SLACK = 1.15
+
+
+def build(files, truck_count):
+    address_index = load_address_data(files['addresses'])
+    package_store = PackageStore(ChainingHashTable())
+    load_package_data(files['packages'], package_store, address_index)
+    constraints = compile_constraints(package_store)
+    paths = load_distance_data(files['distances'])
+    distance_matrix = paths.distances
+    start = time.perf_counter()
+    assignment = assign_packages(package_store, constraints, address_index, distance_matrix,
+                                 truck_count=truck_count, capacity=CAPACITY, driver_count=truck_count,
+                                 time_budget=0.0)
+    result = simulate_day(assignment, package_store, constraints, distance_matrix, address_index,
+                          driver_count=truck_count)
+    timeline = build_timeline(result, package_store, constraints)
+    seconds = time.perf_counter() - start
+    plan = PlanSnapshot(package_store, constraints, distance_matrix, address_index, assignment, result, timeline,
+                        paths)
+    return plan, seconds
+
+
+def changes(plan, kind, count, rng):
+    """Random changes of one kind that can be applied to the plan."""
+    trucks = [truck for truck in plan.simulation_result.trucks if len(truck.visits) > 1]
+    first_departure = min(truck.departure_time for truck in trucks)
+    before_departure = first_departure - datetime.timedelta(minutes=30)
+    made = []
+    while len(made) < count:
+        truck = rng.choice(trucks)
+        middle = truck.visits[(len(truck.visits) - 1) // 2].arrival_time  # Before the last stop
+        if kind == ADDRESS_CHANGE:
+            visit = truck.visits[-1]
+            address = plan.address_index[rng.randrange(1, len(plan.address_index))]
+            made.append(RouteChange(kind, middle, package_id=visit.package_ids[0], address=address))
+        elif kind == NEW_PACKAGE:
+            package_id = max(plan.package_store.ids) + 1
+            address = plan.address_index[rng.randrange(1, len(plan.address_index))]
+            made.append(RouteChange(kind, before_departure, package={'id': package_id, 'address': address}))
+        elif kind == PACKAGE_DELAY:
+            package_id = rng.choice(truck.packages)
+            if plan.constraints.group_members(package_id) or plan.constraints.delayed_until(package_id):
+                continue
+            made.append(RouteChange(kind, before_departure, package_id=package_id,
+                                    until=truck.departure_time - datetime.timedelta(minutes=5)))
+        else:
+            made.append(RouteChange(kind, middle, truck_id=truck.id))
+    return made
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--packages', type=int, default=20000)
+    parser.add_argument('--locations', type=int, default=500)
+    parser.add_argument('--repeats', type=int, default=50, help='Changes of each kind')
+    parser.add_argument('--seed', type=int, default=12172824)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'wgups-bench-data'))
+    args = parser.parse_args()
+
+    directory = os.path.join(args.data_dir, f"{args.packages}x{args.locations}-{args.seed}")
+    files = generate_dataset(directory, args.packages, args.locations, args.seed)
+    truck_count = math.ceil(args.packages / CAPACITY * TRUCK_SLACK)
+    plan, rebuild_seconds = build(files, truck_count)
+    print(f"{args.packages} packages, {args.locations} locations, {truck_count} trucks")
+    print(f"  full rebuild (assign, simulate, timeline): {rebuild_seconds * 1000:10.1f} ms")
+
+    rng = random.Random(args.seed)
+    for kind in (ADDRESS_CHANGE, NEW_PACKAGE, PACKAGE_DELAY, TRUCK_BREAKDOWN):
+        times = []
+        failed = 0
+        for change in changes(plan, kind, args.repeats, rng):
+            start = time.perf_counter()
+            try:
+                apply_change(plan, change, capacity=CAPACITY + 1)
+            except RouteChangeError:
+                failed += 1
+                continue
+            times.append(time.perf_counter() - start)
+        if not times:
+            print(f"  {kind:<16} every change was rejected")
+            continue
+        print(f"  {kind:<16} median {statistics.median(times) * 1000:7.2f} ms  worst {max(times) * 1000:7.2f} ms"
+              f"  speed-up {rebuild_seconds / statistics.median(times):8.0f}x"
+              f"{f'  ({failed} rejected)' if failed else ''}")
+
+
+if __name__ == '__main__':
+    main()
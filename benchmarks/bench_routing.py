@@ -0,0 +1,119 @@
+"""
+Benchmark the vectorized nearest neighbor engine against the original
+package-by-package scan used by deliver_packages.
+
+Routes one truck over a random symmetric distance table and checks that both
+produce the same delivery order and mileage. Run from the repository root:
+
+    python benchmarks/bench_routing.py [--stops 5000] [--packages 5000]
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from distance_matrix import fill_symmetric, np, PyDistanceMatrix
+from hash_table import ChainingHashTable
+from package_store import PackageStore
+from routing import nearest_neighbor_route
+
+
+def random_distance_matrix(size, rng):
+    """
+    Build a symmetric matrix of planar distances rounded to 0.1 miles.
+    Distinct locations are at least 0.1 miles apart, as in the sample table.
+    """
+    points = [(rng.uniform(0, 20), rng.uniform(0, 20)) for _ in range(size)]
+    if np is not None:
+        coordinates = np.array(points)
+        deltas = coordinates[:, None, :] - coordinates[None, :, :]
+        matrix = np.round(np.sqrt((deltas ** 2).sum(axis=2)), 1)
+        matrix = np.maximum(matrix, 0.1)
+        np.fill_diagonal(matrix, 0.0)
+        return matrix
+    rows = []
+    for i, (x1, y1) in enumerate(points):
+        rows.append([max(0.1, round(((x1 - x2) ** 2 + (y1 - y2) ** 2) ** 0.5, 1)) if i != j else 0.0
+                     for j, (x2, y2) in enumerate(points[:i + 1])])
+    values, size = fill_symmetric(rows)
+    return PyDistanceMatrix(size, values)
+
+
+def legacy_route(package_ids, package_store, distance_matrix, start_time, speed):
+    """
+    The original deliver_packages loop: scan every remaining package on every
+    step, looking each one up in the hash table, then list.remove the winner.
+    """
+    truck_time = start_time
+    current_location = 0
+    mileage = 0.0
+    order = []
+    remaining = list(package_ids)
+    while remaining:
+        nearest_distance = float('inf')
+        nearest_package_id = None
+        nearest_location = None
+        for package_id in remaining:
+            package = package_store.lookup(package_id)
+            distance = distance_matrix[current_location, package.address_index]
+            if distance < nearest_distance:
+                nearest_distance = distance
+                nearest_package_id = package_id
+                nearest_location = package.address_index
+        mileage += nearest_distance
+        current_location = nearest_location
+        truck_time += datetime.timedelta(hours=nearest_distance / speed)
+        order.append((nearest_package_id, truck_time))
+        remaining.remove(nearest_package_id)
+    return order, mileage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stops', type=int, default=5000, help='Number of locations')
+    parser.add_argument('--packages', type=int, default=5000, help='Packages on the truck')
+    parser.add_argument('--seed', type=int, default=12172824)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"Building {args.stops}x{args.stops} distance matrix...")
+    distance_matrix = random_distance_matrix(args.stops, rng)
+
+    package_store = PackageStore(ChainingHashTable())
+    for package_id in range(1, args.packages + 1):
+        package = package_store.add(package_id, f"Address {package_id}", 'EOD', 'City', '84000', 1)
+        package.address_index = rng.randrange(1, args.stops)
+    package_ids = list(range(1, args.packages + 1))
+    start_time = datetime.timedelta(hours=8)
+
+    start = time.perf_counter()
+    legacy_order, legacy_mileage = legacy_route(package_ids, package_store, distance_matrix, start_time, 18)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stops = [(package_id, package_store.lookup(package_id).address_index) for package_id in package_ids]
+    visits = nearest_neighbor_route(distance_matrix, 0, start_time, 18, stops)
+    engine_seconds = time.perf_counter() - start
+
+    engine_mileage = sum(visit.distance for visit in visits)
+    engine_times = {}
+    for visit in visits:
+        for package_id in visit.package_ids:
+            engine_times[package_id] = visit.arrival_time
+    assert all(engine_times[package_id] == delivered for package_id, delivered in legacy_order), \
+        "Delivery times differ from the original scan"
+    assert abs(engine_mileage - legacy_mileage) < 1e-6, "Mileage differs from the original scan"
+
+    print(f"Packages: {args.packages}, stops visited: {len(visits)}, mileage: {engine_mileage:.1f}")
+    print(f"Original scan:     {legacy_seconds:8.3f} s")
+    print(f"Vectorized engine: {engine_seconds:8.3f} s")
+    print(f"Speedup:           {legacy_seconds / engine_seconds:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Measure how scenario throughput scales with the number of worker processes.
+
+Builds a batch of what-if scenarios (departure times and driver counts) over a
+synthetic data set and runs it with 1, 2, 4, ... workers up to the CPU count,
+reporting scenarios per second and the speed-up over one worker. The local
+search budgets are set to zero so every scenario does a fixed amount of work.
+Run from the repository root:
+
+    python benchmarks/bench_scenarios.py [--packages 2000] [--locations 200] [--scenarios 32]
+"""
+
+import argparse
+import datetime
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from constraints import compile_constraints
+from generate_data import generate_dataset
+from hash_table import ChainingHashTable
+from main import load_address_data, load_distance_data, load_package_data
+from package_store import PackageStore
+from scenarios import Scenario, run_scenarios
+
+CAPACITY = 16
+
+
+def worker_counts(limit):
+    counts = [1]
+    while counts[-1] * 2 <= limit:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != limit:
+        counts.append(limit)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--packages', type=int, default=2000)
+    parser.add_argument('--locations', type=int, default=200)
+    parser.add_argument('--scenarios', type=int, default=32, help='Scenarios per batch')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'wgups-bench-data'))
+    args = parser.parse_args()
+
+    directory = os.path.join(args.data_dir, f"{args.packages}x{args.locations}-scenarios")
+    files = generate_dataset(directory, args.packages, args.locations)
+    address_index = load_address_data(files['addresses'])
+    package_store = PackageStore(ChainingHashTable())
+    load_package_data(files['packages'], package_store, address_index)
+    constraints = compile_constraints(package_store)
+    distance_matrix = load_distance_data(files['distances']).distances
+
+    base_trucks = math.ceil(args.packages / CAPACITY * 1.15)
+    scenarios = [Scenario(f"start +{i * 5} min", truck_count=base_trucks, driver_count=base_trucks - i % 4,
+                          capacity=CAPACITY, start_time=datetime.timedelta(hours=8, minutes=i * 5),
+                          time_budget=0.0, assign_budget=0.0)
+                 for i in range(args.scenarios)]
+
+    print(f"{args.scenarios} scenarios, {args.packages} packages, {args.locations} locations, "
+          f"{os.cpu_count()} CPUs")
+    baseline = None
+    for workers in worker_counts(args.max_workers):
+        start = time.perf_counter()
+        results = run_scenarios(scenarios, package_store, constraints, distance_matrix, address_index,
+                                workers=workers)
+        seconds = time.perf_counter() - start
+        baseline = baseline or seconds
+        failed = sum(result.error is not None for result in results)
+        print(f"  {workers:>3} workers: {seconds:8.2f} s  {args.scenarios / seconds:8.2f} scenarios/s  "
+              f"speed-up {baseline / seconds:5.2f}x  (best: {results[0].name}, {results[0].mileage:.1f} mi"
+              f"{f', {failed} failed' if failed else ''})")
+
+
+if __name__ == '__main__':
+    main()
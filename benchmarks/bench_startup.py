@@ -0,0 +1,152 @@
+"""
+Time gunicorn startup and measure worker memory with and without preloading the plan.
+
+For each worker count the server is started from gunicorn.conf.py twice: once
+with the plan built in the master and shared by the forked workers, once with
+every worker building its own. The suite reports the time until the first
+request is answered, the time until every worker has stopped growing, and the
+memory per worker after a round of status queries: RSS, USS (pages only that
+worker holds) and the fleet's total PSS (shared pages split between the
+processes that map them). Needs gunicorn and Linux /proc. Run from the
+repository root:
+
+    python benchmarks/bench_startup.py [--workers 1 4 16] [--packages 5000] [--locations 300]
+"""
+
+import argparse
+import math
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_data import generate_dataset
+
+CAPACITY = 16
+TRUCK_SLACK = 1.15
+STARTUP_TIMEOUT = 600.0
+POLL_SECONDS = 0.02
+SETTLE_SECONDS = 0.5  # A worker whose RSS has not changed for this long is done loading
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            response.read()
+            return response.status
+    except (urllib.error.URLError, ConnectionError):
+        return None
+
+
+def workers_of(master_pid):
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as children:
+        return [int(pid) for pid in children.read().split()]
+
+
+def memory_kb(pid):
+    """RSS, USS and PSS of a process in kB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields['Rss'], fields['Private_Clean'] + fields['Private_Dirty'], fields['Pss']
+
+
+def run(worker_count, preload, data_dir, truck_count):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    environment = dict(os.environ, WGUPS_BIND=f"127.0.0.1:{port}", WGUPS_WORKERS=str(worker_count),
+                       WGUPS_PRELOAD='1' if preload else '0', WGUPS_DATA_DIR=data_dir,
+                       WGUPS_TRUCKS=str(truck_count), WGUPS_CAPACITY=str(CAPACITY), WGUPS_DRIVERS=str(truck_count))
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], cwd=ROOT,
+                              env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while get(f"{base}/api/total-mileage") != 200:
+            if server.poll() is not None or time.perf_counter() - start > STARTUP_TIMEOUT:
+                raise RuntimeError(f"gunicorn did not start ({worker_count} workers, preload={preload})")
+            time.sleep(POLL_SECONDS)
+        first_request = time.perf_counter() - start
+
+        # Every worker has loaded once they are all running and none is still growing
+        stable_since = None
+        last = None
+        while True:
+            workers = workers_of(server.pid)
+            sizes = [memory_kb(pid)[0] for pid in workers]
+            now = time.perf_counter()
+            if len(workers) == worker_count and sizes == last:
+                if stable_since is None:
+                    stable_since = now
+                elif now - stable_since >= SETTLE_SECONDS:
+                    break
+            else:
+                stable_since = None
+            last = sizes
+            time.sleep(0.1)
+        settled = stable_since - start
+
+        # Touch the plan from every worker the way clients would before measuring
+        for minute in range(8 * 60, 17 * 60, 10):
+            for _ in range(worker_count):
+                get(f"{base}/api/packages/status?time={minute // 60}:{minute % 60:02d}&format=columns")
+
+        workers = workers_of(server.pid)
+        memory = [memory_kb(pid) for pid in workers]
+        total_pss = memory_kb(server.pid)[2] + sum(pss for _, _, pss in memory)
+        return {
+            'first_request': first_request,
+            'settled': settled,
+            'rss': sum(rss for rss, _, _ in memory) / len(memory),
+            'uss': sum(uss for _, uss, _ in memory) / len(memory),
+            'total_pss': total_pss,
+        }
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--packages', type=int, default=5000)
+    parser.add_argument('--locations', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=12172824)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'wgups-bench-data'))
+    args = parser.parse_args()
+
+    directory = os.path.join(args.data_dir, f"{args.packages}x{args.locations}-{args.seed}")
+    generate_dataset(directory, args.packages, args.locations, args.seed)
+    truck_count = math.ceil(args.packages / CAPACITY * TRUCK_SLACK)
+    print(f"{args.packages} packages, {args.locations} locations, {truck_count} trucks")
+    print(f"  {'workers':>7} {'mode':<10} {'first req s':>11} {'settled s':>9} {'RSS/worker MB':>13} "
+          f"{'USS/worker MB':>13} {'total PSS MB':>12}")
+    for worker_count in args.workers:
+        for preload in (True, False):
+            result = run(worker_count, preload, directory, truck_count)
+            print(f"  {worker_count:>7} {'preload' if preload else 'per-worker':<10} {result['first_request']:>11.2f} "
+                  f"{result['settled']:>9.2f} {result['rss'] / 1024:>13.1f} {result['uss'] / 1024:>13.1f} "
+                  f"{result['total_pss'] / 1024:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
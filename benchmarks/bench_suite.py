@@ -0,0 +1,192 @@
+"""
+Time the whole pipeline on synthetic data at several sizes and save the results as JSON.
+
+For each size the suite generates (or reuses) a data set with generate_data.py,
+then times loading, constraint compilation, hash table lookups, truck
+assignment, the simulation, status queries, API serialization (row and
+columnar, plain and compressed) and filtered package queries. Distances are timed both parsed from the CSV and memory-mapped
+from the compiled cache, and the shortest-path closure (Floyd-Warshall) on its own.
+Results are written to benchmarks/results/ so runs can be compared across versions.
+Run from the repository root:
+
+    python benchmarks/bench_suite.py [--sizes 1000:100 10000:500 100000:2000] [--output results.json]
+"""
+
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app as api
+from assignment import assign_packages
+from constraints import compile_constraints
+from distance_matrix import load_distance_matrix, np
+from generate_data import generate_dataset
+from hash_table import ChainingHashTable
+from main import load_address_data, load_distance_data, load_package_data
+from package_store import PackageStore
+from plan_snapshot import PlanSnapshot
+from shortest_paths import floyd_warshall
+from simulation import simulate_day
+from timeline import build_timeline
+
+DEFAULT_SIZES = ['1000:100', '10000:500', '100000:2000']
+CAPACITY = 16
+TRUCK_SLACK = 1.15  # Trucks per full load, so the solver has room to balance deadlines
+
+
+class PhaseTimer:
+    """Collects wall-clock seconds per named phase."""
+
+    def __init__(self):
+        self.phases = {}
+
+    def __call__(self, name, function, *args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.phases[name] = round(time.perf_counter() - start, 6)
+        print(f"    {name:<24} {self.phases[name]:10.3f} s")
+        return result
+
+
+def parse_size(text):
+    packages, _, locations = text.partition(':')
+    return int(packages), int(locations or max(27, int(packages) // 20))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def install_into_app(package_store, constraints, paths, address_index, plan, result, timeline):
+    """Serve an already simulated day from the Flask app, as initialize_data would."""
+    api.install_plan(PlanSnapshot(package_store, constraints, paths.distances, address_index, plan, result,
+                                  timeline, paths))
+
+
+def run_size(package_count, location_count, data_root, seed, queries):
+    """
+    Run every phase for one data size.
+
+    Returns:
+        dict: Size, phase timings and summary figures
+    """
+    print(f"\n{package_count} packages, {location_count} locations")
+    directory = os.path.join(data_root, f"{package_count}x{location_count}-{seed}")
+    timer = PhaseTimer()
+    files = {
+        'packages': os.path.join(directory, 'WGUPS_Package_File.csv'),
+        'addresses': os.path.join(directory, 'WGUPS_Address_File.csv'),
+        'distances': os.path.join(directory, 'WGUPS_Distance_Table.csv'),
+    }
+    if not all(os.path.exists(path) for path in files.values()):
+        timer('generate', generate_dataset, directory, package_count, location_count, seed)
+
+    address_index = timer('load_addresses', load_address_data, files['addresses'])
+    package_store = PackageStore(ChainingHashTable())
+    load_report = timer('load_packages', load_package_data, files['packages'], package_store, address_index)
+    if load_report.unresolved or load_report.errors:
+        raise RuntimeError(f"{len(load_report.unresolved)} generated packages have unknown addresses, "
+                           f"{len(load_report.errors)} rows were skipped")
+    direct = timer('load_distances', load_distance_matrix, files['distances'], cache=False)
+    timer('shortest_paths', floyd_warshall, direct)
+    load_distance_data(files['distances'])  # Compile the caches if this data set has none yet
+    paths = timer('load_distances_cached', load_distance_data, files['distances'])
+    distance_matrix = paths.distances
+    constraints = timer('compile_constraints', compile_constraints, package_store)
+
+    rng = random.Random(seed)
+    lookup_ids = [rng.randrange(1, package_count + 1) for _ in range(queries)]
+    timer('hash_lookups', lambda: [package_store.lookup(package_id) for package_id in lookup_ids])
+
+    truck_count = math.ceil(package_count / CAPACITY * TRUCK_SLACK)
+    plan = timer('assign', assign_packages, package_store, constraints, address_index, distance_matrix,
+                 truck_count=truck_count, capacity=CAPACITY, driver_count=truck_count)
+    result = timer('simulate', simulate_day, plan, package_store, constraints, distance_matrix, address_index,
+                   driver_count=truck_count)
+    timeline = timer('build_timeline', build_timeline, result, package_store, constraints)
+
+    query_times = [datetime.timedelta(minutes=rng.randrange(7 * 60, 18 * 60)) for _ in range(queries)]
+    timer('status_queries', lambda: [timeline.status_at(package_id, query_time)
+                                     for package_id, query_time in zip(lookup_ids, query_times)])
+    snapshot_times = query_times[:100]
+    timer('fleet_snapshots', lambda: [(timeline.snapshot(query_time), timeline.status_counts(query_time))
+                                      for query_time in snapshot_times])
+
+    install_into_app(package_store, constraints, paths, address_index, plan, result, timeline)
+    client = api.app.test_client()
+    response = timer('api_status_cold', client.get, '/api/packages/status?time=10:00')
+    timer('api_status_cached', client.get, '/api/packages/status?time=10:00')
+    columns = timer('api_status_columns_cold', client.get, '/api/packages/status?time=10:00&format=columns')
+    compressed = timer('api_status_columns_gzip', client.get, '/api/packages/status?time=10:00&format=columns',
+                       headers={'Accept-Encoding': 'gzip'})  # Compresses the cached body once
+    timer('api_query_first', client.get, '/api/packages?truck=1&time=10:00')  # Builds the indexes it uses
+    timer('api_query_truck', client.get, '/api/packages?truck=2&time=10:00')
+    timer('api_query_page', client.get, f"/api/packages?status=delivered&time=12:00&cursor={package_count // 2}")
+
+    return {
+        'packages': package_count,
+        'locations': location_count,
+        'trucks': truck_count,
+        'phases': timer.phases,
+        'mileage': round(result.total_mileage, 1),
+        'late_minutes': round(plan.late_minutes, 1),
+        'events': len(result.events),
+        'response_bytes': len(response.data),
+        'columns_bytes': len(columns.data),
+        'columns_gzip_bytes': len(compressed.data),
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES,
+                        help='PACKAGES:LOCATIONS pairs (default: %(default)s); use 1000000:5000 for the largest run')
+    parser.add_argument('--queries', type=int, default=1000, help='Random lookups and status queries per size')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'wgups-bench-data'),
+                        help='Where generated data sets are kept between runs')
+    parser.add_argument('--output', help='JSON results file (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--seed', type=int, default=12172824)
+    args = parser.parse_args()
+
+    results = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__ if np is not None else None,
+        'platform': platform.platform(),
+        'sizes': [],
+    }
+    for size in args.sizes:
+        package_count, location_count = parse_size(size)
+        results['sizes'].append(run_size(package_count, location_count, args.data_dir, args.seed, args.queries))
+
+    output = args.output
+    if output is None:
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(ROOT, 'benchmarks', 'results', f"bench-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as results_file:
+        json.dump(results, results_file, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == '__main__':
+    main()
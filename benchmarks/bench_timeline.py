@@ -0,0 +1,143 @@
+"""
+Benchmark status-at-time queries on the delivery timeline against the original
+per-package recomputation.
+
+Builds a synthetic day (packages spread over trucks, some delayed on a flight),
+then answers random time queries both ways and checks the answers match.
+Run from the repository root:
+
+    python benchmarks/bench_timeline.py [--packages 40000] [--trucks 400] [--queries 10000]
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constraints import compile_constraints
+from hash_table import ChainingHashTable
+from package_store import PackageStore
+from simulation import (ARRIVAL, DELIVERY, DEPARTURE, FLIGHT_ARRIVAL, ROUTE_COMPLETE, Event,
+                        SimulatedTruck, SimulationResult)
+from timeline import build_timeline
+
+FLIGHT_TIME = datetime.timedelta(hours=9, minutes=5)
+
+
+def synthetic_day(package_count, truck_count, rng):
+    """
+    Build a package store and a simulation event log for a synthetic day.
+    Every tenth package is delayed until 9:05 and rides a truck leaving after it lands.
+    """
+    package_store = PackageStore(ChainingHashTable(initial_capacity=package_count * 2))
+    for package_id in range(1, package_count + 1):
+        notes = 'Delayed on flight---will not arrive to depot until 9:05 am' if package_id % 10 == 0 else ''
+        package_store.add(package_id, f"Address {package_id}", 'EOD', 'City', '84000', 1, notes)
+    constraints = compile_constraints(package_store)
+
+    loads = [[] for _ in range(truck_count)]
+    for package_id in range(1, package_count + 1):
+        loads[rng.randrange(truck_count)].append(package_id)
+
+    events = [Event(FLIGHT_TIME, FLIGHT_ARRIVAL, package_ids=tuple(range(10, package_count + 1, 10)), location=0)]
+    trucks = []
+    for truck_id, package_ids in enumerate(loads, start=1):
+        truck = SimulatedTruck(truck_id, package_ids)
+        trucks.append(truck)
+        delayed = any(package_id % 10 == 0 for package_id in package_ids)
+        departure = FLIGHT_TIME if delayed else datetime.timedelta(hours=8)
+        departure += datetime.timedelta(minutes=rng.randrange(0, 60))
+        events.append(Event(departure, DEPARTURE, truck_id, 0, tuple(package_ids)))
+        now = departure
+        for package_id in package_ids:
+            distance = round(rng.uniform(0.5, 3.0), 1)
+            now += datetime.timedelta(hours=distance / truck.speed)
+            truck.mileage += distance
+            events.append(Event(now, ARRIVAL, truck_id, package_id, distance=distance))
+            events.append(Event(now, DELIVERY, truck_id, package_id, (package_id,)))
+            package_store.lookup(package_id).departure_time = departure
+            package_store.lookup(package_id).delivery_time = now
+        events.append(Event(now, ROUTE_COMPLETE, truck_id))
+    events.sort(key=lambda event: event.time)
+    return package_store, constraints, SimulationResult(trucks, events)
+
+
+def legacy_status(package_id, package_data, query_time, constraints):
+    """The original get_package_status_at_time: rebuild the answer from timedeltas on every call."""
+    delayed_until = constraints.delayed_until(package_id)
+    if delayed_until is not None and query_time < delayed_until:
+        return "Delayed on flight"
+    departure_time = package_data.departure_time or datetime.timedelta(hours=8)
+    delivery_time = package_data.delivery_time or datetime.timedelta(hours=17)
+    if query_time < departure_time:
+        return "At the hub"
+    elif departure_time <= query_time < delivery_time:
+        return "En route"
+    return f"Delivered at {delivery_time}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--packages', type=int, default=40000, help='Number of packages')
+    parser.add_argument('--trucks', type=int, default=400, help='Number of trucks')
+    parser.add_argument('--queries', type=int, default=10000, help='Random time queries')
+    parser.add_argument('--fleet-sample', type=int, default=20,
+                        help='Whole-fleet queries timed with the original loop (it is slow)')
+    parser.add_argument('--seed', type=int, default=12172824)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    package_store, constraints, result = synthetic_day(args.packages, args.trucks, rng)
+    times = [datetime.timedelta(minutes=rng.randrange(7 * 60, 18 * 60)) for _ in range(args.queries)]
+    package_ids = [rng.randrange(1, args.packages + 1) for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    timeline = build_timeline(result, package_store, constraints)
+    build_seconds = time.perf_counter() - start
+
+    # Single-package queries
+    start = time.perf_counter()
+    legacy_answers = [legacy_status(package_id, package_store.lookup(package_id), query_time, constraints)
+                      for package_id, query_time in zip(package_ids, times)]
+    legacy_single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    timeline_answers = [timeline.status_at(package_id, query_time)
+                        for package_id, query_time in zip(package_ids, times)]
+    timeline_single = time.perf_counter() - start
+    assert legacy_answers == timeline_answers, "Timeline status differs from the original calculation"
+
+    # Whole-fleet queries: the original loop is timed on a sample and scaled up
+    sample = times[:args.fleet_sample]
+    start = time.perf_counter()
+    for query_time in sample:
+        legacy_fleet = [legacy_status(package.id, package, query_time, constraints) for package in package_store]
+    legacy_fleet_seconds = (time.perf_counter() - start) / len(sample) * args.queries
+
+    start = time.perf_counter()
+    for query_time in times:
+        snapshot = timeline.snapshot(query_time)
+        timeline.status_counts(query_time)
+    timeline_fleet = time.perf_counter() - start
+
+    snapshot = timeline.snapshot(sample[-1])
+    assert legacy_fleet == [timeline.describe(row, snapshot[row]) for row in range(len(package_store))], \
+        "Fleet snapshot differs from the original calculation"
+
+    print(f"Packages: {args.packages}, trucks: {args.trucks}, events: {len(result.events)}, "
+          f"queries: {args.queries}")
+    print(f"Timeline build:                      {build_seconds:8.3f} s")
+    print(f"Single package, original:            {legacy_single:8.3f} s")
+    print(f"Single package, timeline:            {timeline_single:8.3f} s "
+          f"({legacy_single / timeline_single:.1f}x)")
+    print(f"Whole fleet, original (estimated):   {legacy_fleet_seconds:8.3f} s")
+    print(f"Whole fleet, timeline:               {timeline_fleet:8.3f} s "
+          f"({legacy_fleet_seconds / timeline_fleet:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""
+Generate synthetic WGUPS package, address and distance files at any size.
+
+The files use the same layout as the sample CSVs and include every kind of
+Special Notes constraint (truck restrictions, flight delays, must-ship-with
+groups and wrong addresses with their corrections), so they load through
+main.py's loaders and compile_constraints unchanged. Run from the repository root:
+
+    python benchmarks/generate_data.py OUTPUT_DIR [--packages 100000] [--locations 1000]
+"""
+
+import argparse
+import csv
+import os
+import random
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, distances fall back to pure Python
+    np = None
+
+
+PACKAGE_FILE = 'WGUPS_Package_File.csv'
+ADDRESS_FILE = 'WGUPS_Address_File.csv'
+DISTANCE_FILE = 'WGUPS_Distance_Table.csv'
+
+CITIES = [
+    ('Salt Lake City', '841'),
+    ('West Valley City', '841'),
+    ('Millcreek', '841'),
+    ('Holladay', '841'),
+    ('Murray', '841'),
+]
+STREETS = ['Main St', 'State St', 'Canyon Rd', 'Lester St', 'Valley Central St', 'Taylorsville Blvd',
+           'Parkway Blvd', 'Dalton Ave S', 'Oakland Ave', 'Price Ave']
+DIRECTIONS = [('S', 'South'), ('E', 'East'), ('W', 'West'), ('N', 'North')]
+
+# Share of packages that get each kind of note
+TRUCK_NOTE_RATE = 0.02
+DELAYED_NOTE_RATE = 0.04
+GROUP_RATE = 0.01  # Share of packages that start a must-ship-with group of three
+WRONG_ADDRESS_RATE = 0.005
+PACKAGES_PER_RESTRICTED_TRUCK = 4  # Truck notes are spread so no truck is over-committed
+EARLY_DEADLINE_RATE = 0.25
+
+# Longest possible drive across the synthetic city, in miles
+CITY_SIZE = 15.0
+
+
+def make_addresses(location_count, rng):
+    """
+    Build unique street addresses; location 0 is the hub.
+
+    Returns:
+        list: (short form, long form) of each address, e.g. ("10 300 S", "10 300 South")
+    """
+    addresses = [('4001 South 700 East', '4001 South 700 East')]
+    seen = {addresses[0][0]}
+    while len(addresses) < location_count:
+        number = rng.randrange(100, 9999)
+        if rng.random() < 0.5:
+            short, long = DIRECTIONS[rng.randrange(len(DIRECTIONS))]
+            block = rng.randrange(1, 99) * 100
+            address = (f"{number} {block} {short}", f"{number} {block} {long}")
+        else:
+            street = STREETS[rng.randrange(len(STREETS))]
+            address = (f"{number} {street}", f"{number} {street}")
+        if address[0] not in seen:
+            seen.add(address[0])
+            addresses.append(address)
+    return addresses
+
+
+def write_addresses(path, addresses):
+    with open(path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['Location ID', 'Address'])
+        for location_id, (short, _) in enumerate(addresses):
+            writer.writerow([location_id, short])
+
+
+def write_distances(path, location_count, rng, chunk_rows=256):
+    """
+    Write a lower-triangular table of planar distances rounded to 0.1 miles.
+    Distinct locations are at least 0.1 miles apart, as in the sample table.
+    """
+    points = [(rng.uniform(0, CITY_SIZE), rng.uniform(0, CITY_SIZE)) for _ in range(location_count)]
+    with open(path, 'w', newline='') as csvfile:
+        if np is not None:
+            coordinates = np.array(points)
+            for start in range(0, location_count, chunk_rows):
+                block = coordinates[start:start + chunk_rows]
+                deltas = block[:, None, :] - coordinates[None, :, :]
+                distances = np.maximum(np.round(np.sqrt((deltas ** 2).sum(axis=2)), 1), 0.1)
+                lines = []
+                for offset, row in enumerate(distances):
+                    i = start + offset
+                    row = row[:i + 1]
+                    row[i] = 0.0
+                    lines.append(','.join(f"{value:.1f}" for value in row.tolist()))
+                csvfile.write('\n'.join(lines) + '\n')
+        else:
+            for i, (x1, y1) in enumerate(points):
+                row = [max(0.1, round(((x1 - x2) ** 2 + (y1 - y2) ** 2) ** 0.5, 1)) for x2, y2 in points[:i]]
+                csvfile.write(','.join(f"{value:.1f}" for value in row + [0.0]) + '\n')
+
+
+def write_packages(path, package_count, addresses, rng):
+    """
+    Write the package file with a mix of deadlines and Special Notes.
+
+    Returns:
+        dict: Number of packages carrying each kind of note
+    """
+    counts = {'truck': 0, 'delayed': 0, 'grouped': 0, 'wrong_address': 0}
+    group_members = {}  # Package ID -> other members of the group it belongs to
+    with open(path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['Package ID', 'Address', 'City', 'State', 'Zip', 'Deadline', 'Weight', 'Special Notes'])
+        for package_id in range(1, package_count + 1):
+            location_id = rng.randrange(1, len(addresses))
+            short, long = addresses[location_id]
+            address = long if rng.random() < 0.1 else short  # Exercise address normalization
+            city, zip_prefix = CITIES[location_id % len(CITIES)]
+            deadline = 'EOD'
+            notes = ''
+
+            roll = rng.random()
+            if package_id in group_members:
+                others = group_members.pop(package_id)
+                notes = f"Must be delivered with {others[0]} and {others[1]}"
+                counts['grouped'] += 1
+            elif roll < GROUP_RATE and package_id + 2 <= package_count:
+                members = [package_id, package_id + 1, package_id + 2]
+                for member in members[1:]:
+                    group_members[member] = [other for other in members if other != member]
+                notes = f"Must be delivered with {members[1]} and {members[2]}"
+                counts['grouped'] += 1
+            elif roll < GROUP_RATE + TRUCK_NOTE_RATE:
+                notes = f"Can only be on truck {counts['truck'] // PACKAGES_PER_RESTRICTED_TRUCK + 1}"
+                counts['truck'] += 1
+            elif roll < GROUP_RATE + TRUCK_NOTE_RATE + DELAYED_NOTE_RATE:
+                notes = 'Delayed on flight---will not arrive to depot until 9:05 am'
+                counts['delayed'] += 1
+            elif roll < GROUP_RATE + TRUCK_NOTE_RATE + DELAYED_NOTE_RATE + WRONG_ADDRESS_RATE:
+                corrected = addresses[rng.randrange(1, len(addresses))][0]
+                notes = f"Wrong address listed---corrected at 10:20 am to {corrected}"
+                counts['wrong_address'] += 1
+
+            if not notes and rng.random() < EARLY_DEADLINE_RATE:
+                deadline = '10:30 AM' if rng.random() < 0.9 else '9:00 AM'
+            writer.writerow([package_id, address, city, 'UT', f"{zip_prefix}{location_id % 100:02d}",
+                             deadline, rng.randrange(1, 100), notes])
+    return counts
+
+
+def generate_dataset(directory, package_count, location_count, seed=12172824):
+    """
+    Write a package, address and distance file into a directory.
+
+    Args:
+        directory (str): Output directory (created if missing)
+        package_count (int): Number of packages
+        location_count (int): Number of locations, including the hub
+        seed (int): Random seed; the same seed always writes the same files
+
+    Returns:
+        dict: Paths of the three files and the number of packages with each kind of note
+    """
+    if location_count < 2:
+        raise ValueError("location_count must include the hub and at least one delivery location")
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    addresses = make_addresses(location_count, rng)
+    paths = {
+        'packages': os.path.join(directory, PACKAGE_FILE),
+        'addresses': os.path.join(directory, ADDRESS_FILE),
+        'distances': os.path.join(directory, DISTANCE_FILE),
+    }
+    write_addresses(paths['addresses'], addresses)
+    write_distances(paths['distances'], location_count, rng)
+    notes = write_packages(paths['packages'], package_count, addresses, rng)
+    return dict(paths, notes=notes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('output', help='Directory for the generated CSV files')
+    parser.add_argument('--packages', type=int, default=100000, help='Number of packages')
+    parser.add_argument('--locations', type=int, default=1000, help='Number of locations, including the hub')
+    parser.add_argument('--seed', type=int, default=12172824)
+    args = parser.parse_args()
+
+    result = generate_dataset(args.output, args.packages, args.locations, args.seed)
+    print(f"Wrote {args.packages} packages and {args.locations} locations to {args.output}")
+    for kind, count in result['notes'].items():
+        print(f"  {kind}: {count} packages")
+
+
+if __name__ == '__main__':
+    main()
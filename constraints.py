@@ -0,0 +1,297 @@
+import datetime
+import re
+from array import array
+
+from metrics import PHASE_SECONDS
+from package_store import parse_deadline_minutes
+
+
+# Corrections for the sample WGUPS package file, whose "Wrong address listed" note does not say what the
+# right address is: package ID -> (time the correction is received, corrected address). Callers pass
+# these in only when loading that file
+SAMPLE_ADDRESS_CORRECTIONS = {
+    9: ('10:20 AM', '410 S State St'),
+}
+
+# Marker for "no constraint" in the integer columns
+NONE = -1
+
+# Per-row constraint columns
+_COLUMNS = ('delayed_minutes', 'required_trucks', 'group_ids', 'correction_minutes', 'corrected_address_codes',
+            'listed_address_codes')
+
+_TIME = r'(\d{1,2}:\d{2}\s*(?:[ap]\.?m\.?)?)'
+_CLOCK_PATTERN = re.compile(r'(\d{1,2}):(\d{2})\s*(?:([ap])\.?m\.?)?', re.IGNORECASE)
+_TRUCK_PATTERN = re.compile(r'can only be on truck\s*#?\s*(\d+)', re.IGNORECASE)
+_DELAYED_PATTERN = re.compile(r'delayed.*?until\s+' + _TIME, re.IGNORECASE)
+_WITH_PATTERN = re.compile(r'must be delivered with\s+(.+)', re.IGNORECASE)
+_WRONG_ADDRESS_PATTERN = re.compile(r'wrong address', re.IGNORECASE)
+_CORRECTION_PATTERN = re.compile(r'(?:corrected|updated)\D*?' + _TIME + r'.*?\bto\s+(.+?)\s*$', re.IGNORECASE)
+
+
+class ConstraintError(ValueError):
+    """Raised when a truck load breaks a package's special-notes constraints."""
+
+
+def _parse_time(text):
+    """Convert "9:05 am", "9:05am" or "9:05 a.m." style text into minutes after midnight."""
+    hour, minute, meridiem = _CLOCK_PATTERN.match(text.strip()).groups()
+    return parse_deadline_minutes(f"{hour}:{minute} {meridiem.upper() + 'M' if meridiem else ''}")
+
+
+def _minutes_to_time(minutes):
+    return datetime.timedelta(minutes=minutes)
+
+
+class PackageConstraints:
+    """
+    Special-notes constraints compiled into columns aligned with PackageStore rows.
+    Every query is a hash lookup for the row followed by one array read.
+    """
+
+    def __init__(self, package_store):
+        """
+        Create an empty constraint table for every package in the store.
+
+        Args:
+            package_store (PackageStore): Store whose rows the columns follow
+        """
+        self.package_store = package_store
+        rows = len(package_store)
+        self.delayed_minutes = array('h', [NONE]) * rows
+        self.required_trucks = array('i', [NONE]) * rows
+        self.group_ids = array('i', [NONE]) * rows
+        self.correction_minutes = array('h', [NONE]) * rows
+        self.corrected_address_codes = array('i', [NONE]) * rows
+        self.listed_address_codes = array('i', [NONE]) * rows
+        self.groups = []  # group ID -> sorted package IDs that must ship together
+        self.problems = []  # Notes that could not be applied, for reporting
+
+    def copy(self, package_store):
+        """
+        Copy the constraint columns for a copy of the package store.
+        Rows the new store has beyond this table's start with no constraints.
+
+        Args:
+            package_store (PackageStore): Store the copied columns follow
+
+        Returns:
+            PackageConstraints: Independent copy
+        """
+        clone = PackageConstraints.__new__(PackageConstraints)
+        clone.package_store = package_store
+        extra = len(package_store) - len(self.delayed_minutes)
+        for name in _COLUMNS:
+            column = getattr(self, name)
+            copied = array(column.typecode, column)
+            if extra > 0:
+                copied.extend(array(column.typecode, [NONE]) * extra)
+            setattr(clone, name, copied)
+        clone.groups = list(self.groups)
+        clone.problems = list(self.problems)
+        return clone
+
+    def _row(self, package_id):
+        row = self.package_store.row_of(package_id)
+        if row is None:
+            raise KeyError(package_id)
+        return row
+
+    def delayed_until(self, package_id):
+        """
+        Get the time a delayed package arrives at the hub.
+
+        Returns:
+            datetime.timedelta: Arrival time, or None if the package is not delayed
+        """
+        minutes = self.delayed_minutes[self._row(package_id)]
+        return None if minutes == NONE else _minutes_to_time(minutes)
+
+    def required_truck(self, package_id):
+        """
+        Get the only truck a package may be loaded on.
+
+        Returns:
+            int: Truck ID, or None if any truck is allowed
+        """
+        truck_id = self.required_trucks[self._row(package_id)]
+        return None if truck_id == NONE else truck_id
+
+    def group_members(self, package_id):
+        """
+        Get the packages that must be delivered together with this one.
+
+        Returns:
+            list: Package IDs in the group (including package_id), or [] if none
+        """
+        group_id = self.group_ids[self._row(package_id)]
+        return [] if group_id == NONE else self.groups[group_id]
+
+    def address_correction(self, package_id):
+        """
+        Get the address correction for a package listed with a wrong address.
+
+        Returns:
+            tuple: (time the correction is known, corrected address), or None
+        """
+        row = self._row(package_id)
+        minutes = self.correction_minutes[row]
+        if minutes == NONE:
+            return None
+        address = self.package_store.strings[self.corrected_address_codes[row]]
+        return _minutes_to_time(minutes), address
+
+    def listed_address(self, package_id):
+        """Get the address as originally listed in the package file."""
+        row = self._row(package_id)
+        code = self.listed_address_codes[row]
+        if code == NONE:
+            return self.package_store.view(row).address
+        return self.package_store.strings[code]
+
+    def delivery_address_at(self, package_id, query_time, current_address):
+        """
+        Get the address a package should be delivered to at a given time.
+
+        Args:
+            package_id (int): Package ID
+            query_time (datetime.timedelta): Time of the query
+            current_address (str): Address currently stored for the package
+
+        Returns:
+            str: Listed address before a pending correction, corrected address after
+        """
+        correction = self.address_correction(package_id)
+        if correction is None:
+            return current_address
+        correction_time, corrected_address = correction
+        if query_time < correction_time:
+            return self.listed_address(package_id)
+        return corrected_address
+
+    def check_truck_load(self, truck_id, package_ids, departure_time):
+        """
+        Check a truck load against truck restrictions, delays and groups.
+
+        Args:
+            truck_id (int): Truck the packages are loaded on
+            package_ids (list): Package IDs on the truck
+            departure_time (datetime.timedelta): Time the truck leaves the hub
+
+        Returns:
+            list: Human-readable descriptions of every broken constraint
+        """
+        violations = []
+        loaded = set(package_ids)
+        for package_id in package_ids:
+            row = self._row(package_id)
+            required = self.required_trucks[row]
+            if required != NONE and required != truck_id:
+                violations.append(f"Package {package_id} can only be on truck {required}, not truck {truck_id}")
+            delayed = self.delayed_minutes[row]
+            if delayed != NONE and departure_time is not None and departure_time < _minutes_to_time(delayed):
+                violations.append(f"Package {package_id} does not reach the hub until "
+                                  f"{_minutes_to_time(delayed)}, but truck {truck_id} leaves at {departure_time}")
+            group_id = self.group_ids[row]
+            if group_id != NONE:
+                missing = [member for member in self.groups[group_id] if member not in loaded]
+                if missing:
+                    violations.append(f"Package {package_id} must be delivered with {missing} on truck {truck_id}")
+        return violations
+
+
+@PHASE_SECONDS.timed('compile_constraints')
+def compile_constraints(package_store, corrections=None):
+    """
+    Parse every package's Special Notes once and compile them into PackageConstraints.
+
+    Recognized notes:
+        "Can only be on truck N"
+        "Delayed on flight---will not arrive to depot until H:MM am"
+        "Must be delivered with A, B and C"
+        "Wrong address listed" (optionally "... corrected at H:MM am to ADDRESS")
+
+    Args:
+        package_store (PackageStore): Store with the packages' notes loaded
+        corrections (dict): Package ID -> (time text, corrected address) for wrong-address
+                            notes that do not carry the correction themselves; without one,
+                            such a note is reported in problems
+
+    Returns:
+        PackageConstraints: Compiled constraint table
+    """
+    if corrections is None:
+        corrections = {}
+    constraints = PackageConstraints(package_store)
+    strings = package_store.strings
+
+    # Union-find over package IDs for "must be delivered with" notes
+    parent = {}
+
+    def find(package_id):
+        root = package_id
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while package_id != root:
+            parent[package_id], package_id = root, parent.get(package_id, package_id)
+        return root
+
+    for package in package_store:
+        notes = package.notes.strip()
+        if not notes:
+            continue
+        row = package.row
+        matched = False
+
+        truck_match = _TRUCK_PATTERN.search(notes)
+        if truck_match:
+            constraints.required_trucks[row] = int(truck_match.group(1))
+            matched = True
+
+        delayed_match = _DELAYED_PATTERN.search(notes)
+        if delayed_match:
+            constraints.delayed_minutes[row] = _parse_time(delayed_match.group(1))
+            matched = True
+
+        with_match = _WITH_PATTERN.search(notes)
+        if with_match:
+            parent.setdefault(package.id, package.id)
+            for other_id in map(int, re.findall(r'\d+', with_match.group(1))):
+                if other_id not in package_store:
+                    constraints.problems.append(
+                        f"Package {package.id}: must be delivered with unknown package {other_id}")
+                    continue
+                parent.setdefault(other_id, other_id)
+                parent[find(other_id)] = find(package.id)
+            matched = True
+
+        if _WRONG_ADDRESS_PATTERN.search(notes):
+            correction_match = _CORRECTION_PATTERN.search(notes)
+            if correction_match:
+                time_text, corrected_address = correction_match.groups()
+            elif package.id in corrections:
+                time_text, corrected_address = corrections[package.id]
+            else:
+                time_text = corrected_address = None
+                constraints.problems.append(
+                    f"Package {package.id}: wrong address listed but no correction is known")
+            if corrected_address is not None:
+                constraints.correction_minutes[row] = _parse_time(time_text)
+                constraints.corrected_address_codes[row] = strings.intern(corrected_address)
+                constraints.listed_address_codes[row] = strings.intern(package.address)
+            matched = True
+
+        if not matched:
+            constraints.problems.append(f"Package {package.id}: unrecognized note {notes!r}")
+
+    # Number the must-ship-with groups
+    members_by_root = {}
+    for package_id in parent:
+        members_by_root.setdefault(find(package_id), []).append(package_id)
+    for members in members_by_root.values():
+        group_id = len(constraints.groups)
+        constraints.groups.append(sorted(members))
+        for package_id in members:
+            constraints.group_ids[package_store.row_of(package_id)] = group_id
+
+    return constraints
@@ -0,0 +1,229 @@
+import csv
+import hashlib
+import os
+import tempfile
+
+from metrics import PHASE_SECONDS
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, fall back to pure Python storage
+    np = None
+
+
+# Compiled matrices are kept in this directory next to the distance CSV
+CACHE_DIRECTORY = '.distance_cache'
+
+# Bytes hashed per read when fingerprinting the distance CSV
+HASH_CHUNK_SIZE = 1 << 20
+
+
+class DistanceMatrixError(ValueError):
+    """Raised when a distance table is not a valid symmetric distance matrix."""
+
+
+class PyDistanceMatrix:
+    """
+    Pure-Python dense distance matrix used when NumPy is not installed.
+    Stores all n*n distances in one flat list and supports the same
+    matrix[i, j] and matrix[i] indexing as a 2D NumPy array.
+    """
+
+    def __init__(self, size, values):
+        """
+        Args:
+            size (int): Number of locations
+            values (list): Row-major list of size*size distances
+        """
+        self.size = size
+        self.values = values
+        self.shape = (size, size)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            from_index, to_index = key
+            return self.values[from_index * self.size + to_index]
+        start = key * self.size
+        return self.values[start:start + self.size]
+
+    def __len__(self):
+        return self.size
+
+    def tolist(self):
+        return [self[i] for i in range(self.size)]
+
+
+def read_distance_rows(filename):
+    """
+    Read the raw distance table, keeping blank cells as None.
+
+    Args:
+        filename (str): Path to the distance CSV file
+
+    Returns:
+        list: Ragged list of rows (lower-triangular files have short rows)
+    """
+    rows = []
+    with open(filename, 'r') as csvfile:
+        reader = csv.reader(csvfile)
+        for row in reader:
+            rows.append([float(cell) if cell.strip() else None for cell in row])
+    return rows
+
+
+def fill_symmetric(rows):
+    """
+    Mirror a (possibly lower-triangular) distance table into a full square matrix.
+
+    A missing cell, or an off-diagonal 0.0 whose mirror is non-zero, takes the
+    value from the other triangle. The result is checked for symmetry and a
+    zero diagonal.
+
+    Args:
+        rows (list): Rows from read_distance_rows
+
+    Returns:
+        tuple: (values, size) where values is a row-major list of size*size distances
+
+    Raises:
+        DistanceMatrixError: If the table is not square, asymmetric, or has a
+                             non-zero diagonal or a missing pair
+    """
+    size = len(rows)
+    for i, row in enumerate(rows):
+        if len(row) > size:
+            raise DistanceMatrixError(f"Row {i} has {len(row)} columns for {size} locations")
+
+    def cell(i, j):
+        row = rows[i]
+        return row[j] if j < len(row) else None
+
+    values = [0.0] * (size * size)
+    for i in range(size):
+        if cell(i, i) not in (None, 0.0):
+            raise DistanceMatrixError(f"Distance from location {i} to itself is {cell(i, i)}, expected 0")
+        for j in range(i):
+            lower = cell(i, j)
+            upper = cell(j, i)
+            if lower is None or (lower == 0.0 and upper):
+                lower = upper
+            if upper is None or (upper == 0.0 and lower):
+                upper = lower
+            if lower is None:
+                raise DistanceMatrixError(f"No distance between locations {i} and {j}")
+            if lower != upper:
+                raise DistanceMatrixError(
+                    f"Distance between locations {i} and {j} is not symmetric ({lower} vs {upper})")
+            values[i * size + j] = lower
+            values[j * size + i] = lower
+    return values, size
+
+
+def file_digest(filename):
+    """Get the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as source:
+        for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_path(filename, dtype='float64', cache_dir=None, variant=None, digest=None):
+    """
+    Get the compiled .npy path for a distance CSV.
+
+    The name embeds a hash of the CSV's contents, so an edited CSV maps to a
+    new file and a stale matrix is never loaded.
+
+    Args:
+        filename (str): Path to the distance CSV file
+        dtype (str): NumPy dtype of the compiled matrix
+        cache_dir (str): Cache directory (default: CACHE_DIRECTORY next to the CSV)
+        variant (str): Name of a matrix derived from the CSV, kept under its own path
+        digest (str): file_digest() of the CSV, when the caller already has it
+
+    Returns:
+        str: Path of the compiled matrix for the CSV's current contents
+    """
+    if digest is None:
+        digest = file_digest(filename)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(filename)), CACHE_DIRECTORY)
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    if variant:
+        stem = f"{stem}.{variant}"
+    return os.path.join(cache_dir, f"{stem}-{digest[:16]}-{np.dtype(dtype).name}.npy")
+
+
+def write_cache(path, matrix):
+    """
+    Save a compiled matrix atomically and remove older compilations of the same CSV.
+    Concurrent writers each save a temporary file and rename it into place, so a
+    reader never maps a partly written file.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as cache_file:
+            np.save(cache_file, matrix)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+    # Older compilations carry the same stem and dtype but a different hash
+    current = os.path.basename(path)
+    prefix, digest, suffix = current.rsplit('-', 2)
+    for name in os.listdir(directory):
+        parts = name.rsplit('-', 2)
+        if name != current and len(parts) == 3 and parts[0] == prefix and parts[2] == suffix \
+                and len(parts[1]) == len(digest):
+            try:
+                os.unlink(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+@PHASE_SECONDS.timed('load_distances')
+def load_distance_matrix(filename, dtype='float64', use_numpy=True, cache=True, cache_dir=None, digest=None):
+    """
+    Load the distance table into a dense, mirrored matrix.
+
+    With NumPy, the parsed matrix is compiled to a .npy file keyed by the
+    CSV's content hash and later loads memory-map it instead of parsing text.
+    Mapped pages are shared by every process that loads the same file, so
+    several workers hold one physical copy. The CSV is only parsed again when
+    its contents change.
+
+    Args:
+        filename (str): Path to the distance CSV file
+        dtype (str): NumPy dtype for the matrix ('float64' or 'float32')
+        use_numpy (bool): Set False to force the pure-Python fallback
+        cache (bool): Set False to always parse the CSV and skip the compiled cache
+        cache_dir (str): Where compiled matrices are kept (default: CACHE_DIRECTORY next to the CSV)
+        digest (str): file_digest() of the CSV, when the caller already has it
+
+    Returns:
+        numpy.ndarray or PyDistanceMatrix: size x size matrix indexed as matrix[i, j]
+    """
+    use_numpy = use_numpy and np is not None
+    path = cache_path(filename, dtype, cache_dir, digest=digest) if use_numpy and cache else None
+    if path is not None and os.path.exists(path):
+        try:
+            return np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            pass  # Unreadable or truncated cache, rebuild it below
+
+    values, size = fill_symmetric(read_distance_rows(filename))
+    if not use_numpy:
+        return PyDistanceMatrix(size, values)
+    matrix = np.array(values, dtype=dtype).reshape(size, size)
+    matrix.setflags(write=False)
+    if path is not None:
+        try:
+            write_cache(path, matrix)
+            return np.load(path, mmap_mode='r')
+        except OSError:
+            pass  # Read-only location, keep the in-memory matrix
+    return matrix
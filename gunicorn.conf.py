@@ -0,0 +1,50 @@
+"""
+Gunicorn settings for serving the API from several worker processes:
+
+    gunicorn -c gunicorn.conf.py
+
+The plan is built once in the master (preload_app) and the forked workers share
+it copy-on-write. Environment variables:
+
+    WGUPS_BIND      Address to listen on (default 127.0.0.1:5000)
+    WGUPS_WORKERS   Worker processes (default one per CPU)
+    WGUPS_THREADS   Threads per worker; every open live stream holds one (default 8)
+    WGUPS_PRELOAD   0 builds a separate plan in every worker instead
+    WGUPS_DATA_DIR  Directory with the three CSV files (default the repository root)
+    WGUPS_TRUCKS, WGUPS_CAPACITY, WGUPS_DRIVERS
+                    Fleet the plan is built for (default 3 trucks of 16 packages, 2 drivers)
+    WGUPS_ROUTING   Route construction, nearest_neighbor (default) or deadline_insertion
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('WGUPS_BIND', '127.0.0.1:5000')
+workers = int(os.environ.get('WGUPS_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('WGUPS_THREADS', 8))
+preload_app = os.environ.get('WGUPS_PRELOAD', '1') != '0'
+timeout = 120  # Without preloading a worker builds its plan before it answers its first request
+
+
+def _setting(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+wsgi_app = (f"app:create_app(data_dir={os.environ.get('WGUPS_DATA_DIR')!r}, trucks={_setting('WGUPS_TRUCKS')}, "
+            f"capacity={_setting('WGUPS_CAPACITY')}, drivers={_setting('WGUPS_DRIVERS')}, "
+            f"routing={os.environ.get('WGUPS_ROUTING', 'nearest_neighbor')!r})")
+
+
+def when_ready(server):
+    # Objects built while preloading live as long as the master; freezing them keeps the
+    # cyclic garbage collector from writing to (and so copying) their pages in every worker
+    if preload_app:
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    # A change applied by one worker would never reach the others' copies of the plan
+    worker.wsgi.config['PLAN_READ_ONLY'] = worker.cfg.workers > 1
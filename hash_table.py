@@ -2,19 +2,28 @@ class ChainingHashTable:
     """
     Custom hash table implementation using chaining for collision resolution.
     Designed specifically for WGUPS package data storage.
+    Automatically rehashes into a larger table once the load factor is exceeded.
     """
     
-    def __init__(self, initial_capacity=40):
+    def __init__(self, initial_capacity=40, max_load_factor=0.75):
         """
         Initialize hash table with specified capacity.
         Creates empty buckets (lists) for chaining collision resolution.
         
         Args:
             initial_capacity (int): Number of buckets in the hash table
+            max_load_factor (float): Items per bucket that triggers a resize
         """
+        if initial_capacity < 1:
+            raise ValueError("initial_capacity must be at least 1")
+        if max_load_factor <= 0:
+            raise ValueError("max_load_factor must be positive")
+        
         self.table = []
         for i in range(initial_capacity):
             self.table.append([])
+        self.max_load_factor = max_load_factor
+        self.count = 0
     
     def insert(self, key, value):
         """
@@ -37,6 +46,11 @@ class ChainingHashTable:
         
         # Key doesn't exist, append new key-value pair
         bucket.append([key, value])
+        self.count += 1
+        
+        # Grow the table so chains stay short
+        if self.count > self.max_load_factor * len(self.table):
+            self._resize(len(self.table) * 2)
     
     def lookup(self, key):
         """
@@ -44,7 +58,7 @@ class ChainingHashTable:
         
         Args:
             key: The package ID to search for
-            
+        
         Returns:
             The value (package details) if found, None otherwise
         """
@@ -58,4 +72,239 @@ class ChainingHashTable:
                 return key_value_pair[1]
         
         # Key not found
-        return None 
\ No newline at end of file
+        return None
+    
+    def delete(self, key):
+        """
+        Remove a key and its value from the hash table.
+
+        Args:
+            key: The package ID to remove
+
+        Returns:
+            bool: True if the key was present and removed, False otherwise
+        """
+        bucket = self.table[hash(key) % len(self.table)]
+        for i, key_value_pair in enumerate(bucket):
+            if key_value_pair[0] == key:
+                del bucket[i]
+                self.count -= 1
+                return True
+        return False
+
+    def items(self):
+        """
+        Iterate over all (key, value) pairs in the hash table.
+
+        Yields:
+            tuple: (key, value) for every stored entry
+        """
+        for bucket in self.table:
+            for key_value_pair in bucket:
+                yield key_value_pair[0], key_value_pair[1]
+
+    def _resize(self, new_capacity):
+        """
+        Rehash every entry into a table with new_capacity buckets.
+
+        Args:
+            new_capacity (int): Number of buckets in the new table
+        """
+        old_table = self.table
+        self.table = [[] for _ in range(new_capacity)]
+        for bucket in old_table:
+            for key_value_pair in bucket:
+                # Reuse the existing pair lists, no need to re-check for duplicates
+                self.table[hash(key_value_pair[0]) % new_capacity].append(key_value_pair)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        bucket = self.table[hash(key) % len(self.table)]
+        for key_value_pair in bucket:
+            if key_value_pair[0] == key:
+                return True
+        return False
+
+    def __iter__(self):
+        for bucket in self.table:
+            for key_value_pair in bucket:
+                yield key_value_pair[0]
+
+
+# Slot markers for OpenAddressingHashTable
+_EMPTY = object()
+_DELETED = object()
+
+
+class OpenAddressingHashTable:
+    """
+    Hash table using open addressing with linear probing.
+    Keys, values and cached hashes live in flat parallel lists, so a probe
+    walks neighbouring slots instead of following per-bucket lists.
+    Drop-in replacement for ChainingHashTable (same insert/lookup API).
+    """
+
+    def __init__(self, initial_capacity=40, max_load_factor=0.6):
+        """
+        Initialize hash table with at least the specified capacity.
+        Capacity is rounded up to a power of two so probing can use a bit mask.
+
+        Args:
+            initial_capacity (int): Minimum number of slots in the hash table
+            max_load_factor (float): Fraction of used slots that triggers a resize
+        """
+        if initial_capacity < 1:
+            raise ValueError("initial_capacity must be at least 1")
+        if not 0 < max_load_factor < 1:
+            raise ValueError("max_load_factor must be between 0 and 1")
+
+        capacity = 8
+        while capacity < initial_capacity:
+            capacity *= 2
+        self.max_load_factor = max_load_factor
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        """Reset the parallel slot arrays to an empty table of the given capacity."""
+        self._mask = capacity - 1
+        self._keys = [_EMPTY] * capacity
+        self._values = [None] * capacity
+        self._hashes = [0] * capacity
+        self.count = 0
+        self._used = 0  # Live entries plus tombstones
+
+    def _find_slot(self, key, key_hash):
+        """
+        Probe for key starting at its home slot.
+
+        Returns:
+            tuple: (index, found) where index is the matching slot if found,
+                   otherwise the first reusable slot on the probe path
+        """
+        keys = self._keys
+        hashes = self._hashes
+        mask = self._mask
+        index = key_hash & mask
+        first_deleted = -1
+        while True:
+            slot_key = keys[index]
+            if slot_key is _EMPTY:
+                return (first_deleted if first_deleted >= 0 else index), False
+            if slot_key is _DELETED:
+                if first_deleted < 0:
+                    first_deleted = index
+            elif hashes[index] == key_hash and (slot_key is key or slot_key == key):
+                return index, True
+            index = (index + 1) & mask
+
+    def insert(self, key, value):
+        """
+        Insert or update a key-value pair in the hash table.
+
+        Args:
+            key: The package ID (used for hashing)
+            value: Package details (or row number) to store
+        """
+        key_hash = hash(key)
+        index, found = self._find_slot(key, key_hash)
+        if found:
+            self._values[index] = value
+            return
+
+        if self._keys[index] is _EMPTY:
+            self._used += 1
+        self._keys[index] = key
+        self._values[index] = value
+        self._hashes[index] = key_hash
+        self.count += 1
+
+        # Tombstones count towards the load so probe chains stay bounded
+        if self._used > self.max_load_factor * (self._mask + 1):
+            self._resize()
+
+    def lookup(self, key):
+        """
+        Retrieve value associated with given key.
+
+        Args:
+            key: The package ID to search for
+
+        Returns:
+            The value if found, None otherwise
+        """
+        index, found = self._find_slot(key, hash(key))
+        if found:
+            return self._values[index]
+        return None
+
+    def delete(self, key):
+        """
+        Remove a key and its value from the hash table.
+        The slot is marked as a tombstone so later probes continue past it.
+
+        Args:
+            key: The package ID to remove
+
+        Returns:
+            bool: True if the key was present and removed, False otherwise
+        """
+        index, found = self._find_slot(key, hash(key))
+        if not found:
+            return False
+        self._keys[index] = _DELETED
+        self._values[index] = None
+        self.count -= 1
+        return True
+
+    def items(self):
+        """
+        Iterate over all (key, value) pairs in the hash table.
+
+        Yields:
+            tuple: (key, value) for every stored entry
+        """
+        values = self._values
+        for index, key in enumerate(self._keys):
+            if key is not _EMPTY and key is not _DELETED:
+                yield key, values[index]
+
+    def _resize(self):
+        """Rehash live entries into a table sized for the current count, dropping tombstones."""
+        old_keys = self._keys
+        old_values = self._values
+        old_hashes = self._hashes
+
+        capacity = self._mask + 1
+        while self.count * 2 > self.max_load_factor * capacity:
+            capacity *= 2
+        self._allocate(capacity)
+
+        keys = self._keys
+        values = self._values
+        hashes = self._hashes
+        mask = self._mask
+        for old_index, key in enumerate(old_keys):
+            if key is _EMPTY or key is _DELETED:
+                continue
+            key_hash = old_hashes[old_index]
+            index = key_hash & mask
+            while keys[index] is not _EMPTY:
+                index = (index + 1) & mask
+            keys[index] = key
+            values[index] = old_values[old_index]
+            hashes[index] = key_hash
+            self.count += 1
+        self._used = self.count
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        return self._find_slot(key, hash(key))[1]
+
+    def __iter__(self):
+        for key in self._keys:
+            if key is not _EMPTY and key is not _DELETED:
+                yield key
\ No newline at end of file
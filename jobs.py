@@ -0,0 +1,165 @@
+import datetime
+import itertools
+import queue
+import threading
+import traceback
+from collections import OrderedDict
+
+from metrics import registry
+
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+# Finished jobs kept for status queries before the oldest is forgotten
+DEFAULT_HISTORY = 100
+
+JOBS_FINISHED = registry.counter('wgups_jobs_finished_total', "Background jobs finished, by final state", ('state',))
+
+
+class Job:
+    """
+    One unit of background work and its progress.
+    The worker thread writes the fields; readers take a consistent copy with to_dict().
+    """
+
+    __slots__ = ('id', 'description', 'function', 'state', 'phase', 'progress', 'result', 'error',
+                 'submitted_at', 'started_at', 'finished_at', '_lock', '_done')
+
+    def __init__(self, job_id, description, function):
+        self.id = job_id
+        self.description = description
+        self.function = function
+        self.state = QUEUED
+        self.phase = 'Waiting for the worker'
+        self.progress = 0.0  # Fraction of the work done, 0.0 to 1.0
+        self.result = None
+        self.error = None
+        self.submitted_at = datetime.datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def update(self, progress, phase):
+        """Report progress from inside the job function."""
+        with self._lock:
+            self.progress = max(0.0, min(1.0, progress))
+            self.phase = phase
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Block until the job finishes.
+
+        Returns:
+            bool: True if the job finished, False if the timeout ran out first
+        """
+        return self._done.wait(timeout)
+
+    def _run(self):
+        with self._lock:
+            self.state = RUNNING
+            self.started_at = datetime.datetime.now()
+        try:
+            result = self.function(self)
+        except Exception as e:
+            traceback.print_exc()
+            with self._lock:
+                self.state = FAILED
+                self.error = str(e) or e.__class__.__name__
+        else:
+            with self._lock:
+                self.state = SUCCEEDED
+                self.result = result
+                self.progress = 1.0
+                self.phase = 'Done'
+        finally:
+            with self._lock:
+                self.finished_at = datetime.datetime.now()
+                self.function = None  # Drop references held by the closure
+            JOBS_FINISHED.inc(self.state)
+            self._done.set()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'id': self.id,
+                'description': self.description,
+                'state': self.state,
+                'phase': self.phase,
+                'progress': round(self.progress, 3),
+                'result': self.result,
+                'error': self.error,
+                'submitted_at': self.submitted_at.isoformat(timespec='seconds'),
+                'started_at': self.started_at.isoformat(timespec='seconds') if self.started_at else None,
+                'finished_at': self.finished_at.isoformat(timespec='seconds') if self.finished_at else None,
+            }
+
+
+class JobQueue:
+    """
+    First-in, first-out queue of jobs run one at a time by a daemon worker thread.
+    Running jobs in order means two re-optimizations never race to publish their results.
+    """
+
+    def __init__(self, history=DEFAULT_HISTORY):
+        """
+        Args:
+            history (int): Finished jobs kept for get() before the oldest is dropped
+        """
+        self.history = history
+        self._jobs = OrderedDict()
+        self._pending = queue.Queue()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._worker = None
+
+    def submit(self, function, description=''):
+        """
+        Queue a job. The worker thread is started on first use.
+
+        Args:
+            function (callable): Called with the Job, so it can report progress with job.update();
+                                 its return value (JSON-serializable) becomes job.result
+            description (str): Shown in status responses
+
+        Returns:
+            Job: The queued job
+        """
+        with self._lock:
+            job = Job(next(self._ids), description, function)
+            self._jobs[job.id] = job
+            self._trim()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._work, name='job-worker', daemon=True)
+                self._worker.start()
+        self._pending.put(job)
+        return job
+
+    def get(self, job_id):
+        """Get a job by ID, or None if it is unknown or has been forgotten."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """Get the known jobs, oldest first."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def _work(self):
+        while True:
+            job = self._pending.get()
+            job._run()
+            self._pending.task_done()
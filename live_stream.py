@@ -0,0 +1,229 @@
+import bisect
+import datetime
+import json
+import queue
+import threading
+import time
+
+
+# Simulated seconds per wall-clock second unless the client asks for another speed
+DEFAULT_SPEED = 60.0
+MAX_SPEED = 3600.0
+
+# Wall-clock seconds between deltas; each delta carries every change since the previous one
+DEFAULT_TICK = 1.0
+MIN_TICK = 0.1
+
+# Frames buffered per client; a client that falls this far behind is sent a fresh snapshot instead
+CLIENT_QUEUE_SIZE = 64
+
+
+def format_event(kind, payload):
+    """Serialize one Server-Sent Events message."""
+    return f"event: {kind}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n".encode()
+
+
+def _clock(seconds):
+    return str(datetime.timedelta(seconds=round(seconds)))
+
+
+class _Client:
+    """One connected stream: its pending frames and whether it must be resynchronized."""
+
+    __slots__ = ('frames', 'stale')
+
+    def __init__(self):
+        self.frames = queue.Queue(CLIENT_QUEUE_SIZE)
+        self.stale = False
+
+
+class Replay:
+    """
+    The day replayed from one plan on a shared simulated clock.
+
+    A single thread advances the clock every tick, gathers the status changes
+    since the previous tick from the plan's time-ordered transition index,
+    serializes them once and hands the same bytes to every client. Clients
+    joining mid-replay get a snapshot of the current minute, serialized once per
+    clock position however many clients join there, followed by the deltas.
+    """
+
+    def __init__(self, plan, speed=DEFAULT_SPEED, start=8 * 3600.0, tick=DEFAULT_TICK, on_idle=None):
+        """
+        Args:
+            plan (PlanSnapshot): Plan whose day is replayed
+            speed (float): Simulated seconds per wall-clock second
+            start (float): Simulated start time in seconds after midnight
+            tick (float): Wall-clock seconds between deltas
+            on_idle (callable): Called with this replay once it has stopped
+        """
+        self.plan = plan
+        self.speed = speed
+        self.start = start
+        self.tick = tick
+        self.on_idle = on_idle
+        self.times, self.rows, self.codes = plan.indexes.transitions()
+        self.end = self.times[-1] if self.times else start
+        self.clock = start
+        self._position = bisect.bisect_right(self.times, start)
+        self._clients = []
+        self._snapshot = None  # (position, serialized snapshot) for clients joining at that position
+        self._lock = threading.Lock()
+        self._thread = None
+        self.finished = False
+
+    def _snapshot_frame(self):
+        """Snapshot of every package at the current clock, cached for the current position."""
+        if self._snapshot is None or self._snapshot[0] != self._position:
+            timeline = self.plan.timeline
+            codes = timeline.snapshot(self.clock)
+            ids = self.plan.package_store.ids
+            packages = [{'id': ids[row], 'status': timeline.describe(row, codes[row])}
+                        for row in self.plan.indexes.rows_by_id()]
+            payload = {'time': _clock(self.clock), 'plan_version': self.plan.version, 'speed': self.speed,
+                       'packages': packages, 'status_counts': timeline.status_counts(self.clock)}
+            self._snapshot = (self._position, format_event('snapshot', payload))
+        return self._snapshot[1]
+
+    def subscribe(self):
+        """
+        Add a client. Its first frame is a snapshot at the current clock.
+
+        Returns:
+            _Client: Handle for frames() and unsubscribe()
+        """
+        client = _Client()
+        with self._lock:
+            if self.finished:
+                client.frames.put_nowait(self._end_frame())
+                client.frames.put_nowait(None)
+                return client
+            client.frames.put_nowait(self._snapshot_frame())
+            self._clients.append(client)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='replay', daemon=True)
+                self._thread.start()
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+
+    def frames(self, client):
+        """Yield a client's frames until the replay ends; stops early if the client is dropped."""
+        try:
+            while True:
+                try:
+                    frame = client.frames.get(timeout=max(self.tick * 5, 15.0))
+                except queue.Empty:
+                    yield b": keep-alive\n\n"
+                    continue
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self.unsubscribe(client)
+
+    def _end_frame(self):
+        return format_event('end', {'time': _clock(self.clock), 'plan_version': self.plan.version})
+
+    def _delta(self, position):
+        """Serialize the changes between the current position and a later one, latest status per package."""
+        latest = {}
+        for index in range(self._position, position):
+            latest[self.rows[index]] = self.codes[index]
+        timeline = self.plan.timeline
+        ids = self.plan.package_store.ids
+        changes = sorted(({'id': ids[row], 'status': timeline.describe(row, code)} for row, code in latest.items()),
+                         key=lambda change: change['id'])
+        return format_event('delta', {'time': _clock(self.clock), 'changes': changes,
+                                      'status_counts': timeline.status_counts(self.clock)})
+
+    def _publish(self, frame):
+        for client in self._clients:
+            if client.stale:
+                continue
+            try:
+                client.frames.put_nowait(frame)
+            except queue.Full:
+                client.stale = True
+
+    def _resync(self):
+        """Replace the backlog of clients that fell behind with a snapshot."""
+        for client in self._clients:
+            if client.stale:
+                with client.frames.mutex:
+                    client.frames.queue.clear()
+                client.frames.put_nowait(self._snapshot_frame())
+                client.stale = False
+
+    def _close(self):
+        """Send every client the end of the day, dropping a backlog that leaves no room for it."""
+        frame = self._end_frame()
+        for client in self._clients:
+            with client.frames.mutex:
+                if client.frames.maxsize - len(client.frames.queue) < 2:
+                    client.frames.queue.clear()
+            client.frames.put_nowait(frame)
+            client.frames.put_nowait(None)
+
+    def _run(self):
+        wall_start = time.monotonic()
+        clock_start = self.clock  # Picks up where a previous run stopped if clients left and came back
+        while True:
+            time.sleep(self.tick)
+            with self._lock:
+                if not self._clients:
+                    self._thread = None
+                    break
+                self.clock = min(self.end, clock_start + (time.monotonic() - wall_start) * self.speed)
+                position = bisect.bisect_right(self.times, self.clock)
+                self._publish(self._delta(position))
+                self._position = position
+                self._resync()
+                if self.clock >= self.end:
+                    self.finished = True
+                    self._close()
+                    self._thread = None
+                    break
+        if self.on_idle is not None:
+            self.on_idle(self)
+
+
+class ReplayHub:
+    """
+    Replays shared by every client asking for the same plan, speed, start and tick.
+    A replay starts with its first client and is dropped once it has no clients or the day is over.
+    """
+
+    def __init__(self):
+        self._replays = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, plan, speed=DEFAULT_SPEED, start=8 * 3600.0, tick=DEFAULT_TICK):
+        """
+        Join the replay for these settings, starting it if needed.
+
+        Returns:
+            tuple: (Replay, client handle)
+        """
+        key = (plan.version, speed, start, tick)
+        with self._lock:
+            replay = self._replays.get(key)
+            if replay is None or replay.finished:
+                replay = Replay(plan, speed, start, tick, on_idle=self._forget)
+                self._replays[key] = replay
+            return replay, replay.subscribe()
+
+    def _forget(self, replay):
+        with self._lock:
+            key = (replay.plan.version, replay.speed, replay.start, replay.tick)
+            if self._replays.get(key) is replay:
+                del self._replays[key]
+
+    def stats(self):
+        """Count the running replays and their clients."""
+        with self._lock:
+            replays = list(self._replays.values())
+        return {'replays': len(replays), 'clients': sum(len(replay._clients) for replay in replays)}
@@ -1,71 +1,67 @@
 # Student ID: 012172824
 
+import argparse
+import cProfile
 import csv
 import datetime
+from address_index import AddressIndex, UnknownAddressError
+from assignment import AssignmentError, assign_packages
+from constraints import SAMPLE_ADDRESS_CORRECTIONS, ConstraintError, compile_constraints
 from hash_table import ChainingHashTable
+from metrics import PHASE_SECONDS, registry, set_enabled
+from package_loader import stream_package_data
+from package_store import PackageStore
+from routing import NEAREST_NEIGHBOR, ROUTING_MODES
+from scenarios import load_scenarios, run_scenarios
+from shortest_paths import expand_legs, load_shortest_paths
+from simulation import ADDRESS_CORRECTION, DEPARTURE, FLIGHT_ARRIVAL, ROUTE_COMPLETE, simulate_day
+from timeline import build_timeline
 
 
-def load_package_data(filename, hash_table):
+def load_package_data(filename, package_store, address_index):
     """
-    Load package data from CSV file into the hash table.
+    Load package data from CSV file into the package store.
+    The file is streamed in fixed-size chunks through a validating generator
+    pipeline (see package_loader.py), so parsing memory stays flat for any file size.
+    Each package's location ID is resolved once here and stored with the package.
     
     Args:
         filename (str): Path to the package CSV file
-        hash_table (ChainingHashTable): Hash table instance to store data
+        package_store (PackageStore): Columnar store whose hash table maps package IDs to rows
+        address_index (AddressIndex): Index used to resolve delivery addresses
+        
+    Returns:
+        LoadReport: Rows loaded and rows per second, plus the (package ID, address) pairs
+                    whose address matched no known location and any rows that were skipped
     """
-    with open(filename, 'r') as csvfile:
-        reader = csv.reader(csvfile)
-        next(reader)  # Skip header row
-        for row in reader:
-            package_id = int(row[0])
-            # Create package data list: [address, deadline, city, zip, weight, status, departure_time, delivery_time]
-            package_data = [
-                row[1],  # address
-                row[5],  # deadline
-                row[2],  # city
-                row[4],  # zip
-                row[6],  # weight
-                "At the hub",  # initial status
-                None,  # departure_time (to be set later)
-                None   # delivery_time (to be set later)
-            ]
-            hash_table.insert(package_id, package_data)
+    return stream_package_data(filename, package_store, address_index)
 
 
 def load_distance_data(filename):
     """
-    Load distance data from CSV file into a 2D matrix.
+    Load distance data from CSV file into a dense symmetric matrix and its shortest-path closure.
+    The missing triangle is mirrored once here, so lookups never need to.
+    Both are compiled to memory-mapped .npy files that are reused until the CSV changes.
     
     Args:
         filename (str): Path to the distance CSV file
         
     Returns:
-        list: 2D list representing distance matrix
+        ShortestPaths: Shortest distances indexed as paths.distances[from, to], with next hops for waypoints
     """
-    distance_matrix = []
-    with open(filename, 'r') as csvfile:
-        reader = csv.reader(csvfile)
-        for row in reader:
-            # Convert string distances to float, handle empty cells
-            distance_row = []
-            for distance in row:
-                if distance.strip():
-                    distance_row.append(float(distance))
-                else:
-                    distance_row.append(0.0)
-            distance_matrix.append(distance_row)
-    return distance_matrix
+    return load_shortest_paths(filename)
 
 
+@PHASE_SECONDS.timed('load_addresses')
 def load_address_data(filename):
     """
-    Load address data from CSV file into a list.
+    Load address data from CSV file into an address index.
     
     Args:
         filename (str): Path to the address CSV file
         
     Returns:
-        list: List of addresses where index corresponds to location ID
+        AddressIndex: Normalized address lookup where location ID is the row order
     """
     addresses = []
     with open(filename, 'r') as csvfile:
@@ -74,48 +70,7 @@ def load_address_data(filename):
         for row in reader:
             # Address is in the second column (index 1)
             addresses.append(row[1])
-    return addresses
-
-
-class Truck:
-    """
-    Model for delivery trucks in the WGUPS system.
-    """
-    
-    def __init__(self, truck_id):
-        """
-        Initialize a truck with default values.
-        
-        Args:
-            truck_id (int): Unique identifier for the truck
-        """
-        self.id = truck_id
-        self.packages = []  # List of package IDs assigned to this truck
-        self.mileage = 0.0  # Total miles traveled
-        self.current_location = 0  # Current location index (0 = hub)
-        self.departure_time = None  # When truck leaves the hub
-        self.speed = 18  # Miles per hour
-
-
-def get_address_index(address, address_list):
-    """
-    Get the index of an address in the address list.
-    
-    Args:
-        address (str): Address to find
-        address_list (list): List of addresses
-        
-    Returns:
-        int: Index of the address, or 0 if not found
-    """
-    try:
-        return address_list.index(address)
-    except ValueError:
-        # If exact match not found, try partial matching
-        for i, addr in enumerate(address_list):
-            if address.lower() in addr.lower() or addr.lower() in address.lower():
-                return i
-        return 0  # Default to hub if not found
+    return AddressIndex(addresses)
 
 
 def get_distance(from_index, to_index, distance_matrix):
@@ -125,252 +80,261 @@ def get_distance(from_index, to_index, distance_matrix):
     Args:
         from_index (int): Starting location index
         to_index (int): Destination location index
-        distance_matrix (list): 2D distance matrix
+        distance_matrix (numpy.ndarray or PyDistanceMatrix): Mirrored distance matrix
         
     Returns:
         float: Distance between locations
     """
-    # Distance matrix is symmetric, so we can use either direction
-    if from_index < len(distance_matrix) and to_index < len(distance_matrix[from_index]):
-        distance = distance_matrix[from_index][to_index]
-        if distance == 0.0 and from_index != to_index:
-            # Try the other direction if one is 0
-            distance = distance_matrix[to_index][from_index]
-        return distance
-    return 0.0
+    return distance_matrix[from_index, to_index]
 
 
-def is_delayed_package(package_id):
+def is_delayed_package(package_id, constraints):
     """
     Check if a package is delayed on flight.
     
     Args:
         package_id (int): Package ID to check
+        constraints (PackageConstraints): Compiled special-notes constraints
         
     Returns:
         bool: True if package is delayed
     """
-    delayed_packages = [6, 25, 28, 32]
-    return package_id in delayed_packages
+    return constraints.delayed_until(package_id) is not None
 
 
-def get_package_address_at_time(package_id, package_data, query_time):
+def get_package_address_at_time(package_id, query_time, timeline):
     """
     Get the correct package address at a specific time.
-    Handles Package #9 wrong address constraint.
+    Handles wrong-address constraints (e.g. Package #9, corrected at 10:20 AM).
     
     Args:
         package_id (int): Package ID
-        package_data (list): Package data from hash table
         query_time (datetime.timedelta): Time to check address for
+        timeline (DeliveryTimeline): Timeline built from the simulation's event log
         
     Returns:
         str: Correct address at the given time
     """
-    if package_id == 9:
-        time_1020 = datetime.timedelta(hours=10, minutes=20)
-        if query_time < time_1020:
-            # Wrong address before 10:20 AM
-            return "300 State St"
-        else:
-            # Correct address after 10:20 AM
-            return "410 S State St"
-    return package_data[0]
+    return timeline.address_at(package_id, query_time)
 
 
-def get_package_status_at_time(package_id, package_data, query_time):
+def get_package_status_at_time(package_id, query_time, timeline):
     """
     Get package status at a specific time, accounting for special constraints.
+    The status is a bisect over the package's precomputed transition times.
     
     Args:
         package_id (int): Package ID
-        package_data (list): Package data from hash table
         query_time (datetime.timedelta): Time to check status for
+        timeline (DeliveryTimeline): Timeline built from the simulation's event log
         
     Returns:
         str: Package status at the given time
     """
-    # Check if package is delayed on flight
-    if is_delayed_package(package_id):
-        delayed_until = datetime.timedelta(hours=9, minutes=5)
-        if query_time < delayed_until:
-            return "Delayed on flight"
-    
-    departure_time = package_data[6] if package_data[6] else datetime.timedelta(hours=8)
-    delivery_time = package_data[7] if package_data[7] else datetime.timedelta(hours=17)
-    
-    if query_time < departure_time:
-        return "At the hub"
-    elif departure_time <= query_time < delivery_time:
-        return "En route"
-    else:
-        return f"Delivered at {delivery_time}"
-
-
-
+    return timeline.status_at(package_id, query_time)
 
 
-def get_package_truck_number(package_id, truck1, truck2, truck3):
+def get_package_truck_number(package_id, plan):
     """
     Get the truck number that a package is assigned to.
     
     Args:
         package_id (int): Package ID
-        truck1, truck2, truck3 (Truck): Truck objects
+        plan (AssignmentPlan): Truck assignment produced by assign_packages
         
     Returns:
-        int: Truck number (1, 2, or 3)
+        int: Truck number, or None if the package is not assigned
     """
-    if package_id in truck1.packages:
-        return 1
-    elif package_id in truck2.packages:
-        return 2
-    elif package_id in truck3.packages:
-        return 3
-    return None
+    return plan.truck_of(package_id)
 
 
-def deliver_packages(truck, package_hash_table, distance_matrix, address_list, current_time):
+def print_scenario_ranking(results):
     """
-    Implement nearest neighbor algorithm to deliver packages for a single truck.
+    Print scenario results as a ranked table, best first.
     
     Args:
-        truck (Truck): Truck object with packages to deliver
-        package_hash_table (ChainingHashTable): Hash table containing package data
-        distance_matrix (list): 2D distance matrix
-        address_list (list): List of addresses
-        current_time (datetime.timedelta): Current simulation time
-        
-    Returns:
-        datetime.timedelta: Time when truck finishes deliveries
+        results (list): ScenarioResult objects from run_scenarios
     """
-    truck_time = current_time
-    
-    # Set departure time for all packages on this truck
-    for package_id in truck.packages:
-        package_data = package_hash_table.lookup(package_id)
-        if package_data:
-            package_data[6] = truck_time  # Set departure_time
-    
-    # Continue until all packages are delivered
-    while truck.packages:
-        nearest_distance = float('inf')
-        nearest_package_id = None
-        nearest_package_index = None
-        
-        # Find the nearest undelivered package
-        for package_id in truck.packages:
-            package_data = package_hash_table.lookup(package_id)
-            if package_data:
-                package_address = package_data[0]  # address
-                
-                # Handle Package #9 constraint (wrong address until 10:20 AM)
-                if package_id == 9:
-                    time_1020 = datetime.timedelta(hours=10, minutes=20)
-                    if truck_time < time_1020:
-                        # Skip package 9 entirely if before 10:20 AM
-                        continue
-                    else:
-                        # Update to correct address after 10:20 AM
-                        package_data[0] = "410 S State St"
-                        package_address = package_data[0]
-                
-                # Get address index and calculate distance
-                package_index = get_address_index(package_address, address_list)
-                distance = get_distance(truck.current_location, package_index, distance_matrix)
-                
-                if distance < nearest_distance:
-                    nearest_distance = distance
-                    nearest_package_id = package_id
-                    nearest_package_index = package_index
-        
-        # Deliver the nearest package
-        if nearest_package_id is not None:
-            # Update truck mileage and location
-            truck.mileage += nearest_distance
-            truck.current_location = nearest_package_index
-            
-            # Calculate travel time and update current time
-            travel_time_hours = nearest_distance / truck.speed
-            travel_time = datetime.timedelta(hours=travel_time_hours)
-            truck_time += travel_time
-            
-            # Update package status to delivered
-            package_data = package_hash_table.lookup(nearest_package_id)
-            if package_data:
-                package_data[5] = "Delivered"  # status
-                package_data[7] = truck_time   # delivery_time
-            
-            # Remove package from truck
-            truck.packages.remove(nearest_package_id)
+    print(f"\n{'Rank':<5} {'Scenario':<24} {'Miles':>8} {'Late':>5} {'Late min':>9} {'Finish':>9} {'Seconds':>8}")
+    for rank, result in enumerate(results, 1):
+        if result.error is not None:
+            print(f"{rank:<5} {result.name:<24} failed: {result.error}")
+            continue
+        print(f"{rank:<5} {result.name:<24} {result.mileage:>8.1f} {result.violations:>5} "
+              f"{result.late_minutes:>9.1f} {str(result.finish_time):>9} {result.seconds:>8.2f}")
+        if result.late_packages:
+            print(f"      late packages: {result.late_packages}")
+
+
+def print_manifest(result, paths, address_index, hub=0):
+    """
+    Print each truck's driver manifest: its stops in order, and for every leg the
+    addresses driven through when going via them is shorter than the direct road.
+    
+    Args:
+        result (SimulationResult): Simulated day
+        paths (ShortestPaths): Shortest-path closure the routes were planned on
+        address_index (AddressIndex): Address lookup for location names
+        hub (int): Location ID every truck starts from
+    """
+    for truck in sorted(result.trucks, key=lambda truck: truck.id):
+        print(f"\nTruck {truck.id} manifest (departs {truck.departure_time}, driver {truck.driver}):")
+        for stop, (visit, path) in enumerate(expand_legs(truck.visits, paths, hub), 1):
+            print(f"  {stop:>2}. {str(visit.arrival_time):>8}  {address_index[visit.location]:<40} "
+                  f"{visit.distance:>5.1f} mi  packages {visit.package_ids}")
+            if len(path) > 2:
+                print(f"      via {' -> '.join(address_index[location] for location in path[1:-1])}")
+
+
+def print_profile(profiler=None, filename=None):
+    """
+    Print the time recorded for each phase and routing stage, and save the cProfile trace.
     
-    return truck_time
+    Args:
+        profiler (cProfile.Profile): Profiler to stop and save, or None
+        filename (str): Path the trace is written to
+    """
+    print(f"\n{'Phase':<32} {'Calls':>7} {'Total ms':>10} {'Mean ms':>10}")
+    for name, labels, count, total in registry.timings():
+        metric = name.removeprefix('wgups_').removesuffix('_seconds')
+        label = ' '.join(labels.values()) if metric == 'phase' else ' '.join([metric, *labels.values()])
+        print(f"{label:<32} {count:>7} {total * 1000:>10.2f} {total * 1000 / count:>10.3f}")
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(filename)
+        print(f"cProfile trace written to {filename} (view it with: python -m pstats {filename})")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WGUPS Routing Program")
+    parser.add_argument('--improve', action='store_true',
+                        help="improve nearest neighbor routes with 2-opt/Or-opt local search")
+    parser.add_argument('--time-budget', type=float, default=1.0,
+                        help="seconds of local search per truck (default: 1.0)")
+    parser.add_argument('--routing', choices=ROUTING_MODES, default=NEAREST_NEIGHBOR,
+                        help="route construction: nearest neighbor, or cheapest insertion that keeps deadlines "
+                             "(default: nearest_neighbor)")
+    parser.add_argument('--trucks', type=int, default=3, help="number of trucks (default: 3)")
+    parser.add_argument('--capacity', type=int, default=16, help="packages per truck (default: 16)")
+    parser.add_argument('--drivers', type=int, default=2, help="number of drivers (default: 2)")
+    parser.add_argument('--assign-budget', type=float, default=1.0,
+                        help="seconds spent improving the truck assignment (default: 1.0)")
+    parser.add_argument('--scenarios', metavar='FILE',
+                        help="run the what-if scenarios in a JSON file, print them ranked and exit")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes for --scenarios (default: one per CPU)")
+    parser.add_argument('--manifest', action='store_true',
+                        help="print each truck's stops with the addresses driven through on every leg")
+    parser.add_argument('--profile', nargs='?', const='', metavar='FILE',
+                        help="print the time spent in each phase; with FILE, also write a cProfile trace there")
+    args = parser.parse_args()
+    
+    # Profiling records metrics even when WGUPS_METRICS turns them off
+    profiler = None
+    if args.profile is not None:
+        set_enabled(True)
+        if args.profile:
+            profiler = cProfile.Profile()
+            profiler.enable()
+    
     print("WGUPS Routing Program")
     print("Initializing data structures...")
     
-    # Initialize hash table and load data
-    package_hash_table = ChainingHashTable()
+    # Initialize package store (hash table maps package IDs to rows) and load data
+    package_store = PackageStore(ChainingHashTable())
     
     # Load data from CSV files
     try:
-        load_package_data('WGUPS_Package_File.csv', package_hash_table)
-        distance_matrix = load_distance_data('WGUPS_Distance_Table.csv')
-        address_list = load_address_data('WGUPS_Address_File.csv')
+        address_index = load_address_data('WGUPS_Address_File.csv')
+        load_report = load_package_data('WGUPS_Package_File.csv', package_store, address_index)
+        constraints = compile_constraints(package_store, SAMPLE_ADDRESS_CORRECTIONS)
+        paths = load_distance_data('WGUPS_Distance_Table.csv')
+        distance_matrix = paths.distances  # Routes drive through other addresses where that is shorter
         print("Data loaded successfully from CSV files!")
+        print(f"Distance table: {paths.shortcut_count()} location pairs are closer through another address")
+        print(f"Packages: {load_report.rows} rows in {load_report.seconds:.3f} s "
+              f"({load_report.rows_per_second:,.0f} rows/s)")
+        memory = package_store.memory_report()
+        print(f"Package store: {memory['store_bytes_per_package']:.0f} bytes/package "
+              f"(list layout: {memory['list_bytes_per_package']:.0f} bytes/package)")
     except FileNotFoundError as e:
         print(f"Error: Could not find CSV file - {e}")
         print("Please ensure all CSV files are in the current directory.")
         exit(1)
     
-    # Create three truck instances
-    truck1 = Truck(1)
-    truck2 = Truck(2)
-    truck3 = Truck(3)
-    
-    # Manual truck loading based on package constraints
-    # Strategy: Early deadlines on Truck 1, special constraints on Truck 2, rest on Truck 3
+    for error in load_report.errors:
+        print(f"Warning: Skipped package row - {error}")
     
-    # Truck 1: Packages with early deadlines and "must be delivered with" constraints (8:00 AM departure)
-    truck1.packages = [1, 13, 14, 15, 16, 19, 20, 29, 30, 31, 34, 37, 40]
-    truck1.departure_time = datetime.timedelta(hours=8, minutes=0)
+    if load_report.unresolved:
+        print("Error: The following packages have addresses missing from the address file:")
+        for package_id, address in load_report.unresolved:
+            print(f"  Package {package_id}: {address}")
+        exit(1)
     
-    # Truck 2: "Must be on truck 2" and delayed packages (9:05 AM departure)
-    truck2.packages = [3, 6, 12, 17, 18, 21, 22, 23, 24, 25, 26, 27, 28, 32, 35, 36, 38, 39]
-    truck2.departure_time = datetime.timedelta(hours=9, minutes=5)
+    for problem in constraints.problems:
+        print(f"Warning: {problem}")
     
-    # Truck 3: Remaining packages including wrong address package #9
-    truck3.packages = [2, 4, 5, 7, 8, 9, 10, 11, 33]
-    # Truck 3 departure time will be set after Truck 1 returns
+    # Compare what-if scenarios instead of running the day once
+    if args.scenarios:
+        try:
+            scenarios = load_scenarios(args.scenarios)
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not read scenarios - {e}")
+            exit(1)
+        print(f"\nRunning {len(scenarios)} scenarios...")
+        results = run_scenarios(scenarios, package_store, constraints, distance_matrix, address_index,
+                                workers=args.workers)
+        print_scenario_ranking(results)
+        if args.profile is not None:
+            print_profile(profiler, args.profile)
+        exit(0)
+    
+    # Load trucks automatically from the package constraints
+    try:
+        plan = assign_packages(package_store, constraints, address_index, distance_matrix,
+                               truck_count=args.trucks, capacity=args.capacity,
+                               driver_count=args.drivers, time_budget=args.assign_budget)
+    except AssignmentError as e:
+        print(f"Error: Could not assign packages to trucks - {e}")
+        exit(1)
     
     print("Truck loading complete:")
-    print(f"Truck 1: {len(truck1.packages)} packages, departure: 8:00 AM")
-    print(f"Truck 2: {len(truck2.packages)} packages, departure: 9:05 AM") 
-    print(f"Truck 3: {len(truck3.packages)} packages, departure: TBD")
+    for load in plan.loads:
+        departure = f"after truck {load.driver_from}'s driver returns" if load.driver_from else load.departure_time
+        print(f"Truck {load.truck_id}: {len(load.package_ids)} packages, departure: {departure}")
     
-    # Simulate the delivery day
+    # Simulate the delivery day; all trucks advance together in event order
     print("\nStarting delivery simulation...")
     
-    # Deliver packages for Truck 1
-    print("Truck 1 departing...")
-    truck1_return_time = deliver_packages(truck1, package_hash_table, distance_matrix, address_list, truck1.departure_time)
-    print(f"Truck 1 completed route at {truck1_return_time}, mileage: {truck1.mileage:.2f}")
+    try:
+        result = simulate_day(plan, package_store, constraints, distance_matrix, address_index,
+                              driver_count=args.drivers, improve=args.improve, time_budget=args.time_budget,
+                              routing=args.routing)
+    except (ConstraintError, UnknownAddressError) as e:
+        print(f"Error: Simulation failed - {e}")
+        exit(1)
     
-    # Deliver packages for Truck 2
-    print("Truck 2 departing...")
-    truck2_return_time = deliver_packages(truck2, package_hash_table, distance_matrix, address_list, truck2.departure_time)
-    print(f"Truck 2 completed route at {truck2_return_time}, mileage: {truck2.mileage:.2f}")
+    for event in result.events:
+        if event.kind == DEPARTURE:
+            print(f"{event.time}: Truck {event.truck_id} departs with driver {event.driver}")
+        elif event.kind == ROUTE_COMPLETE:
+            truck = result.truck(event.truck_id)
+            print(f"{event.time}: Truck {truck.id} completed route, mileage: {truck.mileage:.2f}")
+        elif event.kind == FLIGHT_ARRIVAL:
+            print(f"{event.time}: Delayed packages {list(event.package_ids)} arrive at the hub")
+        elif event.kind == ADDRESS_CORRECTION:
+            print(f"{event.time}: Address corrected for package {event.package_ids[0]}")
     
-    # Truck 3 departs when driver from Truck 1 returns
-    truck3.departure_time = truck1_return_time
-    print(f"Truck 3 departing at {truck3.departure_time}...")
-    truck3_return_time = deliver_packages(truck3, package_hash_table, distance_matrix, address_list, truck3.departure_time)
-    print(f"Truck 3 completed route at {truck3_return_time}, mileage: {truck3.mileage:.2f}")
+    # Index the event log for status-at-time queries
+    timeline = build_timeline(result, package_store, constraints)
     
     # Calculate total mileage
-    total_mileage = truck1.mileage + truck2.mileage + truck3.mileage
+    total_mileage = result.total_mileage
+    if args.improve:
+        unimproved_mileage = result.unimproved_mileage
+        first_tour = 'Nearest neighbor' if args.routing == NEAREST_NEIGHBOR else 'Deadline insertion'
+        print(f"\n{first_tour + ' mileage:':<25} {unimproved_mileage:.2f} miles")
+        print(f"{'After 2-opt/Or-opt:':<25} {total_mileage:.2f} miles")
     print(f"\nTotal mileage for all trucks: {total_mileage:.2f} miles")
     
     if total_mileage < 140:
@@ -378,8 +342,21 @@ if __name__ == "__main__":
     else:
         print("WARNING: Total mileage exceeds 140 miles - optimization needed")
     
+    late_packages, late_minutes = result.late_packages(package_store)
+    if late_packages:
+        print(f"WARNING: {len(late_packages)} packages miss their deadline by {late_minutes:.1f} minutes in total: "
+              f"{late_packages}")
+    else:
+        print("SUCCESS: Every package is delivered by its deadline")
+    
     print("\nDelivery simulation complete!")
     
+    if args.manifest:
+        print_manifest(result, paths, address_index)
+    
+    if args.profile is not None:
+        print_profile(profiler, args.profile)
+    
     # Step 5: CLI Interface for Package Status Lookups
     print("\n" + "="*50)
     print("WGUPS Package Tracking System")
@@ -400,37 +377,33 @@ if __name__ == "__main__":
             elif choice == '1':
                 # Single package lookup
                 try:
-                    package_id = int(input("Enter package ID (1-40): "))
-                    if package_id < 1 or package_id > 40:
-                        print("Invalid package ID. Please enter a number between 1 and 40.")
+                    package_id = int(input("Enter package ID: "))
+                    package_data = package_store.lookup(package_id)
+                    if package_data is None:
+                        print(f"Package {package_id} not found in system.")
                         continue
                     
                     time_input = input("Enter time in HH:MM format (24-hour): ").strip()
                     hour, minute = map(int, time_input.split(':'))
                     input_time = datetime.timedelta(hours=hour, minutes=minute)
                     
-                    # Get package data from hash table
-                    package_data = package_hash_table.lookup(package_id)
-                    if package_data:
-                        # Get status and address at the specified time
-                        status = get_package_status_at_time(package_id, package_data, input_time)
-                        address = get_package_address_at_time(package_id, package_data, input_time)
-                        truck_number = get_package_truck_number(package_id, truck1, truck2, truck3)
-                        delivery_time = package_data[7] if package_data[7] else None
-                        
-                        # Display package information with all required elements
-                        print(f"\n--- Package {package_id} Status ---")
-                        print(f"Package ID: {package_id}")
-                        print(f"Delivery Address: {address}")
-                        print(f"Delivery Deadline: {package_data[1]}")
-                        print(f"Truck Number: {truck_number}")
-                        print(f"Delivery Status: {status}")
-                        print(f"Delivery Time: {delivery_time if delivery_time else 'Not delivered yet'}")
-                        print(f"City: {package_data[2]}")
-                        print(f"Zip: {package_data[3]}")
-                        print(f"Weight: {package_data[4]} kg")
-                    else:
-                        print("Package not found in system.")
+                    # Get status and address at the specified time
+                    status = get_package_status_at_time(package_id, input_time, timeline)
+                    address = get_package_address_at_time(package_id, input_time, timeline)
+                    truck_number = get_package_truck_number(package_id, plan)
+                    delivery_time = package_data.delivery_time
+                    
+                    # Display package information with all required elements
+                    print(f"\n--- Package {package_id} Status ---")
+                    print(f"Package ID: {package_id}")
+                    print(f"Delivery Address: {address}")
+                    print(f"Delivery Deadline: {package_data.deadline}")
+                    print(f"Truck Number: {truck_number}")
+                    print(f"Delivery Status: {status}")
+                    print(f"Delivery Time: {delivery_time if delivery_time else 'Not delivered yet'}")
+                    print(f"City: {package_data.city}")
+                    print(f"Zip: {package_data.zip}")
+                    print(f"Weight: {package_data.weight:g} kg")
                         
                 except ValueError:
                     print("Invalid input format. Please use HH:MM format for time.")
@@ -448,20 +421,22 @@ if __name__ == "__main__":
                     print(f"{'ID':<4} {'Address':<25} {'Deadline':<10} {'Truck':<6} {'Status':<18} {'Delivery Time':<15}")
                     print("-" * 88)
                     
-                    for package_id in range(1, 41):
-                        package_data = package_hash_table.lookup(package_id)
+                    # Status codes for every package come from one cached fleet snapshot
+                    snapshot = timeline.snapshot(input_time)
+                    for package_id in package_store.package_ids():
+                        package_data = package_store.lookup(package_id)
                         if package_data:
                             # Get status and address at the specified time
-                            status = get_package_status_at_time(package_id, package_data, input_time)
-                            address = get_package_address_at_time(package_id, package_data, input_time)
-                            truck_number = get_package_truck_number(package_id, truck1, truck2, truck3)
-                            delivery_time = package_data[7] if package_data[7] else None
+                            status = timeline.describe(package_data.row, snapshot[package_data.row])
+                            address = get_package_address_at_time(package_id, input_time, timeline)
+                            truck_number = get_package_truck_number(package_id, plan)
+                            delivery_time = package_data.delivery_time
                             
                             # Truncate address for display
                             display_address = address[:24] if len(address) > 24 else address
                             display_delivery_time = str(delivery_time)[:14] if delivery_time else "Not delivered"
                             
-                            print(f"{package_id:<4} {display_address:<25} {package_data[1]:<10} {truck_number:<6} {status:<18} {display_delivery_time:<15}")
+                            print(f"{package_id:<4} {display_address:<25} {package_data.deadline:<10} {truck_number:<6} {status:<18} {display_delivery_time:<15}")
                         else:
                             print(f"{package_id:<4} {'Not found':<25} {'':<10} {'':<6} {'Error':<18} {'':<15}")
                             
@@ -0,0 +1,269 @@
+import bisect
+import functools
+import os
+import threading
+import time
+
+
+# Histogram bucket upper bounds in seconds, from a fast request to a large rebuild
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Set this environment variable to 0 to turn instrumentation off
+ENABLE_VARIABLE = 'WGUPS_METRICS'
+
+# Metric kinds
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+
+def _label_text(names, values, extra=''):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic count for one set of label values."""
+
+    __slots__ = ('value', '_registry', '_lock')
+
+    def __init__(self, registry):
+        self.value = 0
+        self._registry = registry
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        if self._registry.enabled:
+            with self._lock:
+                self.value += amount
+
+
+class Histogram:
+    """Bucketed observations for one set of label values; buckets are counted individually and summed on export."""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count', '_registry', '_lock')
+
+    def __init__(self, registry, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # The last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._registry = registry
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        if self._registry.enabled:
+            index = bisect.bisect_left(self.bounds, value)
+            with self._lock:
+                self.counts[index] += 1
+                self.sum += value
+                self.count += 1
+
+    def time(self):
+        """Context manager that observes the seconds spent inside it."""
+        return _Timer(self) if self._registry.enabled else _NULL_TIMER
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricFamily:
+    """
+    A named metric and its children, one per distinct set of label values.
+    Children are created on first use and kept for the life of the process.
+    """
+
+    def __init__(self, registry, kind, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS, read=None):
+        self.registry = registry
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.read = read  # Gauges are read from this callable at export time
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.label_names and kind != GAUGE:
+            self.labels()  # An unlabelled metric is exported (as zero) before its first observation
+
+    def labels(self, *values):
+        """Get the child for these label values (in label_names order), creating it if needed."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} takes labels {self.label_names}, got {values}")
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    if self.kind == HISTOGRAM:
+                        child = Histogram(self.registry, self.buckets)
+                    else:
+                        child = Counter(self.registry)
+                    self._children[values] = child
+        return child
+
+    def children(self):
+        """Get (label values, child) pairs in the order the children were created."""
+        with self._lock:
+            return list(self._children.items())
+
+    def inc(self, *values, amount=1):
+        if self.registry.enabled:
+            self.labels(*values).inc(amount)
+
+    def observe(self, value, *values):
+        if self.registry.enabled:
+            self.labels(*values).observe(value)
+
+    def time(self, *values):
+        """Context manager that observes the seconds spent inside it under these label values."""
+        if not self.registry.enabled:
+            return _NULL_TIMER
+        return _Timer(self.labels(*values))
+
+    def timed(self, *values):
+        """Decorator that observes the seconds every call takes under these label values."""
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.registry.enabled:
+                    return function(*args, **kwargs)
+                with _Timer(self.labels(*values)):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def render(self):
+        """Lines of the Prometheus text exposition format for this family."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        if self.kind == GAUGE:
+            lines.append(f"{self.name} {self.read()}")
+            return lines
+        for values, child in self.children():
+            if self.kind == COUNTER:
+                lines.append(f"{self.name}{_label_text(self.label_names, values)} {child.value}")
+                continue
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket in zip(child.bounds + (float('inf'),), counts):
+                cumulative += bucket
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                bucket_labels = _label_text(self.label_names, values, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = _label_text(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {total!r}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and timing histograms for the whole process.
+
+    Recording an observation is a bisect and a short lock, so the hot paths
+    (every request, every truck routed, every snapshot built) can stay
+    instrumented. With the registry disabled, timers and counters return
+    before reading the clock.
+    """
+
+    def __init__(self, enabled=None):
+        """
+        Args:
+            enabled (bool): Record metrics; by default on unless WGUPS_METRICS is 0, false or off
+        """
+        if enabled is None:
+            enabled = os.environ.get(ENABLE_VARIABLE, '1').strip().lower() not in ('0', 'false', 'off')
+        self.enabled = enabled
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _register(self, family):
+        with self._lock:
+            existing = self._families.get(family.name)
+            if existing is not None:
+                # A module imported twice (as a script and by name) shares the first registration
+                if existing.kind != family.kind or existing.label_names != family.label_names:
+                    raise ValueError(f"Metric {family.name} is already registered differently")
+                return existing
+            self._families[family.name] = family
+        return family
+
+    def counter(self, name, help_text, label_names=()):
+        return self._register(MetricFamily(self, COUNTER, name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(MetricFamily(self, HISTOGRAM, name, help_text, label_names, buckets))
+
+    def gauge(self, name, help_text, read):
+        """Register a gauge whose value is read from a callable whenever metrics are exported."""
+        return self._register(MetricFamily(self, GAUGE, name, help_text, read=read))
+
+    def family(self, name):
+        return self._families.get(name)
+
+    def render(self):
+        """Export every metric in the Prometheus text exposition format."""
+        with self._lock:
+            families = list(self._families.values())
+        lines = [f"# Metrics are disabled; unset {ENABLE_VARIABLE} to record them"] if not self.enabled else []
+        for family in families:
+            lines.extend(family.render())
+        return '\n'.join(lines) + '\n'
+
+    def timings(self):
+        """
+        Summarize every histogram with observations.
+
+        Returns:
+            list: (metric name, {label: value}, observations, total seconds) in registration order
+        """
+        with self._lock:
+            families = [family for family in self._families.values() if family.kind == HISTOGRAM]
+        summary = []
+        for family in families:
+            for values, child in family.children():
+                if child.count:
+                    summary.append((family.name, dict(zip(family.label_names, values)), child.count, child.sum))
+        return summary
+
+
+# The process-wide registry every module records into
+registry = MetricsRegistry()
+
+# Loading and planning phases shared by the CLI, the API and the background jobs
+PHASE_SECONDS = registry.histogram('wgups_phase_seconds', "Seconds spent in each loading and planning phase",
+                                   ('phase',))
+
+
+def set_enabled(enabled):
+    """Turn recording on or off for the whole process."""
+    registry.enabled = bool(enabled)
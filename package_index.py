@@ -0,0 +1,312 @@
+import bisect
+import threading
+from array import array
+from collections import OrderedDict
+
+from hash_table import ChainingHashTable
+from timeline import SNAPSHOT_CACHE_SIZE
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, status groups fall back to a Python loop
+    np = None
+
+
+# Page size for query() when none is given, and the largest page allowed
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class QueryError(ValueError):
+    """Raised for a package query with an invalid filter or cursor."""
+
+
+class PackageIndex:
+    """
+    Secondary indexes over one plan's packages: by truck, by zip code, by
+    deadline (sorted), by status at a time, and every status change in time order.
+
+    Every index holds package rows, and every list is kept in package ID order
+    (deadlines in deadline, then ID, order), so a filtered page is a bisect to
+    the cursor followed by a walk over the rows it returns. Each index is built
+    on first use, once per plan; status groups are built once per distinct
+    fleet transition, like the timeline's snapshots, and cached.
+    """
+
+    def __init__(self, package_store, assignment, timeline):
+        """
+        Args:
+            package_store (PackageStore): Store whose rows are indexed
+            assignment (AssignmentPlan): Truck loads the truck index follows
+            timeline (DeliveryTimeline): Timeline the status index follows
+        """
+        self.package_store = package_store
+        self.assignment = assignment
+        self.timeline = timeline
+        self._lock = threading.Lock()
+        self._rows_by_id = None
+        self._by_truck = None
+        self._by_zip = None
+        self._by_deadline = None
+        self._deadline_keys = None
+        self._status_groups = OrderedDict()
+        self._transitions = None
+
+    # Index builders
+
+    def build(self):
+        """Build every plan-wide index now rather than on first use (status groups stay per query time)."""
+        self.rows_by_id()
+        self.truck_rows(0)
+        self.zip_rows('')
+        self.deadline_rows(0)
+        self.transitions()
+
+    def rows_by_id(self):
+        """Get every package row in package ID order."""
+        if self._rows_by_id is None:
+            with self._lock:
+                if self._rows_by_id is None:
+                    ids = self.package_store.ids
+                    self._rows_by_id = array('i', sorted(range(len(ids)), key=ids.__getitem__))
+        return self._rows_by_id
+
+    def _group(self, key_of):
+        table = ChainingHashTable(initial_capacity=64)
+        for row in self.rows_by_id():
+            key = key_of(row)
+            rows = table.lookup(key)
+            if rows is None:
+                rows = array('i')
+                table.insert(key, rows)
+            rows.append(row)
+        return table
+
+    def truck_rows(self, truck_id):
+        """Get the rows of the packages loaded on a truck, in package ID order."""
+        if self._by_truck is None:
+            truck_of = {}
+            row_of = self.package_store.row_of
+            for load in self.assignment.loads:
+                for package_id in load.package_ids:
+                    truck_of[row_of(package_id)] = load.truck_id
+            by_truck = self._group(lambda row: truck_of.get(row, 0))
+            with self._lock:
+                if self._by_truck is None:
+                    self._by_truck = by_truck
+        return self._by_truck.lookup(truck_id) or array('i')
+
+    def zip_rows(self, zip_code):
+        """Get the rows of the packages going to a zip code, in package ID order."""
+        if self._by_zip is None:
+            strings = self.package_store.strings
+            zip_codes = self.package_store.zip_codes
+            by_zip = self._group(lambda row: strings[zip_codes[row]])
+            with self._lock:
+                if self._by_zip is None:
+                    self._by_zip = by_zip
+        return self._by_zip.lookup(zip_code) or array('i')
+
+    def deadline_rows(self, minutes):
+        """
+        Get the rows of the packages due at or before a time.
+
+        Returns:
+            tuple: (rows in deadline then package ID order, number of them that are due by the time)
+        """
+        if self._by_deadline is None:
+            deadlines = self.package_store.deadline_minutes
+            ids = self.package_store.ids
+            by_deadline = array('i', sorted(self.rows_by_id(), key=lambda row: (deadlines[row], ids[row])))
+            keys = array('h', (deadlines[row] for row in by_deadline))
+            with self._lock:
+                if self._by_deadline is None:
+                    self._by_deadline, self._deadline_keys = by_deadline, keys
+        return self._by_deadline, bisect.bisect_right(self._deadline_keys, minutes)
+
+    def status_rows(self, code, query_time):
+        """Get the rows of the packages with a status code at a time, in package ID order."""
+        position = self.timeline.transition(query_time)
+        with self._lock:
+            groups = self._status_groups.get(position)
+        if groups is None:
+            codes = self.timeline.snapshot(query_time)
+            rows = self.rows_by_id()
+            if np is not None:
+                ordered_rows = np.frombuffer(rows, dtype=np.int32)
+                ordered_codes = np.asarray(codes)[ordered_rows]
+                groups = tuple(array('i', ordered_rows[ordered_codes == status].tobytes()) for status in range(4))
+            else:
+                groups = tuple(array('i') for _ in range(4))
+                for row in rows:
+                    groups[codes[row]].append(row)
+            with self._lock:
+                if len(self._status_groups) >= SNAPSHOT_CACHE_SIZE:
+                    self._status_groups.popitem(last=False)
+                self._status_groups[position] = groups
+        return groups[code]
+
+    def transitions(self):
+        """
+        Get every package status change in time order.
+
+        Returns:
+            tuple: (seconds, rows, status codes) as parallel arrays; at seconds[i] package row
+                   rows[i] enters status codes[i]
+        """
+        if self._transitions is None:
+            boundaries = self.timeline.boundaries
+            if np is not None:
+                times = np.frombuffer(boundaries, dtype=np.float64)
+                order = np.argsort(times, kind='stable')
+                transitions = (array('d', times[order].tobytes()),
+                               array('i', (order // 3).astype(np.int32).tobytes()),
+                               array('b', (order % 3 + 1).astype(np.int8).tobytes()))
+            else:
+                order = sorted(range(len(boundaries)), key=boundaries.__getitem__)
+                transitions = (array('d', (boundaries[i] for i in order)), array('i', (i // 3 for i in order)),
+                               array('b', (i % 3 + 1 for i in order)))
+            with self._lock:
+                if self._transitions is None:
+                    self._transitions = transitions
+        return self._transitions
+
+    def id_rows(self, package_ids):
+        """
+        Get the rows of some package IDs, in package ID order.
+
+        Returns:
+            tuple: (rows of the known IDs, IDs that are not stored)
+        """
+        rows = array('i')
+        missing = []
+        for package_id in sorted(set(package_ids)):
+            row = self.package_store.row_of(package_id)
+            if row is None:
+                missing.append(package_id)
+            else:
+                rows.append(row)
+        return rows, missing
+
+    # Queries
+
+    def query(self, truck=None, zip_code=None, deadline_before=None, status=None, query_time=None, ids=None,
+              cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        Get one page of the packages matching every given filter.
+
+        The smallest matching index drives the walk and the other filters are
+        checked per row, so a page costs the rows it returns (plus the rows the
+        driving index holds that other filters reject), never a scan of the fleet.
+        Results are in package ID order, or deadline then package ID order when
+        deadline_before is given. The deadline range competes with the other
+        indexes to drive; when a smaller one wins, its matches are sorted into
+        deadline order before the page is cut.
+
+        Args:
+            truck (int): Truck ID (0 for packages not on a truck)
+            zip_code (str): Delivery zip code
+            deadline_before (int): Deadline at or before this many minutes after midnight
+            status (int): Status code at query_time (DELAYED, AT_HUB, EN_ROUTE or DELIVERED)
+            query_time (datetime.timedelta): Time the status filter applies to
+            ids (list): Only these package IDs
+            cursor (str): next_cursor from the previous page
+            limit (int): Maximum rows returned
+
+        Returns:
+            tuple: (rows, next cursor or None on the last page, IDs from ids that are not stored)
+
+        Raises:
+            QueryError: If the limit, status or cursor is invalid
+        """
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise QueryError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        if status is not None and query_time is None:
+            raise QueryError("A status filter needs a time")
+
+        candidates = []  # (rows in ID order, filter name)
+        missing = []
+        if ids is not None:
+            id_rows, missing = self.id_rows(ids)
+            candidates.append((id_rows, 'ids'))
+        if truck is not None:
+            candidates.append((self.truck_rows(truck), 'truck'))
+        if zip_code is not None:
+            candidates.append((self.zip_rows(zip_code), 'zip'))
+        if status is not None:
+            candidates.append((self.status_rows(status, query_time), 'status'))
+
+        by_deadline = deadline_before is not None
+        if candidates:
+            driver, driver_name = min(candidates, key=lambda candidate: len(candidate[0]))
+            end = len(driver)
+        else:
+            driver, driver_name = self.rows_by_id(), None
+            end = len(driver)
+        if by_deadline:
+            deadline_driver, deadline_end = self.deadline_rows(deadline_before)
+            if driver_name is None or deadline_end <= end:
+                driver, end, driver_name = deadline_driver, deadline_end, 'deadline'
+
+        checks = [self._check(name, truck, zip_code, status, query_time, rows)
+                  for rows, name in candidates if name != driver_name]
+        if by_deadline and driver_name != 'deadline':
+            # A smaller index drives: its rows are in ID order, so its matches are sorted into deadline order
+            deadlines = self.package_store.deadline_minutes
+            checks.append(lambda row: deadlines[row] <= deadline_before)
+            driver = sorted((row for row in driver if all(check(row) for check in checks)), key=self._deadline_key)
+            end = len(driver)
+            checks = []
+        key_of = self._deadline_key if by_deadline else self._id_key
+
+        start = 0
+        if cursor is not None:
+            start = bisect.bisect_right(driver, self._parse_cursor(cursor, by_deadline), 0, end, key=key_of)
+
+        page = []
+        position = start
+        while position < end and len(page) <= limit:
+            row = driver[position]
+            if all(check(row) for check in checks):
+                page.append(row)
+            position += 1
+        next_cursor = None
+        if len(page) > limit:
+            page.pop()
+            next_cursor = self._cursor(page[-1], by_deadline)
+        return page, next_cursor, missing
+
+    def _check(self, name, truck, zip_code, status, query_time, rows):
+        """Per-row test for a filter that is not driving the walk."""
+        store = self.package_store
+        if name == 'truck':
+            return lambda row: (self.assignment.truck_of(store.ids[row]) or 0) == truck
+        if name == 'zip':
+            strings = store.strings
+            return lambda row: strings[store.zip_codes[row]] == zip_code
+        if name == 'status':
+            codes = self.timeline.snapshot(query_time)
+            return lambda row: codes[row] == status
+        allowed = set(rows)
+        return allowed.__contains__
+
+    def _id_key(self, row):
+        return self.package_store.ids[row]
+
+    def _deadline_key(self, row):
+        return self.package_store.deadline_minutes[row], self.package_store.ids[row]
+
+    def _cursor(self, row, by_deadline):
+        if by_deadline:
+            return f"{self.package_store.deadline_minutes[row]}.{self.package_store.ids[row]}"
+        return str(self.package_store.ids[row])
+
+    @staticmethod
+    def _parse_cursor(cursor, by_deadline):
+        try:
+            if by_deadline:
+                minutes, package_id = cursor.split('.')
+                return int(minutes), int(package_id)
+            return int(cursor)
+        except ValueError:
+            raise QueryError(f"Invalid cursor {cursor!r}") from None
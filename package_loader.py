@@ -0,0 +1,203 @@
+import csv
+import time
+
+from metrics import PHASE_SECONDS, registry
+from package_store import parse_deadline_minutes
+
+
+# Bytes read from the package file per chunk
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Rows loaded or skipped, and distinct addresses resolved (each address is looked up once per load)
+PACKAGES_LOADED = registry.counter('wgups_packages_loaded_total', "Package rows loaded, by outcome", ('outcome',))
+ADDRESS_LOOKUPS = registry.counter('wgups_address_lookups_total', "Distinct delivery addresses resolved while loading, "
+                                   "by result", ('result',))
+
+
+class PackageRowError(ValueError):
+    """Raised for a package file row that cannot be loaded."""
+
+    def __init__(self, offset, message):
+        super().__init__(f"Row at byte {offset}: {message}")
+        self.offset = offset
+
+
+class LoadReport:
+    """Summary of a streaming package load."""
+
+    def __init__(self, start_offset):
+        self.start_offset = start_offset
+        self.offset = start_offset  # Byte offset just past the last row loaded; pass it back to resume
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.unresolved = []  # (package ID, address) pairs whose address matched no location
+        self.errors = []  # PackageRowError for every skipped row
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def read_chunks(csvfile, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Read a binary file in fixed-size chunks and yield complete lines.
+
+    A line split across two chunks is carried over to the next one, so only
+    one chunk (plus a partial line) is ever held in memory.
+
+    Yields:
+        tuple: (byte offset of the line's start, line as bytes without the newline)
+    """
+    offset = csvfile.tell()
+    carry = b''
+    while True:
+        chunk = csvfile.read(chunk_size)
+        if not chunk:
+            break
+        lines = (carry + chunk).split(b'\n')
+        carry = lines.pop()
+        for line in lines:
+            yield offset, line
+            offset += len(line) + 1
+    if carry:
+        yield offset, carry
+
+
+def parse_rows(lines, encoding='utf-8'):
+    """
+    Split lines into CSV fields.
+
+    Yields:
+        tuple: (byte offset of the row, byte offset just past it, list of fields)
+    """
+    for offset, line in lines:
+        end = offset + len(line) + 1
+        text = line.decode(encoding).rstrip('\r')
+        if not text.strip():
+            continue
+        # Quoted fields need the csv module; plain rows are a straight split
+        fields = next(csv.reader((text,))) if '"' in text else text.split(',')
+        yield offset, end, fields
+
+
+def validate_rows(rows, strings):
+    """
+    Check every row and convert its fields, interning the repeated text fields.
+
+    Invalid rows are yielded as PackageRowError instead of fields so the
+    caller decides whether to skip or stop.
+
+    Args:
+        rows (iterable): Output of parse_rows
+        strings (StringPool): Pool the package store interns strings into
+
+    Yields:
+        tuple: (end offset, (package ID, address, deadline, city, zip, weight, notes)) or
+               (end offset, PackageRowError)
+    """
+    intern = strings.intern
+    pool = strings.strings
+    for offset, end, fields in rows:
+        if len(fields) < 7:
+            yield end, PackageRowError(offset, f"expected at least 7 columns, found {len(fields)}")
+            continue
+        try:
+            package_id = int(fields[0])
+        except ValueError:
+            yield end, PackageRowError(offset, f"package ID {fields[0]!r} is not an integer")
+            continue
+        if package_id <= 0:
+            yield end, PackageRowError(offset, f"package ID {package_id} is not positive")
+            continue
+        address = fields[1].strip()
+        if not address:
+            yield end, PackageRowError(offset, f"package {package_id} has no address")
+            continue
+        deadline = fields[5].strip()
+        try:
+            parse_deadline_minutes(deadline)
+        except ValueError:
+            yield end, PackageRowError(offset, f"package {package_id} has invalid deadline {deadline!r}")
+            continue
+        try:
+            weight = float(fields[6])
+        except ValueError:
+            yield end, PackageRowError(offset, f"package {package_id} has invalid weight {fields[6]!r}")
+            continue
+        if weight < 0:
+            yield end, PackageRowError(offset, f"package {package_id} has negative weight {weight:g}")
+            continue
+        # Hand the store the pooled copies, so repeated values share one string object
+        yield end, (package_id, pool[intern(address)], pool[intern(deadline)], pool[intern(fields[2].strip())],
+                    pool[intern(fields[4].strip())], weight, pool[intern(fields[7].strip() if len(fields) > 7 else '')])
+
+
+@PHASE_SECONDS.timed('load_packages')
+def stream_package_data(filename, package_store, address_index, chunk_size=DEFAULT_CHUNK_SIZE, start_offset=0,
+                        progress=None, progress_every=100000, strict=False):
+    """
+    Load a package file into the package store through a chunked generator pipeline.
+
+    Args:
+        filename (str): Path to the package CSV file
+        package_store (PackageStore): Store the packages are added to
+        address_index (AddressIndex): Index used to resolve delivery addresses
+        chunk_size (int): Bytes read per chunk
+        start_offset (int): Byte offset to resume from (0 starts at the header row);
+                            use LoadReport.offset from an interrupted load
+        progress (callable): Called with the LoadReport every progress_every rows
+        progress_every (int): Rows between progress callbacks
+        strict (bool): Raise the first PackageRowError instead of skipping bad rows
+
+    Returns:
+        LoadReport: Rows loaded, rows per second, unresolved addresses and skipped rows
+
+    Raises:
+        PackageRowError: In strict mode, for the first row that fails validation
+    """
+    report = LoadReport(start_offset)
+    location_of_code = {}  # Interned address code -> location ID, so each address is normalized once
+    strings = package_store.strings
+    start = time.perf_counter()
+    resolve_seconds = 0.0  # Only distinct addresses are timed, so the clock is read once per location
+
+    with open(filename, 'rb') as csvfile:
+        csvfile.seek(start_offset)
+        lines = read_chunks(csvfile, chunk_size)
+        if start_offset == 0:
+            next(lines, None)  # Skip header row
+        for end, row in validate_rows(parse_rows(lines), strings):
+            report.offset = end
+            if isinstance(row, PackageRowError):
+                if strict:
+                    raise row
+                report.errors.append(row)
+                continue
+            package = package_store.add(*row)
+            code = strings.intern(package.address)
+            location_id = location_of_code.get(code, -1)
+            if location_id == -1:
+                resolve_start = time.perf_counter()
+                location_id = address_index.find(package.address)
+                resolve_seconds += time.perf_counter() - resolve_start
+                location_of_code[code] = location_id
+            if location_id is None:
+                report.unresolved.append((package.id, package.address))
+            else:
+                package.address_index = location_id
+            report.rows += 1
+            if progress is not None and report.rows % progress_every == 0:
+                report.seconds = time.perf_counter() - start
+                report.bytes = report.offset - start_offset
+                progress(report)
+
+    report.seconds = time.perf_counter() - start
+    report.bytes = report.offset - start_offset
+    PHASE_SECONDS.observe(resolve_seconds, 'resolve_addresses')
+    unresolved = sum(location_id is None for location_id in location_of_code.values())
+    ADDRESS_LOOKUPS.inc('resolved', amount=len(location_of_code) - unresolved)
+    ADDRESS_LOOKUPS.inc('unresolved', amount=unresolved)
+    PACKAGES_LOADED.inc('loaded', amount=report.rows)
+    PACKAGES_LOADED.inc('skipped', amount=len(report.errors))
+    return report
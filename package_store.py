@@ -0,0 +1,408 @@
+import datetime
+import math
+import sys
+from array import array
+
+from hash_table import ChainingHashTable
+
+
+# Deadline used for packages marked "EOD" (end of day, 5:00 PM)
+EOD_MINUTES = 17 * 60
+
+# Marker stored in the address index column until a package is resolved
+UNRESOLVED_ADDRESS = -1
+
+# Every per-row column
+_COLUMNS = ('ids', 'address_indexes', 'deadline_minutes', 'weights', 'departure_seconds', 'delivery_seconds',
+            'address_codes', 'deadline_codes', 'city_codes', 'zip_codes', 'note_codes', 'status_codes')
+
+# Columns a simulated day writes to (address corrections, statuses, times)
+_MUTABLE_COLUMNS = ('address_indexes', 'address_codes', 'status_codes', 'departure_seconds', 'delivery_seconds')
+
+
+def parse_deadline_minutes(deadline):
+    """
+    Convert a deadline string from the package file into minutes after midnight.
+
+    Args:
+        deadline (str): Deadline such as "10:30 AM", "9:00 AM" or "EOD"
+
+    Returns:
+        int: Minutes after midnight (EOD maps to EOD_MINUTES)
+    """
+    text = deadline.strip().upper()
+    if not text or text == 'EOD':
+        return EOD_MINUTES
+    clock, _, meridiem = text.partition(' ')
+    hour, minute = map(int, clock.split(':'))
+    if meridiem == 'PM' and hour != 12:
+        hour += 12
+    elif meridiem == 'AM' and hour == 12:
+        hour = 0
+    return hour * 60 + minute
+
+
+class StringPool:
+    """
+    Interns repeated strings (addresses, cities, zips, statuses) so each
+    distinct value is stored once and rows only hold a small integer code.
+    """
+
+    def __init__(self):
+        self.strings = []
+        self._codes = {}
+
+    def intern(self, value):
+        """
+        Return the code for value, adding it to the pool if necessary.
+
+        Args:
+            value (str): String to intern
+
+        Returns:
+            int: Code that identifies the string in this pool
+        """
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.strings)
+            self.strings.append(sys.intern(value))
+            self._codes[value] = code
+        return code
+
+    def __getitem__(self, code):
+        return self.strings[code]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class PackageView:
+    """
+    Lightweight handle onto one row of a PackageStore.
+    Reads and writes go straight to the store's columns, so views are
+    cheap to create and never hold stale copies of package data.
+    """
+
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    @property
+    def row(self):
+        return self._row
+
+    @property
+    def id(self):
+        return self._store.ids[self._row]
+
+    @property
+    def address(self):
+        store = self._store
+        return store.strings[store.address_codes[self._row]]
+
+    @address.setter
+    def address(self, value):
+        store = self._store
+        store.address_codes[self._row] = store.strings.intern(value)
+
+    @property
+    def address_index(self):
+        return self._store.address_indexes[self._row]
+
+    @address_index.setter
+    def address_index(self, value):
+        self._store.address_indexes[self._row] = value
+
+    @property
+    def deadline(self):
+        store = self._store
+        return store.strings[store.deadline_codes[self._row]]
+
+    @property
+    def deadline_minutes(self):
+        return self._store.deadline_minutes[self._row]
+
+    @property
+    def city(self):
+        store = self._store
+        return store.strings[store.city_codes[self._row]]
+
+    @property
+    def zip(self):
+        store = self._store
+        return store.strings[store.zip_codes[self._row]]
+
+    @property
+    def weight(self):
+        return self._store.weights[self._row]
+
+    @property
+    def notes(self):
+        store = self._store
+        return store.strings[store.note_codes[self._row]]
+
+    @property
+    def status(self):
+        store = self._store
+        return store.strings[store.status_codes[self._row]]
+
+    @status.setter
+    def status(self, value):
+        store = self._store
+        store.status_codes[self._row] = store.strings.intern(value)
+
+    @property
+    def departure_time(self):
+        return _seconds_to_time(self._store.departure_seconds[self._row])
+
+    @departure_time.setter
+    def departure_time(self, value):
+        self._store.departure_seconds[self._row] = _time_to_seconds(value)
+
+    @property
+    def delivery_time(self):
+        return _seconds_to_time(self._store.delivery_seconds[self._row])
+
+    @delivery_time.setter
+    def delivery_time(self, value):
+        self._store.delivery_seconds[self._row] = _time_to_seconds(value)
+
+    def __repr__(self):
+        return f"PackageView(id={self.id}, address={self.address!r}, status={self.status!r})"
+
+
+def _time_to_seconds(value):
+    """Convert an optional timedelta into seconds, using NaN for None."""
+    if value is None:
+        return math.nan
+    return value.total_seconds()
+
+
+def _seconds_to_time(seconds):
+    """Convert a stored seconds value back into an optional timedelta."""
+    if seconds != seconds:  # NaN marks "not set"
+        return None
+    return datetime.timedelta(seconds=seconds)
+
+
+class PackageStore:
+    """
+    Columnar storage for package records.
+    Each field lives in its own typed array (or as a code into a shared
+    StringPool), and a hash table maps package IDs to row numbers.
+    """
+
+    def __init__(self, index=None):
+        """
+        Create an empty package store.
+
+        Args:
+            index: Hash table used to map package IDs to row numbers
+                   (defaults to a new ChainingHashTable)
+        """
+        self.index = index if index is not None else ChainingHashTable()
+        self._added = None  # Package ID -> row for packages added to a copy that shares its index
+        self.strings = StringPool()
+
+        self.ids = array('q')
+        self.address_indexes = array('i')
+        self.deadline_minutes = array('h')
+        self.weights = array('d')
+        self.departure_seconds = array('d')
+        self.delivery_seconds = array('d')
+
+        self.address_codes = array('I')
+        self.deadline_codes = array('I')
+        self.city_codes = array('I')
+        self.zip_codes = array('I')
+        self.note_codes = array('I')
+        self.status_codes = array('I')
+
+    def add(self, package_id, address, deadline, city, zip_code, weight, notes='', status="At the hub"):
+        """
+        Append a package row, or overwrite the existing row for package_id.
+
+        Args:
+            package_id (int): Unique package ID
+            address (str): Delivery address
+            deadline (str): Delivery deadline as written in the package file
+            city (str): Delivery city
+            zip_code (str): Delivery zip code
+            weight (str or float): Package weight in kilograms
+            notes (str): Special notes column
+            status (str): Initial delivery status
+
+        Returns:
+            PackageView: View onto the stored row
+        """
+        strings = self.strings
+        row = self.row_of(package_id)
+        if row is None:
+            row = len(self.ids)
+            self.ids.append(package_id)
+            self.address_indexes.append(UNRESOLVED_ADDRESS)
+            self.deadline_minutes.append(parse_deadline_minutes(deadline))
+            self.weights.append(float(weight))
+            self.departure_seconds.append(math.nan)
+            self.delivery_seconds.append(math.nan)
+            self.address_codes.append(strings.intern(address))
+            self.deadline_codes.append(strings.intern(deadline))
+            self.city_codes.append(strings.intern(city))
+            self.zip_codes.append(strings.intern(zip_code))
+            self.note_codes.append(strings.intern(notes))
+            self.status_codes.append(strings.intern(status))
+            if self._added is not None:
+                self._added[package_id] = row
+            else:
+                self.index.insert(package_id, row)
+        else:
+            self.address_indexes[row] = UNRESOLVED_ADDRESS
+            self.deadline_minutes[row] = parse_deadline_minutes(deadline)
+            self.weights[row] = float(weight)
+            self.departure_seconds[row] = math.nan
+            self.delivery_seconds[row] = math.nan
+            self.address_codes[row] = strings.intern(address)
+            self.deadline_codes[row] = strings.intern(deadline)
+            self.city_codes[row] = strings.intern(city)
+            self.zip_codes[row] = strings.intern(zip_code)
+            self.note_codes[row] = strings.intern(notes)
+            self.status_codes[row] = strings.intern(status)
+        return PackageView(self, row)
+
+    def row_of(self, package_id):
+        """
+        Get the row number for a package ID.
+
+        Args:
+            package_id (int): Package ID to find
+
+        Returns:
+            int: Row number, or None if the package is not stored
+        """
+        row = self.index.lookup(package_id)
+        if row is None and self._added:
+            row = self._added.get(package_id)
+        return row
+
+    def lookup(self, package_id):
+        """
+        Get a view onto the package with the given ID.
+
+        Args:
+            package_id (int): Package ID to find
+
+        Returns:
+            PackageView: View onto the package row, or None if not found
+        """
+        row = self.index.lookup(package_id)
+        if row is None and self._added:
+            row = self._added.get(package_id)
+        if row is None:
+            return None
+        return PackageView(self, row)
+
+    def copy(self):
+        """
+        Make a store whose columns can be changed without touching this one.
+
+        The string pool only ever grows and existing codes never change, so it is
+        shared. The ID index is shared too: packages added to the copy are kept in
+        a small side table instead, so copying never rehashes every package.
+
+        Returns:
+            PackageStore: Store with the same rows
+        """
+        clone = PackageStore.__new__(PackageStore)
+        clone.index = self.index
+        clone._added = dict(self._added or {})
+        clone.strings = self.strings
+        for name in _COLUMNS:
+            column = getattr(self, name)
+            setattr(clone, name, array(column.typecode, column))
+        return clone
+
+    def checkpoint(self):
+        """
+        Copy the columns a simulation changes (addresses, statuses and times).
+
+        Returns:
+            dict: Column name -> copy, for restore()
+        """
+        return {name: array(column.typecode, column) for name, column in
+                ((name, getattr(self, name)) for name in _MUTABLE_COLUMNS)}
+
+    def restore(self, checkpoint):
+        """Put back the columns saved by checkpoint(); rows added since then are kept as they are."""
+        for name, saved in checkpoint.items():
+            column = getattr(self, name)
+            column[:len(saved)] = saved
+
+    def view(self, row):
+        """Get a view onto the given row number."""
+        return PackageView(self, row)
+
+    def package_ids(self):
+        """
+        Get all stored package IDs in ascending order.
+
+        Returns:
+            list: Sorted package IDs
+        """
+        return sorted(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, package_id):
+        return self.row_of(package_id) is not None
+
+    def __iter__(self):
+        for row in range(len(self.ids)):
+            yield PackageView(self, row)
+
+    def memory_report(self):
+        """
+        Estimate bytes per package for this store and for the previous
+        layout (one 8-element list of Python objects per package).
+
+        Returns:
+            dict: Package count, total bytes and bytes per package for both layouts
+        """
+        count = len(self.ids)
+        columns = [
+            self.ids, self.address_indexes, self.deadline_minutes, self.weights,
+            self.departure_seconds, self.delivery_seconds, self.address_codes,
+            self.deadline_codes, self.city_codes, self.zip_codes, self.note_codes,
+            self.status_codes,
+        ]
+        column_bytes = sum(column.itemsize * len(column) for column in columns)
+        pool_bytes = sys.getsizeof(self.strings.strings) + sum(
+            sys.getsizeof(value) for value in self.strings.strings)
+        # The ID -> row index holds a [key, row] pair per package
+        index_bytes = count * (sys.getsizeof([None, None]) + sys.getsizeof(count + 256))
+        store_bytes = column_bytes + pool_bytes + index_bytes
+
+        list_bytes = 0
+        for row in range(count):
+            package = PackageView(self, row)
+            # [address, deadline, city, zip, weight, status, departure_time, delivery_time]
+            list_bytes += sys.getsizeof([None] * 8)
+            list_bytes += sum(sys.getsizeof(value) for value in (
+                package.address, package.deadline, package.city, package.zip,
+                f"{package.weight:g}"))
+            if package.departure_time is not None:
+                list_bytes += sys.getsizeof(package.departure_time)
+            if package.delivery_time is not None:
+                list_bytes += sys.getsizeof(package.delivery_time)
+            # Every value list is wrapped in a [key, value] pair inside its bucket
+            list_bytes += sys.getsizeof([None, None])
+
+        return {
+            'packages': count,
+            'store_bytes': store_bytes,
+            'list_bytes': list_bytes,
+            'store_bytes_per_package': store_bytes / count if count else 0.0,
+            'list_bytes_per_package': list_bytes / count if count else 0.0,
+        }
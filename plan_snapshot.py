@@ -0,0 +1,85 @@
+import datetime
+import itertools
+from types import MappingProxyType
+
+from package_index import PackageIndex
+
+
+# Source of snapshot versions; next() on a count is atomic, so concurrent builds never share a version
+_versions = itertools.count(1)
+
+
+class PlanSnapshot:
+    """
+    Everything one routing plan is served from, frozen together under a version number.
+
+    The API holds a single reference to the current snapshot and replaces it in
+    one assignment, so a request that reads the reference once sees a package
+    store, timeline and trucks that all belong to the same plan, without locks.
+    Attributes cannot be reassigned after construction, and the objects inside
+    are never modified once the snapshot is published.
+    """
+
+    __slots__ = ('version', 'created_at', 'package_store', 'constraints', 'distance_matrix', 'address_index',
+                 'assignment', 'simulation_result', 'timeline', 'paths', 'trucks', 'indexes')
+
+    def __init__(self, package_store, constraints, distance_matrix, address_index, assignment, simulation_result,
+                 timeline, paths=None, version=None):
+        """
+        Args:
+            package_store (PackageStore): Packages after the simulated day
+            constraints (PackageConstraints): Compiled special-notes constraints
+            distance_matrix (numpy.ndarray or PyDistanceMatrix): Mirrored distance matrix
+            address_index (AddressIndex): Address lookup
+            assignment (AssignmentPlan): Truck loads
+            simulation_result (SimulationResult): Trucks and event log of the simulated day
+            timeline (DeliveryTimeline): Status-at-time index over the event log
+            paths (ShortestPaths): Shortest-path closure behind distance_matrix, for expanding legs into waypoints
+            version (int): Version number (default: the next one)
+        """
+        trucks = tuple(
+            MappingProxyType({
+                'id': truck.id,
+                'packages': tuple(truck.packages),
+                'mileage': truck.mileage,
+                'unimproved_mileage': truck.unimproved_mileage,
+                'current_location': truck.current_location,
+                'departure_time': truck.departure_time,
+            })
+            for truck in simulation_result.trucks
+        )
+        values = {
+            'version': next(_versions) if version is None else version,
+            'created_at': datetime.datetime.now(),
+            'package_store': package_store,
+            'constraints': constraints,
+            'distance_matrix': distance_matrix,
+            'address_index': address_index,
+            'assignment': assignment,
+            'simulation_result': simulation_result,
+            'timeline': timeline,
+            'paths': paths,
+            'trucks': trucks,
+            'indexes': PackageIndex(package_store, assignment, timeline),  # Built on first query
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"PlanSnapshot is immutable; build a new snapshot instead of setting {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"PlanSnapshot is immutable; cannot delete {name}")
+
+    @property
+    def total_mileage(self):
+        return sum(truck['mileage'] for truck in self.trucks)
+
+    def truck_of(self, package_id):
+        """Get the truck a package is loaded on, or 0 if it is not assigned."""
+        truck_id = self.assignment.truck_of(package_id)
+        return truck_id if truck_id is not None else 0
+
+    def __repr__(self):
+        return (f"PlanSnapshot(version={self.version}, packages={len(self.package_store)}, "
+                f"trucks={len(self.trucks)}, mileage={self.total_mileage:.1f})")
@@ -0,0 +1,623 @@
+import bisect
+import datetime
+import math
+import time
+
+from address_index import UnknownAddressError
+from assignment import TruckLoad
+from metrics import PHASE_SECONDS
+from plan_snapshot import PlanSnapshot
+from routing import Visit, improve_route, nearest_neighbor_route
+from simulation import (ARRIVAL, DELIVERY, DEPARTURE, DRIVER_HANDOFF, FLIGHT_ARRIVAL, ROUTE_COMPLETE, Event,
+                        SimulatedTruck, SimulationResult, route_stops)
+from timeline import DEFAULT_DELIVERY_SECONDS, DEFAULT_DEPARTURE_SECONDS
+
+
+# Kinds of mid-day change; each is also the kind of the event logged for it
+ADDRESS_CHANGE = 'address_change'
+NEW_PACKAGE = 'new_package'
+PACKAGE_DELAY = 'package_delay'
+TRUCK_BREAKDOWN = 'truck_breakdown'
+CHANGE_KINDS = (ADDRESS_CHANGE, NEW_PACKAGE, PACKAGE_DELAY, TRUCK_BREAKDOWN)
+
+# Seconds of 2-opt/Or-opt per rerouted truck when improve is requested
+DEFAULT_TIME_BUDGET = 0.05
+
+
+class RouteChangeError(ValueError):
+    """Raised for a mid-day change that cannot be applied to the plan."""
+
+
+class RouteChangeConflict(RouteChangeError):
+    """Raised for a change to a package on the stop its truck is already driving to."""
+
+
+def _parse_clock(value):
+    if isinstance(value, datetime.timedelta):
+        return value
+    try:
+        hour, minute = map(int, str(value).split(':')[:2])
+    except ValueError:
+        raise RouteChangeError(f"Invalid time {value!r}, expected HH:MM") from None
+    return datetime.timedelta(hours=hour, minutes=minute)
+
+
+def _ceil_minutes(time_value):
+    return math.ceil(time_value.total_seconds() / 60)
+
+
+class RouteChange:
+    """One mid-day event to apply to a plan."""
+
+    __slots__ = ('kind', 'time', 'package_id', 'address', 'until', 'truck_id', 'package')
+
+    def __init__(self, kind, time, package_id=None, address=None, until=None, truck_id=None, package=None):
+        """
+        Args:
+            kind (str): ADDRESS_CHANGE, NEW_PACKAGE, PACKAGE_DELAY or TRUCK_BREAKDOWN
+            time (datetime.timedelta): When the change becomes known
+            package_id (int): Package that changes (address change, delay)
+            address (str): New delivery address (address change)
+            until (datetime.timedelta): Time the package reaches the hub (delay)
+            truck_id (int): Truck that breaks down, or the truck a new package must go on
+            package (dict): New package fields: id, address, city, zip, deadline, weight, notes
+        """
+        if kind not in CHANGE_KINDS:
+            raise RouteChangeError(f"Unknown change {kind!r}, expected one of {', '.join(CHANGE_KINDS)}")
+        self.kind = kind
+        self.time = time
+        self.package_id = package_id
+        self.address = address
+        self.until = until
+        self.truck_id = truck_id
+        self.package = package
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a change from a JSON-style definition, e.g.
+        {"kind": "address_change", "time": "10:30", "package_id": 12, "address": "410 S State St"}
+
+        Raises:
+            RouteChangeError: If a field is missing or has the wrong type
+        """
+        try:
+            kind = data['kind']
+            package = data.get('package')
+            return cls(
+                kind,
+                _parse_clock(data['time']),
+                package_id=int(data['package_id']) if data.get('package_id') is not None else None,
+                address=data.get('address'),
+                until=_parse_clock(data['until']) if data.get('until') is not None else None,
+                truck_id=int(data['truck_id']) if data.get('truck_id') is not None else None,
+                package=dict(package) if package is not None else None,
+            )
+        except KeyError as e:
+            raise RouteChangeError(f"Missing field {e.args[0]!r}") from None
+        except (TypeError, ValueError) as e:
+            if isinstance(e, RouteChangeError):
+                raise
+            raise RouteChangeError(str(e)) from None
+
+    def __repr__(self):
+        return f"RouteChange({self.kind}, {self.time}, package={self.package_id}, truck={self.truck_id})"
+
+
+class RerouteReport:
+    """What a change did: the trucks whose remaining routes were recomputed and how long it took."""
+
+    __slots__ = ('change', 'trucks', 'late_packages', 'seconds')
+
+    def __init__(self, change, trucks, late_packages, seconds):
+        self.change = change
+        self.trucks = trucks  # SimulatedTruck objects that were rerouted, in truck ID order
+        self.late_packages = late_packages  # Package IDs on those trucks delivered after their deadline
+        self.seconds = seconds
+
+    def to_dict(self):
+        return {
+            'kind': self.change.kind,
+            'time': str(self.change.time),
+            'trucks': [
+                {
+                    'id': truck.id,
+                    'packages': list(truck.packages),
+                    'mileage': round(float(truck.mileage), 1),
+                    'departure_time': str(truck.departure_time) if truck.departure_time is not None else None,
+                    'completion_time': str(truck.completion_time) if truck.completion_time is not None else None,
+                    'breakdown_time': str(truck.breakdown_time) if truck.breakdown_time is not None else None,
+                    'remaining_stops': [visit.location for visit in truck.visits
+                                        if visit.arrival_time > self.change.time],
+                }
+                for truck in self.trucks
+            ],
+            'late_packages': self.late_packages,
+            'milliseconds': round(self.seconds * 1000, 3),
+        }
+
+
+def _copy_truck(truck, packages=None):
+    clone = SimulatedTruck(truck.id, list(truck.packages if packages is None else packages), truck.speed)
+    clone.mileage = truck.mileage
+    clone.unimproved_mileage = truck.unimproved_mileage
+    clone.current_location = truck.current_location
+    clone.departure_time = truck.departure_time
+    clone.completion_time = truck.completion_time
+    clone.driver = truck.driver
+    clone.visits = list(truck.visits)
+    clone._next_visit = truck._next_visit
+    clone.breakdown_time = truck.breakdown_time
+    return clone
+
+
+class _Reroute:
+    """Working state for applying one change to a plan snapshot."""
+
+    def __init__(self, plan, change, speed, hub, capacity, improve, time_budget):
+        self.plan = plan
+        self.change = change
+        self.speed = speed
+        self.hub = hub
+        self.capacity = capacity
+        self.improve = improve
+        self.time_budget = time_budget
+
+        self.package_store = plan.package_store.copy()
+        self.constraints = None  # Copied once any new rows are in the store
+        self.trucks = {truck.id: truck for truck in plan.simulation_result.trucks}
+        self.loads = {load.truck_id: load for load in plan.assignment.loads}
+        self.rerouted = {}  # Truck ID -> new SimulatedTruck
+        self.cut_times = {}  # Truck ID -> events after this time are replaced
+        self.moved = {}  # Package ID -> truck ID for packages whose truck or times changed
+        self.extra_events = []
+        self.stranded = set()  # Packages picked up from a broken-down truck rather than loaded at the hub
+
+    # Package state
+
+    def _row(self, package_id):
+        row = self.package_store.row_of(package_id)
+        if row is None:
+            raise RouteChangeError(f"Package {package_id} not found")
+        return row
+
+    def _delivered_by(self, package_id, at_time):
+        seconds = self.plan.timeline.boundaries[self._row(package_id) * 3 + 2]
+        return seconds <= at_time.total_seconds()
+
+    def _departed_by(self, package_id, at_time):
+        seconds = self.plan.timeline.boundaries[self._row(package_id) * 3 + 1]
+        return seconds <= at_time.total_seconds()
+
+    def _resolve(self, address):
+        try:
+            return self.plan.address_index.resolve(address)
+        except UnknownAddressError:
+            raise RouteChangeError(f"Address {address!r} is not in the address file") from None
+
+    def _truck_of(self, package_id):
+        truck_id = self.plan.truck_of(package_id)
+        if not truck_id:
+            raise RouteChangeError(f"Package {package_id} is not on a truck")
+        return truck_id
+
+    # Truck state
+
+    def _departed(self, truck, at_time):
+        return truck.departure_time is not None and truck.departure_time <= at_time
+
+    def _in_flight(self, package_id, at_time):
+        """Check whether a package is on the stop its truck is driving to at at_time."""
+        truck_id = self.plan.truck_of(package_id)
+        truck = self.rerouted.get(truck_id) or self.trucks.get(truck_id)
+        if truck is None or not self._departed(truck, at_time):
+            return False
+        done = bisect.bisect_right([visit.arrival_time for visit in truck.visits], at_time)
+        return done < len(truck.visits) and package_id in truck.visits[done].package_ids
+
+    def _candidates(self, location, not_before, exclude=()):
+        """Trucks still at the hub at not_before with room for one more package, nearest stops first."""
+        distances = self.plan.distance_matrix[location]
+        if hasattr(distances, 'tolist'):
+            distances = distances.tolist()  # One conversion instead of a NumPy scalar per lookup
+        options = []
+        for truck in self.trucks.values():
+            if truck.id in exclude or truck.breakdown_time is not None:
+                continue
+            if self._departed(truck, not_before) or truck.departure_time is None:
+                continue
+            packages = self.rerouted[truck.id].packages if truck.id in self.rerouted else truck.packages
+            if len(packages) >= self.capacity:
+                continue
+            stop_locations = [visit.location for visit in truck.visits] or [self.hub]
+            options.append((min(distances[stop] for stop in stop_locations), truck.id))
+        return [truck_id for _, truck_id in sorted(options)]
+
+    def _pick_truck(self, location, not_before, requested=None, exclude=()):
+        candidates = self._candidates(location, not_before, exclude)
+        if requested is not None:
+            if requested not in self.trucks:
+                raise RouteChangeError(f"Truck {requested} not found")
+            if requested not in candidates:
+                raise RouteChangeError(f"Truck {requested} has left the hub or is full")
+            return requested
+        if not candidates:
+            raise RouteChangeError(f"No truck is still at the hub at {not_before} with room for another package")
+        return candidates[0]
+
+    def _route(self, package_ids, start_location, start_time):
+        stops, gated, deadlines, releases = route_stops(package_ids, self.package_store, self.constraints,
+                                                        self.plan.address_index)
+        visits = nearest_neighbor_route(self.plan.distance_matrix, start_location, start_time, self.speed,
+                                        stops, gated)
+        unimproved = sum(visit.distance for visit in visits)
+        if self.improve and len(visits) > 2:
+            visits = improve_route(visits, self.plan.distance_matrix, start_location, start_time, self.speed,
+                                   deadlines, releases, time_budget=self.time_budget)
+        return visits, unimproved
+
+    def reroute(self, truck_id, package_ids, departure_time=None):
+        """
+        Recompute a truck's remaining stops from where it is at the change time.
+
+        A truck still at the hub is routed from the hub at its departure time.
+        A truck on the road first finishes the leg it is driving, and every
+        delivery up to there stands; only the packages after that are rerouted.
+        """
+        at_time = self.change.time
+        truck = self.rerouted.get(truck_id) or self.trucks[truck_id]
+        new_truck = _copy_truck(truck, package_ids)
+        if departure_time is not None:
+            new_truck.departure_time = departure_time
+
+        if not self._departed(truck, at_time):
+            committed = []
+            start_location, start_time = self.hub, new_truck.departure_time
+            new_truck.mileage = new_truck.unimproved_mileage = 0.0
+        else:
+            done = bisect.bisect_right([visit.arrival_time for visit in truck.visits], at_time)
+            committed = truck.visits[:done + 1]
+            if committed:
+                start_location, start_time = committed[-1].location, committed[-1].arrival_time
+            else:
+                start_location, start_time = self.hub, truck.departure_time
+            new_truck.mileage = new_truck.unimproved_mileage = sum(visit.distance for visit in committed)
+
+        delivered = {package_id for visit in committed for package_id in visit.package_ids}
+        remaining = [package_id for package_id in package_ids if package_id not in delivered]
+        visits, unimproved = self._route(remaining, start_location, start_time)
+        self._install(new_truck, committed + visits, new_truck.unimproved_mileage + unimproved)
+
+        # A truck waiting for this truck's driver leaves when the driver gets back
+        for load in self.loads.values():
+            waiting = self.trucks[load.truck_id]
+            if load.driver_from == truck_id and not self._departed(waiting, at_time):
+                departure = max(load.ready_time, new_truck.completion_time or new_truck.departure_time)
+                if departure != waiting.departure_time:
+                    current = self.rerouted.get(waiting.id) or waiting
+                    self.reroute(waiting.id, current.packages, departure)
+        return new_truck
+
+    def _install(self, truck, visits, unimproved):
+        truck.visits = visits
+        truck._next_visit = len(visits)
+        truck.mileage = sum(visit.distance for visit in visits)
+        truck.unimproved_mileage = unimproved
+        if visits:
+            truck.current_location = visits[-1].location
+            truck.completion_time = visits[-1].arrival_time
+        self.rerouted[truck.id] = truck
+        self.cut_times[truck.id] = self.change.time
+        for visit in visits:
+            for package_id in visit.package_ids:
+                self.moved[package_id] = truck.id
+        for package_id in truck.packages:
+            self.moved.setdefault(package_id, truck.id)
+
+    # Changes
+
+    def address_change(self):
+        change = self.change
+        package_id = change.package_id
+        row = self._row(package_id)
+        if not change.address:
+            raise RouteChangeError("An address change needs an address")
+        if self._delivered_by(package_id, change.time):
+            raise RouteChangeError(f"Package {package_id} was already delivered")
+        if self._in_flight(package_id, change.time):
+            # reroute() keeps the leg being driven, so the package would still be delivered at its old address
+            raise RouteChangeConflict(f"Truck {self.plan.truck_of(package_id)} is already driving to package "
+                                      f"{package_id}'s stop")
+        location = self._resolve(change.address)
+        truck_id = self._truck_of(package_id)
+
+        # Recorded as a correction, so the package shows its old address until the change time
+        package = self.package_store.lookup(package_id)
+        listed = self.plan.constraints.delivery_address_at(package_id, change.time, package.address)
+        strings = self.package_store.strings
+        self.constraints.correction_minutes[row] = _ceil_minutes(change.time)
+        self.constraints.corrected_address_codes[row] = strings.intern(change.address)
+        self.constraints.listed_address_codes[row] = strings.intern(listed)
+        package.address = change.address
+        package.address_index = location
+
+        self.reroute(truck_id, self.trucks[truck_id].packages)
+        return truck_id, location, (package_id,)
+
+    def new_package(self):
+        change = self.change
+        fields = change.package or {}
+        try:
+            package_id = int(fields['id'])
+            address = str(fields['address']).strip()
+        except (KeyError, TypeError, ValueError):
+            raise RouteChangeError("A new package needs an integer id and an address") from None
+        if package_id in self.package_store:
+            raise RouteChangeError(f"Package {package_id} already exists")
+        location = self._resolve(address)
+        try:
+            package = self.package_store.add(package_id, address, str(fields.get('deadline', 'EOD')),
+                                             str(fields.get('city', '')), str(fields.get('zip', '')),
+                                             fields.get('weight', 0), str(fields.get('notes', '')))
+        except ValueError as e:
+            raise RouteChangeError(f"Invalid package: {e}") from None
+        package.address_index = location
+        self.constraints = self.plan.constraints.copy(self.package_store)
+
+        truck_id = self._pick_truck(location, change.time, change.truck_id)
+        self.reroute(truck_id, list(self.trucks[truck_id].packages) + [package_id])
+        return truck_id, location, (package_id,)
+
+    def package_delay(self):
+        change = self.change
+        package_id = change.package_id
+        row = self._row(package_id)
+        if change.until is None:
+            raise RouteChangeError("A delay needs the time the package reaches the hub")
+        if self._departed_by(package_id, change.time):
+            raise RouteChangeError(f"Package {package_id} has already left the hub")
+        if self.plan.constraints.group_members(package_id):
+            raise RouteChangeError(f"Package {package_id} must ship with other packages; delay the group instead")
+        truck_id = self._truck_of(package_id)
+        self.constraints.delayed_minutes[row] = _ceil_minutes(change.until)
+        self.extra_events.append((change.until, FLIGHT_ARRIVAL, None, self.hub, (package_id,)))
+
+        truck = self.trucks[truck_id]
+        if truck.departure_time is not None and truck.departure_time >= change.until:
+            # Its truck leaves late enough; only the package's timeline changes
+            self.moved[package_id] = truck_id
+            return truck_id, self.hub, (package_id,)
+        location = self.package_store.lookup(package_id).address_index
+        new_truck_id = self._pick_truck(location, change.until, exclude=(truck_id,))
+        self.reroute(truck_id, [other for other in truck.packages if other != package_id])
+        self.reroute(new_truck_id, list(self.trucks[new_truck_id].packages) + [package_id])
+        return truck_id, self.hub, (package_id,)
+
+    def truck_breakdown(self):
+        change = self.change
+        truck = self.trucks.get(change.truck_id)
+        if truck is None:
+            raise RouteChangeError(f"Truck {change.truck_id} not found")
+        if not self._departed(truck, change.time):
+            raise RouteChangeError(f"Truck {truck.id} has not left the hub; reassign its packages instead")
+        if truck.breakdown_time is not None:
+            raise RouteChangeError(f"Truck {truck.id} already broke down at {truck.breakdown_time}")
+        if truck.completion_time is not None and truck.completion_time <= change.time:
+            raise RouteChangeError(f"Truck {truck.id} has already finished its route")
+
+        # The truck stops at the last stop it reached; deliveries up to there stand
+        done = bisect.bisect_right([visit.arrival_time for visit in truck.visits], change.time)
+        committed = truck.visits[:done]
+        location = committed[-1].location if committed else self.hub
+        delivered = {package_id for visit in committed for package_id in visit.package_ids}
+        stranded = [package_id for package_id in truck.packages if package_id not in delivered]
+        broken = _copy_truck(truck, [package_id for package_id in truck.packages if package_id in delivered])
+        broken.breakdown_time = change.time
+        broken.visits = committed
+        broken._next_visit = len(committed)
+        broken.mileage = sum(visit.distance for visit in committed)
+        broken.current_location = location
+        broken.completion_time = change.time
+        self.rerouted[truck.id] = broken
+        self.cut_times[truck.id] = change.time
+
+        # The rescue truck is the one whose driver can reach the stranded packages first
+        # once its own route is done; drivers that go on to another truck are not free
+        handed_on = {load.driver_from for load in self.loads.values() if load.driver_from is not None}
+        matrix = self.plan.distance_matrix
+        best = None
+        for other in self.trucks.values():
+            if other.id == truck.id or other.id in handed_on or other.breakdown_time is not None:
+                continue
+            if other.departure_time is None:
+                continue
+            end_location = other.visits[-1].location if other.visits else self.hub
+            free_at = max(change.time, other.completion_time or other.departure_time)
+            arrival = free_at + datetime.timedelta(hours=matrix[end_location, location] / self.speed)
+            if best is None or arrival < best[0]:
+                best = (arrival, other, end_location, free_at)
+        if best is None:
+            raise RouteChangeError(f"No other truck can pick up truck {truck.id}'s packages")
+        arrival, rescuer, end_location, _ = best
+
+        rescue = _copy_truck(rescuer, list(rescuer.packages) + stranded)
+        pickup = Visit(location, float(matrix[end_location, location]), arrival, [])
+        visits, unimproved = self._route(stranded, location, arrival)
+        self._install(rescue, list(rescuer.visits) + [pickup] + visits,
+                      rescuer.unimproved_mileage + pickup.distance + unimproved)
+        self.stranded.update(stranded)
+        for package_id in stranded:
+            self.moved[package_id] = rescuer.id
+        return truck.id, location, tuple(stranded)
+
+    # Publishing
+
+    def _truck_events(self, truck, after):
+        """Events for a rerouted truck after a time, regenerated from its visits."""
+        events = []
+        load = self.loads.get(truck.id)
+        if truck.departure_time is not None and truck.departure_time > after:
+            if load is not None and load.driver_from is not None:
+                events.append((truck.departure_time, DRIVER_HANDOFF, truck, self.hub, ()))
+            loaded = tuple(package_id for package_id in truck.packages if package_id not in self.stranded)
+            events.append((truck.departure_time, DEPARTURE, truck, self.hub, loaded))
+        previous = None
+        for visit in truck.visits:
+            if visit.arrival_time > after:
+                events.append((visit.arrival_time, ARRIVAL, truck, visit.location, visit))
+                if visit.package_ids:
+                    events.append((visit.arrival_time, DELIVERY, truck, visit.location, tuple(visit.package_ids)))
+            previous = visit
+        if truck.breakdown_time is None and truck.completion_time is not None and truck.completion_time > after:
+            events.append((truck.completion_time, ROUTE_COMPLETE, truck,
+                           previous.location if previous else self.hub, ()))
+        return events
+
+    def _events(self, change_truck_id, change_location, change_packages):
+        """The old event log with the rerouted trucks' future events replaced."""
+        old_events = self.plan.simulation_result.events
+        cut = min(self.cut_times.values(), default=self.change.time)
+        split = bisect.bisect_right(old_events, cut, key=lambda event: event.time)
+        kept = [event for event in old_events[split:]
+                if event.truck_id not in self.rerouted or event.time <= self.cut_times[event.truck_id]]
+
+        changed_truck = self.trucks.get(change_truck_id)
+        new_events = [Event(self.change.time, self.change.kind, change_truck_id, change_location, change_packages,
+                            changed_truck.driver if changed_truck is not None else None)]
+        pending = list(self.extra_events)
+        for truck in self.rerouted.values():
+            pending.extend(self._truck_events(truck, self.cut_times[truck.id]))
+        for event_time, kind, truck, location, payload in pending:
+            truck_id = truck.id if truck is not None else None
+            driver = truck.driver if truck is not None else None
+            if kind == ARRIVAL:
+                new_events.append(Event(event_time, kind, truck_id, location, (), driver, payload.distance))
+            else:
+                new_events.append(Event(event_time, kind, truck_id, location, payload, driver))
+
+        # The few new events are slotted in after any kept events at the same time, in the order
+        # they were generated, which is the order the simulation logs them
+        def order(event):
+            return event.time
+
+        new_events.sort(key=order)
+        events = old_events[:split] + kept
+        position = split
+        for event in new_events:
+            position = bisect.bisect_right(events, event.time, lo=position, key=order)
+            events.insert(position, event)
+            position += 1
+        return events
+
+    def _timeline(self):
+        old = self.plan.timeline
+        rows = {}
+        for package_id, truck_id in self.moved.items():
+            row = self._row(package_id)
+            truck = self.rerouted.get(truck_id) or self.trucks[truck_id]
+            delayed = self.constraints.delayed_until(package_id)
+            release = delayed.total_seconds() if delayed is not None else 0.0
+            known = row < len(old.truck_ids)
+            if known and old.truck_ids[row] not in (0, truck_id) and self._departed_by(package_id, self.change.time):
+                departure = old.boundaries[row * 3 + 1]  # Stranded packages keep their first departure
+            elif truck.departure_time is not None:
+                departure = truck.departure_time.total_seconds()
+            else:
+                departure = old.boundaries[row * 3 + 1] if known else DEFAULT_DEPARTURE_SECONDS
+            delivery = old.boundaries[row * 3 + 2] if known else DEFAULT_DELIVERY_SECONDS
+            for visit in truck.visits:
+                if package_id in visit.package_ids:
+                    delivery = visit.arrival_time.total_seconds()
+                    break
+            rows[row] = (release, departure, delivery, truck_id)
+
+            package = self.package_store.view(row)
+            package.departure_time = datetime.timedelta(seconds=max(departure, release))
+            package.delivery_time = datetime.timedelta(seconds=max(delivery, departure, release))
+            package.status = "Delivered"
+
+        trucks = {}
+        for truck in self.rerouted.values():
+            times, locations, miles = [0.0], [self.hub], [0.0]
+            for visit in truck.visits:
+                times.append(visit.arrival_time.total_seconds())
+                locations.append(visit.location)
+                miles.append(miles[-1] + visit.distance)
+            departure = truck.departure_time.total_seconds() if truck.departure_time is not None else None
+            completion = truck.completion_time.total_seconds() if truck.completion_time is not None else None
+            trucks[truck.id] = (times, locations, miles, departure, completion)
+        return old.updated(self.package_store, self.constraints, rows, trucks)
+
+    def apply(self):
+        if self.constraints is None and self.change.kind != NEW_PACKAGE:
+            self.constraints = self.plan.constraints.copy(self.package_store)
+        handler = {
+            ADDRESS_CHANGE: self.address_change,
+            NEW_PACKAGE: self.new_package,
+            PACKAGE_DELAY: self.package_delay,
+            TRUCK_BREAKDOWN: self.truck_breakdown,
+        }[self.change.kind]
+        change_truck_id, change_location, change_packages = handler()
+
+        events = self._events(change_truck_id, change_location, change_packages)
+        trucks = [self.rerouted.get(truck.id, truck) for truck in self.plan.simulation_result.trucks]
+        loads = []
+        for truck in self.rerouted.values():
+            old_load = self.loads.get(truck.id)
+            loads.append(TruckLoad(truck.id, list(truck.packages),
+                                   old_load.ready_time if old_load else truck.departure_time,
+                                   truck.departure_time, old_load.driver_from if old_load else None))
+        snapshot = PlanSnapshot(self.package_store, self.constraints, self.plan.distance_matrix,
+                                self.plan.address_index, self.plan.assignment.with_loads(loads),
+                                SimulationResult(trucks, events), self._timeline(), self.plan.paths)
+
+        late = []
+        for truck in self.rerouted.values():
+            for visit in truck.visits:
+                for package_id in visit.package_ids:
+                    package = self.package_store.lookup(package_id)
+                    if visit.arrival_time.total_seconds() > package.deadline_minutes * 60:
+                        late.append(package_id)
+        return snapshot, sorted(self.rerouted.values(), key=lambda truck: truck.id), sorted(late)
+
+
+@PHASE_SECONDS.timed('reroute')
+def apply_change(plan, change, speed=18, hub=0, capacity=16, improve=False, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    Apply a mid-day change to a plan and recompute only the trucks it affects.
+
+    Deliveries made before the change time are never moved. A truck on the
+    road finishes the leg it is driving, then its remaining packages are routed
+    with nearest neighbor from there; a truck still at the hub is routed from
+    the hub. A truck waiting for a rerouted truck's driver has its departure
+    moved with it. Everything else in the plan is shared with the old snapshot,
+    and the status timeline is patched row by row, so a change costs
+    milliseconds even on large fleets.
+
+    Changes:
+        ADDRESS_CHANGE: package_id gets a new address; its truck is rerouted
+        NEW_PACKAGE: package arrives at the hub; it goes on truck_id, or on the truck still at
+                     the hub with room whose stops are nearest to it
+        PACKAGE_DELAY: package_id reaches the hub at until; if its truck leaves before then the
+                       package moves to a truck leaving later
+        TRUCK_BREAKDOWN: truck_id stops at the last stop it reached; the truck whose driver is
+                         free first drives there after its own route and delivers the rest
+
+    Args:
+        plan (PlanSnapshot): Plan the change applies to (left unchanged)
+        change (RouteChange): The change
+        speed (float): Truck speed in miles per hour
+        hub (int): Location ID of the hub
+        capacity (int): Maximum packages per truck
+        improve (bool): Run 2-opt/Or-opt on each rerouted truck
+        time_budget (float): Seconds of local search per rerouted truck
+
+    Returns:
+        tuple: (new PlanSnapshot, RerouteReport)
+
+    Raises:
+        RouteChangeError: If the change cannot be applied
+    """
+    start = time.perf_counter()
+    snapshot, trucks, late = _Reroute(plan, change, speed, hub, capacity, improve, time_budget).apply()
+    return snapshot, RerouteReport(change, trucks, late, time.perf_counter() - start)
@@ -0,0 +1,113 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from response_encoding import compress
+
+
+# One entry per minute of the day
+DEFAULT_MAX_ENTRIES = 1440
+
+
+class CachedResponse:
+    """Serialized response body and its strong ETag, with compressed copies made on first request."""
+
+    __slots__ = ('body', 'etag', '_encoded')
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self._encoded = {}  # Content encoding -> compressed body
+
+    def encoded(self, encoding):
+        """
+        Get the body in a content encoding, compressing it only the first time.
+
+        Returns:
+            tuple: (body, ETag); each encoding is a different representation, so it gets its own ETag
+        """
+        if encoding is None:
+            return self.body, self.etag
+        body = self._encoded.get(encoding)
+        if body is None:
+            body = self._encoded[encoding] = compress(self.body, encoding)
+        return body, f"{self.etag}-{encoding}"
+
+
+class ResponseCache:
+    """
+    Bounded least-recently-used cache of pre-serialized responses.
+    Keys include the plan version, so entries from an older plan
+    are never served even before clear() drops them.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            max_entries (int): Entries kept before the least recently used one is evicted
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Get the cached response for a key and mark it most recently used.
+
+        Returns:
+            CachedResponse: Cached entry, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body):
+        """
+        Store a serialized body, evicting the least recently used entry if full.
+
+        Args:
+            key (hashable): Cache key
+            body (bytes): Serialized response body
+
+        Returns:
+            CachedResponse: The stored entry
+        """
+        entry = CachedResponse(body)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def clear(self):
+        """Drop every entry; the counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Get the cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,60 @@
+import gzip
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, payloads fall back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, only gzip is offered without it
+    brotli = None
+
+
+# Bodies smaller than this are sent as they are; compressing them saves less than it costs
+MIN_COMPRESS_BYTES = 1024
+
+# Compression settings: fast enough to run per uncached response, most of the size saving of the maximum
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Content encodings offered to clients, most preferred first
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def dumps(payload):
+    """
+    Serialize a JSON payload compactly, with orjson when it is installed.
+
+    Returns:
+        bytes: UTF-8 JSON without insignificant whitespace
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def compress(body, encoding):
+    """Compress a body with a content encoding from ENCODINGS."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)  # mtime=0 keeps the bytes (and ETags) stable
+    raise ValueError(f"Unsupported content encoding {encoding!r}")
+
+
+def choose_encoding(accept_encodings, size):
+    """
+    Pick the content encoding for a response body.
+
+    Args:
+        accept_encodings (werkzeug.datastructures.Accept): The request's parsed Accept-Encoding header
+        size (int): Uncompressed body size in bytes
+
+    Returns:
+        str: 'br' or 'gzip', or None to send the body uncompressed
+    """
+    if size < MIN_COMPRESS_BYTES:
+        return None
+    return accept_encodings.best_match(ENCODINGS)
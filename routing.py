@@ -0,0 +1,674 @@
+import datetime
+import time
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, fall back to a pure Python scan
+    np = None
+
+
+# Route construction modes: nearest neighbor by distance alone, or cheapest insertion that keeps deadlines
+NEAREST_NEIGHBOR = 'nearest_neighbor'
+DEADLINE_INSERTION = 'deadline_insertion'
+ROUTING_MODES = (NEAREST_NEIGHBOR, DEADLINE_INSERTION)
+
+
+class Visit:
+    """
+    One stop on a planned route.
+    All packages in a visit share the location and are delivered together.
+    """
+
+    __slots__ = ('location', 'distance', 'arrival_time', 'package_ids')
+
+    def __init__(self, location, distance, arrival_time, package_ids):
+        self.location = location
+        self.distance = distance
+        self.arrival_time = arrival_time
+        self.package_ids = package_ids
+
+    def __repr__(self):
+        return (f"Visit(location={self.location}, distance={self.distance}, "
+                f"arrival_time={self.arrival_time}, package_ids={self.package_ids})")
+
+
+class _StopList:
+    """
+    Remaining stops for one route, grouped by location.
+    Each stop remembers the load position of its first package so that ties
+    between equally distant stops resolve the same way as a package-by-package scan.
+    """
+
+    def __init__(self):
+        self.locations = []
+        self.orders = []
+        self.package_ids = []
+        self.active = []
+        self._open_stop = {}  # location -> index of the undelivered stop there
+
+    def add(self, location, order, package_id):
+        stop = self._open_stop.get(location)
+        if stop is None:
+            stop = len(self.locations)
+            self._open_stop[location] = stop
+            self.locations.append(location)
+            self.orders.append(order)
+            self.package_ids.append([package_id])
+            self.active.append(True)
+            return stop, True
+        self.package_ids[stop].append(package_id)
+        if order < self.orders[stop]:
+            self.orders[stop] = order
+        return stop, False
+
+    def close(self, stop):
+        self.active[stop] = False
+        del self._open_stop[self.locations[stop]]
+
+
+def nearest_neighbor_route(distance_matrix, start_location, start_time, speed, stops, gated=()):
+    """
+    Plan a nearest neighbor route for one truck.
+    Packages are grouped into one stop per location. Each step picks the next
+    stop with a single masked argmin over the current location's row of the
+    distance matrix, instead of scanning every remaining package.
+
+    Args:
+        distance_matrix (numpy.ndarray or PyDistanceMatrix): Mirrored distance matrix
+        start_location (int): Location ID the truck starts from
+        start_time (datetime.timedelta): Departure time
+        speed (float): Truck speed in miles per hour
+        stops (list): (package_id, location_id) pairs in truck load order
+        gated (list): (package_id, location_id, release_time, load_order) for packages
+                      that cannot be delivered before release_time
+
+    Returns:
+        list: Visit objects in delivery order
+    """
+    stop_list = _StopList()
+    for order, (package_id, location) in enumerate(stops):
+        stop_list.add(location, order, package_id)
+
+    # Gated packages are released in time order
+    pending = sorted(gated, key=lambda item: item[2])
+    pending_index = 0
+
+    use_numpy = np is not None and isinstance(distance_matrix, np.ndarray)
+    if use_numpy:
+        capacity = max(16, len(stop_list.locations) + len(pending))
+        stop_locations = np.zeros(capacity, dtype=np.intp)
+        stop_orders = np.zeros(capacity, dtype=np.int64)
+        done = np.ones(capacity, dtype=bool)
+        count = len(stop_list.locations)
+        stop_locations[:count] = stop_list.locations
+        stop_orders[:count] = stop_list.orders
+        done[:count] = False
+
+    visits = []
+    remaining = len(stop_list.locations)
+    current_location = start_location
+    truck_time = start_time
+
+    while remaining or pending_index < len(pending):
+        # Release packages whose gate has opened
+        while pending_index < len(pending) and pending[pending_index][2] <= truck_time:
+            package_id, location, _, order = pending[pending_index]
+            pending_index += 1
+            stop, created = stop_list.add(location, order, package_id)
+            if created:
+                remaining += 1
+            if use_numpy:
+                stop_locations[stop] = location
+                stop_orders[stop] = stop_list.orders[stop]
+                done[stop] = False
+
+        if not remaining:
+            # Nothing deliverable yet, wait at the current location for the next release
+            truck_time = max(truck_time, pending[pending_index][2])
+            continue
+
+        count = len(stop_list.locations)
+        if use_numpy:
+            candidates = distance_matrix[current_location, stop_locations[:count]]
+            candidates[done[:count]] = np.inf
+            stop = int(candidates.argmin())
+            ties = np.flatnonzero(candidates == candidates[stop])
+            if len(ties) > 1:
+                stop = int(ties[stop_orders[ties].argmin()])
+            nearest_distance = candidates[stop]
+        else:
+            stop = None
+            nearest_distance = float('inf')
+            for candidate in range(count):
+                if not stop_list.active[candidate]:
+                    continue
+                distance = distance_matrix[current_location, stop_list.locations[candidate]]
+                if distance < nearest_distance or (
+                        distance == nearest_distance and stop_list.orders[candidate] < stop_list.orders[stop]):
+                    nearest_distance = distance
+                    stop = candidate
+
+        truck_time += datetime.timedelta(hours=nearest_distance / speed)
+        current_location = stop_list.locations[stop]
+        visits.append(Visit(current_location, nearest_distance, truck_time, stop_list.package_ids[stop]))
+
+        stop_list.close(stop)
+        remaining -= 1
+        if use_numpy:
+            done[stop] = True
+
+    return visits
+
+
+# Smallest mileage change treated as an improvement
+_EPSILON = 1e-9
+
+# Routes up to this many stops get a local nested-list copy of their distances
+_LOCAL_MATRIX_LIMIT = 2000
+
+
+def _local_distances(distance_matrix, locations):
+    """
+    Copy the distances between the given locations into a nested list.
+    Local search reads these millions of times, and plain list indexing is
+    much faster than indexing a NumPy array one element at a time.
+    """
+    if np is not None and isinstance(distance_matrix, np.ndarray):
+        index = np.asarray(locations, dtype=np.intp)
+        return distance_matrix[np.ix_(index, index)].tolist()
+    return [[distance_matrix[a, b] for b in locations] for a in locations]
+
+
+class _RouteDistances:
+    """Distance lookup over route positions for routes too large to copy locally."""
+
+    def __init__(self, distance_matrix, locations):
+        self._matrix = distance_matrix
+        self._locations = locations
+
+    def __getitem__(self, a):
+        matrix = self._matrix
+        locations = self._locations
+        from_location = locations[a]
+        return _RowView(matrix, from_location, locations)
+
+
+class _RowView:
+    __slots__ = ('_matrix', '_from', '_locations')
+
+    def __init__(self, matrix, from_location, locations):
+        self._matrix = matrix
+        self._from = from_location
+        self._locations = locations
+
+    def __getitem__(self, b):
+        return self._matrix[self._from, self._locations[b]]
+
+
+def _schedule_cost(route, dist, start_seconds, speed, releases, deadlines, on_time=None):
+    """
+    Walk a route and total up how late it delivers.
+    A stop with a release time is not driven to before that time; the
+    truck waits at its current location instead.
+
+    Args:
+        on_time (list): Per stop, whether it must stay on time; a route that makes one late costs infinity
+
+    Returns:
+        float: Total seconds of lateness over all stops
+    """
+    seconds_per_mile = 3600.0 / speed
+    clock = start_seconds
+    previous = 0
+    lateness = 0.0
+    for stop in route:
+        release = releases[stop]
+        if release > clock:
+            clock = release
+        clock += dist[previous][stop] * seconds_per_mile
+        if clock > deadlines[stop]:
+            if on_time is not None and on_time[stop]:
+                return float('inf')
+            lateness += clock - deadlines[stop]
+        previous = stop
+    return lateness
+
+
+def _route_length(route, dist):
+    previous = 0
+    total = 0.0
+    for stop in route:
+        total += dist[previous][stop]
+        previous = stop
+    return total
+
+
+def improve_route(visits, distance_matrix, start_location, start_time, speed,
+                  deadlines=None, releases=None, time_budget=1.0, max_iterations=10000):
+    """
+    Improve a route with 2-opt and Or-opt moves.
+    The truck does not return to the hub, so routes are treated as open paths.
+    Each move's mileage change is computed in O(1) from the distance matrix; only
+    improving moves are then checked against deadlines and release times.
+
+    Args:
+        visits (list): Visit objects from nearest_neighbor_route
+        distance_matrix (numpy.ndarray or PyDistanceMatrix): Mirrored distance matrix
+        start_location (int): Location ID the truck starts from
+        start_time (datetime.timedelta): Departure time
+        speed (float): Truck speed in miles per hour
+        deadlines (dict): Package ID -> latest delivery time (datetime.timedelta)
+        releases (dict): Package ID -> earliest time the truck may head for the package
+        time_budget (float): Seconds of wall-clock time to spend searching
+        max_iterations (int): Maximum number of improving moves to apply
+
+    Returns:
+        list: Visit objects in the improved order, with distances and arrival
+              times recomputed. Lateness is never increased, and no stop that
+              was on time becomes late.
+    """
+    deadlines = deadlines or {}
+    releases = releases or {}
+    count = len(visits)
+    if count < 2:
+        return visits
+
+    # Position 0 is the start location, positions 1..count are the visits
+    locations = [start_location] + [visit.location for visit in visits]
+    if count + 1 <= _LOCAL_MATRIX_LIMIT:
+        dist = _local_distances(distance_matrix, locations)
+    else:
+        dist = _RouteDistances(distance_matrix, locations)
+
+    no_deadline = float('inf')
+    stop_releases = [0.0] * (count + 1)
+    stop_deadlines = [no_deadline] * (count + 1)
+    for position, visit in enumerate(visits, start=1):
+        for package_id in visit.package_ids:
+            release = releases.get(package_id)
+            if release is not None:
+                stop_releases[position] = max(stop_releases[position], release.total_seconds())
+            deadline = deadlines.get(package_id)
+            if deadline is not None:
+                stop_deadlines[position] = min(stop_deadlines[position], deadline.total_seconds())
+
+    start_seconds = start_time.total_seconds()
+    route = list(range(1, count + 1))
+    lateness = _schedule_cost(route, dist, start_seconds, speed, stop_releases, stop_deadlines)
+
+    # Stops the input route delivers on time must stay on time, so a move cannot trade one late stop for another
+    on_time = [True] * (count + 1)
+    seconds_per_mile = 3600.0 / speed
+    clock = start_seconds
+    for position in route:
+        clock = max(clock, stop_releases[position]) + dist[position - 1][position] * seconds_per_mile
+        on_time[position] = clock <= stop_deadlines[position]
+
+    def accept(candidate):
+        candidate_lateness = _schedule_cost(candidate, dist, start_seconds, speed, stop_releases, stop_deadlines,
+                                            on_time)
+        return candidate_lateness <= lateness + _EPSILON, candidate_lateness
+
+    deadline_clock = time.perf_counter() + time_budget
+    iterations = 0
+    improved = True
+    while improved and iterations < max_iterations:
+        improved = False
+
+        # 2-opt: reverse route[i..j]
+        for i in range(count - 1):
+            if time.perf_counter() > deadline_clock or iterations >= max_iterations:
+                break
+            before = route[i - 1] if i > 0 else 0
+            first = route[i]
+            row_before = dist[before]
+            row_first = dist[first]
+            removed_head = row_before[first]
+            for j in range(i + 1, count):
+                last = route[j]
+                delta = row_before[last] - removed_head
+                if j + 1 < count:
+                    after = route[j + 1]
+                    delta += row_first[after] - dist[last][after]
+                if delta < -_EPSILON:
+                    candidate = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+                    ok, candidate_lateness = accept(candidate)
+                    if ok:
+                        route = candidate
+                        lateness = candidate_lateness
+                        iterations += 1
+                        improved = True
+                        break
+
+        # Or-opt: move a segment of 1-3 stops elsewhere, optionally reversed
+        for segment_length in (1, 2, 3):
+            i = 0
+            while i + segment_length <= count:
+                if time.perf_counter() > deadline_clock or iterations >= max_iterations:
+                    break
+                end = i + segment_length - 1
+                before = route[i - 1] if i > 0 else 0
+                head = route[i]
+                tail = route[end]
+                after = route[end + 1] if end + 1 < count else None
+                removal_gain = dist[before][head]
+                if after is not None:
+                    removal_gain += dist[tail][after] - dist[before][after]
+
+                moved = False
+                # Insert between route[p] and route[p + 1] (p = -1 means right after the start)
+                for p in range(-1, count):
+                    if i - 1 <= p <= end:
+                        continue
+                    x = route[p] if p >= 0 else 0
+                    y = route[p + 1] if p + 1 < count else None
+                    row_x = dist[x]
+                    forward = row_x[head]
+                    backward = row_x[tail]
+                    if y is not None:
+                        bridge = row_x[y]
+                        forward += dist[tail][y] - bridge
+                        backward += dist[head][y] - bridge
+                    reverse = backward < forward
+                    delta = (backward if reverse else forward) - removal_gain
+                    if delta < -_EPSILON:
+                        segment = route[i:end + 1]
+                        if reverse:
+                            segment = segment[::-1]
+                        rest = route[:i] + route[end + 1:]
+                        insert_at = p + 1 if p < i else p + 1 - segment_length
+                        candidate = rest[:insert_at] + segment + rest[insert_at:]
+                        ok, candidate_lateness = accept(candidate)
+                        if ok:
+                            route = candidate
+                            lateness = candidate_lateness
+                            iterations += 1
+                            improved = True
+                            moved = True
+                            break
+                if not moved:
+                    i += 1
+
+        if time.perf_counter() > deadline_clock:
+            break
+
+    # Rebuild visits with the same time arithmetic as nearest_neighbor_route
+    improved_visits = []
+    truck_time = start_time
+    previous = 0
+    for position in route:
+        visit = visits[position - 1]
+        for package_id in visit.package_ids:
+            release = releases.get(package_id)
+            if release is not None and release > truck_time:
+                # Wait at the current location until the package can be routed
+                truck_time = release
+        distance = distance_matrix[locations[previous], visit.location]
+        truck_time += datetime.timedelta(hours=distance / speed)
+        improved_visits.append(Visit(visit.location, distance, truck_time, visit.package_ids))
+        previous = position
+    return improved_visits
+
+
+def _insertion_stops(stops, gated, deadlines, releases):
+    """
+    Group packages into stops for insertion: one per location, plus one per (location, release)
+    for packages that cannot be routed before a release time.
+
+    Returns:
+        tuple: (locations, package ID lists, release seconds, deadline seconds) per stop
+    """
+    locations = []
+    package_ids = []
+    stop_releases = []
+    stop_deadlines = []
+    index_of = {}
+    no_deadline = float('inf')
+    for package_id, location, release in ([(package_id, location, 0.0) for package_id, location in stops] +
+                                          [(package_id, location, release_time.total_seconds())
+                                           for package_id, location, release_time, _ in gated]):
+        key = (location, release)
+        stop = index_of.get(key)
+        if stop is None:
+            stop = index_of[key] = len(locations)
+            locations.append(location)
+            package_ids.append([])
+            stop_releases.append(release)
+            stop_deadlines.append(no_deadline)
+        package_ids[stop].append(package_id)
+        release = releases.get(package_id)
+        if release is not None:
+            stop_releases[stop] = max(stop_releases[stop], release.total_seconds())
+        deadline = deadlines.get(package_id)
+        if deadline is not None:
+            stop_deadlines[stop] = min(stop_deadlines[stop], deadline.total_seconds())
+    return locations, package_ids, stop_releases, stop_deadlines
+
+
+class _InsertionRoute:
+    """
+    A route under construction with each position's arrival time and forward slack.
+
+    The truck waits at its current location until the next stop's release time,
+    then drives there. Slack at a position is how much later the truck could
+    arrive there without any stop from there on missing its deadline; waiting
+    time absorbs delay, so slack[i] = min(deadline[i] - arrival[i], wait[i + 1] +
+    slack[i + 1]). With it, checking whether a stop fits between two positions
+    looks only at those two positions, whatever the length of the route.
+    """
+
+    def __init__(self, distance_matrix, start_location, start_seconds, seconds_per_mile):
+        self.distance_matrix = distance_matrix
+        self.start_location = start_location
+        self.start_seconds = start_seconds
+        self.seconds_per_mile = seconds_per_mile
+        self.stops = []
+        self.locations = []
+        self.releases = []
+        self.deadlines = []  # Deadlines the route must keep; infinite for stops that are already late
+        self.arrivals = []
+        self.waits = []  # Seconds waited before leaving for each position
+        self.slacks = []
+
+    def _previous(self, position):
+        if position == 0:
+            return self.start_location, self.start_seconds
+        return self.locations[position - 1], self.arrivals[position - 1]
+
+    def extend(self, stops, locations, releases, deadlines):
+        """Append stops in order and recompute every arrival time and slack."""
+        self.stops.extend(stops)
+        self.locations.extend(locations)
+        self.releases.extend(releases)
+        self.deadlines.extend(deadlines)
+        count = len(self.locations)
+        self.arrivals = [0.0] * count
+        self.waits = [0.0] * count
+        self.slacks = [0.0] * count
+        for index in range(count):
+            previous_location, previous_arrival = self._previous(index)
+            self.waits[index] = max(0.0, self.releases[index] - previous_arrival)
+            self.arrivals[index] = previous_arrival + self.waits[index] + \
+                self.distance_matrix[previous_location, self.locations[index]] * self.seconds_per_mile
+        for index in range(count - 1, -1, -1):
+            slack = self.deadlines[index] - self.arrivals[index]
+            if index + 1 < count:
+                slack = min(slack, self.waits[index + 1] + self.slacks[index + 1])
+            self.slacks[index] = slack
+
+    def best_position(self, location, release, deadline):
+        """
+        Find the cheapest position for a stop that keeps every deadline.
+
+        Returns:
+            int: Position to insert at, or None if no position keeps every deadline
+        """
+        count = len(self.locations)
+        matrix = self.distance_matrix
+        if np is not None and isinstance(matrix, np.ndarray) and count > 32:
+            previous_locations = np.empty(count + 1, dtype=np.intp)
+            previous_locations[0] = self.start_location
+            previous_locations[1:] = self.locations
+            previous_arrivals = np.empty(count + 1)
+            previous_arrivals[0] = self.start_seconds
+            previous_arrivals[1:] = self.arrivals
+            to_stop = matrix[previous_locations, location]
+            arrival = np.maximum(previous_arrivals, release) + to_stop * self.seconds_per_mile
+            feasible = arrival <= deadline
+            cost = to_stop.copy()
+            if count:
+                next_locations = previous_locations[1:]
+                from_stop = matrix[location, next_locations]
+                next_arrival = (np.maximum(arrival[:-1], self.releases) + from_stop * self.seconds_per_mile)
+                feasible[:-1] &= next_arrival - previous_arrivals[1:] <= self.slacks
+                cost[:-1] += from_stop - matrix[previous_locations[:-1], next_locations]
+            cost[~feasible] = np.inf
+            position = int(cost.argmin())
+            return position if feasible[position] else None
+
+        best = None
+        best_cost = float('inf')
+        for position in range(count + 1):
+            previous_location, previous_arrival = self._previous(position)
+            to_stop = matrix[previous_location, location]
+            arrival = max(previous_arrival, release) + to_stop * self.seconds_per_mile
+            if arrival > deadline:
+                continue
+            cost = to_stop
+            if position < count:
+                next_location = self.locations[position]
+                from_stop = matrix[location, next_location]
+                next_arrival = max(arrival, self.releases[position]) + from_stop * self.seconds_per_mile
+                if next_arrival - self.arrivals[position] > self.slacks[position]:
+                    continue
+                cost += from_stop - matrix[previous_location, next_location]
+            if cost < best_cost:
+                best = position
+                best_cost = cost
+        return best
+
+    def insert(self, position, stop, location, release, deadline):
+        """Insert a stop and update the arrival times after it and the slacks before it."""
+        self.stops.insert(position, stop)
+        self.locations.insert(position, location)
+        self.releases.insert(position, release)
+        self.deadlines.insert(position, deadline)
+        self.arrivals.insert(position, None)
+        self.waits.insert(position, 0.0)
+        self.slacks.insert(position, 0.0)
+
+        # Later arrivals move until a wait for a release absorbs the delay
+        count = len(self.locations)
+        last_changed = position
+        for index in range(position, count):
+            previous_location, previous_arrival = self._previous(index)
+            wait = max(0.0, self.releases[index] - previous_arrival)
+            arrival = previous_arrival + wait + self.distance_matrix[previous_location, self.locations[index]] \
+                * self.seconds_per_mile
+            self.waits[index] = wait
+            if index > position and arrival == self.arrivals[index]:
+                break
+            self.arrivals[index] = arrival
+            last_changed = index
+
+        # Slack changes only at and before the last moved arrival, and stops changing below the insertion
+        for index in range(last_changed, -1, -1):
+            slack = self.deadlines[index] - self.arrivals[index]
+            if index + 1 < count:
+                slack = min(slack, self.waits[index + 1] + self.slacks[index + 1])
+            if index < position and slack == self.slacks[index]:
+                break
+            self.slacks[index] = slack
+
+
+def deadline_insertion_route(distance_matrix, start_location, start_time, speed, stops, gated=(),
+                             deadlines=None, releases=None):
+    """
+    Plan a route for one truck that keeps delivery deadlines, by cheapest insertion.
+
+    The nearest neighbor tour is the starting point. Its late stops are taken
+    out, which leaves a route where every stop is on time, and they are then
+    inserted back earliest deadline first (farthest first among equal
+    deadlines), each at the position that adds the fewest miles without making
+    any stop on the route late. Each candidate position is checked in O(1)
+    against the route's forward slack, and the slack is updated after each
+    insertion only as far as it changes, so the work per insertion is one pass
+    over the positions (a vectorized pass with NumPy). Stops that fit nowhere
+    on time are inserted last, where they add the fewest miles without delaying
+    any on-time stop past its deadline. When the nearest neighbor tour keeps
+    every deadline it is returned unchanged.
+
+    Args:
+        distance_matrix (numpy.ndarray or PyDistanceMatrix): Mirrored distance matrix
+        start_location (int): Location ID the truck starts from
+        start_time (datetime.timedelta): Departure time
+        speed (float): Truck speed in miles per hour
+        stops (list): (package_id, location_id) pairs in truck load order
+        gated (list): (package_id, location_id, release_time, load_order) for packages
+                      that cannot be delivered before release_time
+        deadlines (dict): Package ID -> latest delivery time (datetime.timedelta)
+        releases (dict): Package ID -> earliest time the truck may head for the package
+
+    Returns:
+        tuple: (Visit objects in delivery order, package IDs that could not be delivered on time)
+    """
+    deadlines = deadlines or {}
+    releases = releases or {}
+    locations, package_ids, stop_releases, stop_deadlines = _insertion_stops(stops, gated, deadlines, releases)
+    stop_of = {}
+    for stop, stop_package_ids in enumerate(package_ids):
+        for package_id in stop_package_ids:
+            stop_of[package_id] = stop
+
+    # Nearest neighbor order, less its late stops; dropping a stop can only make the ones after it earlier,
+    # except where rounding in the distance table breaks the triangle inequality, so check until none is late
+    order = []
+    for visit in nearest_neighbor_route(distance_matrix, start_location, start_time, speed, stops, gated):
+        for stop in sorted({stop_of[package_id] for package_id in visit.package_ids}):
+            order.append(stop)
+    start_seconds = start_time.total_seconds()
+    seconds_per_mile = 3600.0 / speed
+    dropped = []
+    while True:
+        route = _InsertionRoute(distance_matrix, start_location, start_seconds, seconds_per_mile)
+        route.extend(order, [locations[stop] for stop in order], [stop_releases[stop] for stop in order],
+                     [stop_deadlines[stop] for stop in order])
+        on_time = [stop for stop, arrival in zip(order, route.arrivals) if arrival <= stop_deadlines[stop]]
+        if len(on_time) == len(order):
+            break
+        on_time_set = set(on_time)
+        dropped.extend(stop for stop in order if stop not in on_time_set)
+        order = on_time
+
+    dropped.sort(key=lambda stop: (stop_deadlines[stop], -distance_matrix[start_location, locations[stop]], stop))
+    late = []
+    for stop in dropped:
+        position = route.best_position(locations[stop], stop_releases[stop], stop_deadlines[stop])
+        if position is None:
+            late.append(stop)
+        else:
+            route.insert(position, stop, locations[stop], stop_releases[stop], stop_deadlines[stop])
+    no_deadline = float('inf')
+    for stop in late:
+        position = route.best_position(locations[stop], stop_releases[stop], no_deadline)
+        route.insert(position, stop, locations[stop], stop_releases[stop], no_deadline)
+
+    # Rebuild visits with the same time arithmetic as nearest_neighbor_route; stops at one location
+    # reached together (a released package joining the others there) make a single visit
+    visits = []
+    truck_time = start_time
+    previous_location = start_location
+    for stop in route.stops:
+        release = datetime.timedelta(seconds=stop_releases[stop])
+        if visits and locations[stop] == previous_location and release <= truck_time:
+            visits[-1].package_ids.extend(package_ids[stop])
+            continue
+        if release > truck_time:
+            truck_time = release  # Wait at the current location until the stop can be routed
+        distance = distance_matrix[previous_location, locations[stop]]
+        truck_time += datetime.timedelta(hours=distance / speed)
+        visits.append(Visit(locations[stop], distance, truck_time, list(package_ids[stop])))
+        previous_location = locations[stop]
+    late_packages = sorted(package_id for visit in visits for package_id in visit.package_ids
+                           if package_id in deadlines and visit.arrival_time > deadlines[package_id])
+    return visits, late_packages
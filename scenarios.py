@@ -0,0 +1,287 @@
+import copy
+import datetime
+import json
+import multiprocessing
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from address_index import UnknownAddressError
+from assignment import AssignmentError, assign_packages
+from constraints import NONE, ConstraintError
+from routing import NEAREST_NEIGHBOR, ROUTING_MODES
+from simulation import simulate_day
+
+
+# Inputs every scenario reads: (package store, constraints, distance matrix, address index).
+# Set in the parent before the pool starts, so forked workers inherit them without pickling.
+_shared = None
+
+
+class ScenarioError(ValueError):
+    """Raised for a scenario definition that cannot be run."""
+
+
+def _parse_clock(value):
+    """Convert "8:00" / "9:05 am" text or minutes after midnight into a timedelta."""
+    if isinstance(value, datetime.timedelta):
+        return value
+    if isinstance(value, (int, float)):
+        return datetime.timedelta(minutes=value)
+    text = str(value).strip().lower().replace('.', '')
+    clock, _, meridiem = text.partition(' ')
+    try:
+        hour, minute = map(int, clock.split(':'))
+    except ValueError:
+        raise ScenarioError(f"Invalid time {value!r}, expected H:MM") from None
+    if meridiem == 'pm' and hour != 12:
+        hour += 12
+    elif meridiem == 'am' and hour == 12:
+        hour = 0
+    return datetime.timedelta(hours=hour, minutes=minute)
+
+
+def _routing_mode(value):
+    if value not in ROUTING_MODES:
+        raise ValueError(f"routing must be one of {', '.join(ROUTING_MODES)}")
+    return value
+
+
+class Scenario:
+    """One what-if variant of the delivery day."""
+
+    __slots__ = ('name', 'truck_count', 'driver_count', 'capacity', 'start_time', 'pinned', 'improve',
+                 'time_budget', 'assign_budget', 'routing')
+
+    def __init__(self, name, truck_count=3, driver_count=2, capacity=16, start_time=datetime.timedelta(hours=8),
+                 pinned=None, improve=False, time_budget=1.0, assign_budget=1.0, routing=NEAREST_NEIGHBOR):
+        """
+        Args:
+            name (str): Label shown in the results
+            truck_count (int): Number of trucks available
+            driver_count (int): Number of drivers
+            capacity (int): Maximum packages per truck
+            start_time (datetime.timedelta): Earliest departure from the hub
+            pinned (dict): Truck ID -> package IDs that must ride on that truck
+            improve (bool): Run 2-opt/Or-opt on each route
+            time_budget (float): Seconds of local search per truck
+            assign_budget (float): Seconds spent improving the truck assignment
+            routing (str): Route construction mode, 'nearest_neighbor' or 'deadline_insertion'
+        """
+        self.name = name
+        self.truck_count = truck_count
+        self.driver_count = driver_count
+        self.capacity = capacity
+        self.start_time = start_time
+        self.pinned = pinned or {}
+        self.improve = improve
+        self.time_budget = time_budget
+        self.assign_budget = assign_budget
+        self.routing = routing
+
+    @classmethod
+    def from_dict(cls, data, default_name=None):
+        """
+        Build a scenario from a JSON-style definition, e.g.
+        {"name": "late start", "trucks": 3, "drivers": 2, "start_time": "8:30",
+         "pinned": {"3": [6, 25, 28, 32]}}
+
+        Raises:
+            ScenarioError: If a field has the wrong type
+        """
+        try:
+            pinned = {int(truck_id): [int(package_id) for package_id in package_ids]
+                      for truck_id, package_ids in (data.get('pinned') or {}).items()}
+            return cls(
+                name=str(data.get('name', default_name)),
+                truck_count=int(data.get('trucks', 3)),
+                driver_count=int(data.get('drivers', 2)),
+                capacity=int(data.get('capacity', 16)),
+                start_time=_parse_clock(data.get('start_time', '8:00')),
+                pinned=pinned,
+                improve=bool(data.get('improve', False)),
+                time_budget=float(data.get('time_budget', 1.0)),
+                assign_budget=float(data.get('assign_budget', 1.0)),
+                routing=_routing_mode(data.get('routing', NEAREST_NEIGHBOR)),
+            )
+        except (TypeError, ValueError, AttributeError) as e:
+            raise ScenarioError(f"Scenario {data.get('name', default_name)!r}: {e}") from None
+
+    def __repr__(self):
+        return (f"Scenario({self.name!r}, trucks={self.truck_count}, drivers={self.driver_count}, "
+                f"start={self.start_time})")
+
+
+class ScenarioResult:
+    """Outcome of one scenario; error is set instead of the figures when it could not be run."""
+
+    __slots__ = ('name', 'mileage', 'late_packages', 'late_minutes', 'finish_time', 'loads', 'seconds', 'error')
+
+    def __init__(self, name, mileage=None, late_packages=(), late_minutes=0.0, finish_time=None, loads=(),
+                 seconds=0.0, error=None):
+        self.name = name
+        self.mileage = mileage
+        self.late_packages = list(late_packages)  # Package IDs delivered after their deadline (or never)
+        self.late_minutes = late_minutes
+        self.finish_time = finish_time  # Last delivery of the day
+        self.loads = list(loads)  # (truck ID, package IDs, departure time) in departure order
+        self.seconds = seconds
+        self.error = error
+
+    @property
+    def violations(self):
+        return len(self.late_packages)
+
+    def sort_key(self):
+        """Runnable scenarios first, then fewest deadline violations, then fewest miles."""
+        return (self.error is not None, self.violations, self.mileage if self.mileage is not None else 0.0,
+                self.name)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'mileage': round(self.mileage, 1) if self.mileage is not None else None,
+            'violations': self.violations,
+            'late_packages': self.late_packages,
+            'late_minutes': round(self.late_minutes, 1),
+            'finish_time': str(self.finish_time) if self.finish_time is not None else None,
+            'loads': [{'truck_id': truck_id, 'package_ids': package_ids, 'departure_time': str(departure)}
+                      for truck_id, package_ids, departure in self.loads],
+            'seconds': round(self.seconds, 3),
+            'error': self.error,
+        }
+
+
+def load_scenarios(filename):
+    """
+    Read scenario definitions from a JSON file holding a list of Scenario.from_dict objects
+    (or an object with a "scenarios" list).
+
+    Returns:
+        list: Scenario objects; unnamed scenarios are called "scenario 1", "scenario 2", ...
+    """
+    with open(filename, 'r') as scenario_file:
+        data = json.load(scenario_file)
+    if isinstance(data, dict):
+        data = data.get('scenarios', [])
+    if not isinstance(data, list):
+        raise ScenarioError(f"{filename} must hold a list of scenarios")
+    return [Scenario.from_dict(item, default_name=f"scenario {number}") for number, item in enumerate(data, 1)]
+
+
+def _pin_packages(constraints, pinned):
+    """
+    Get constraints that also require each pinned package to ride on its truck.
+    Only the required-truck column is copied; everything else stays shared.
+    """
+    if not pinned:
+        return constraints
+    pinned_constraints = copy.copy(constraints)
+    pinned_constraints.required_trucks = array(constraints.required_trucks.typecode, constraints.required_trucks)
+    for truck_id, package_ids in pinned.items():
+        for package_id in package_ids:
+            row = constraints.package_store.row_of(package_id)
+            if row is None:
+                raise ScenarioError(f"Package {package_id} pinned to truck {truck_id} does not exist")
+            required = constraints.required_trucks[row]
+            if required != NONE and required != truck_id:
+                raise ScenarioError(f"Package {package_id} can only be on truck {required}, not truck {truck_id}")
+            pinned_constraints.required_trucks[row] = truck_id
+    return pinned_constraints
+
+
+def run_scenario(scenario, package_store, constraints, distance_matrix, address_index):
+    """
+    Assign and simulate one scenario.
+
+    The package store's simulated columns are checkpointed and restored, so
+    scenarios run back to back on the same store see the same starting day.
+
+    Returns:
+        ScenarioResult: Mileage and deadline violations, or the reason the scenario failed
+    """
+    start = time.perf_counter()
+    checkpoint = package_store.checkpoint()
+    try:
+        scenario_constraints = _pin_packages(constraints, scenario.pinned)
+        plan = assign_packages(package_store, scenario_constraints, address_index, distance_matrix,
+                               truck_count=scenario.truck_count, capacity=scenario.capacity,
+                               driver_count=scenario.driver_count, start_time=scenario.start_time,
+                               time_budget=scenario.assign_budget)
+        result = simulate_day(plan, package_store, scenario_constraints, distance_matrix, address_index,
+                              driver_count=scenario.driver_count, improve=scenario.improve,
+                              time_budget=scenario.time_budget, routing=scenario.routing)
+        late_packages, late_minutes = result.late_packages(package_store)
+        finish_times = [truck.completion_time for truck in result.trucks if truck.completion_time is not None]
+        return ScenarioResult(
+            scenario.name,
+            mileage=result.total_mileage,
+            late_packages=late_packages,
+            late_minutes=late_minutes,
+            finish_time=max(finish_times) if finish_times else None,
+            loads=[(truck.id, list(truck.packages), truck.departure_time) for truck in result.trucks],
+            seconds=time.perf_counter() - start,
+        )
+    except (ScenarioError, AssignmentError, ConstraintError, UnknownAddressError) as e:
+        return ScenarioResult(scenario.name, seconds=time.perf_counter() - start, error=str(e))
+    finally:
+        package_store.restore(checkpoint)
+
+
+def _install_shared(shared):
+    global _shared
+    _shared = shared
+
+
+def _run_shared(scenario):
+    return run_scenario(scenario, *_shared)
+
+
+def rank_results(results):
+    """Sort scenario results best first: fewest deadline violations, then lowest mileage."""
+    return sorted(results, key=ScenarioResult.sort_key)
+
+
+def run_scenarios(scenarios, package_store, constraints, distance_matrix, address_index, workers=None):
+    """
+    Run a batch of scenarios in a process pool and rank the results.
+
+    The large read-only inputs are handed to each worker once, not pickled
+    with every task: on platforms with fork they are inherited from this
+    process (copy-on-write, and a memory-mapped distance matrix stays one
+    physical copy); elsewhere they are sent once per worker by the pool's
+    initializer. Each task only carries its small Scenario.
+
+    Args:
+        scenarios (list): Scenario definitions
+        package_store (PackageStore): Loaded packages with resolved locations
+        constraints (PackageConstraints): Compiled special-notes constraints
+        distance_matrix (numpy.ndarray or PyDistanceMatrix): Mirrored distance matrix
+        address_index (AddressIndex): Address lookup for corrected addresses
+        workers (int): Worker processes (default: one per CPU, at most one per scenario);
+                       1 runs every scenario in this process
+
+    Returns:
+        list: ScenarioResult objects, best first
+    """
+    scenarios = list(scenarios)
+    if not scenarios:
+        return []
+    shared = (package_store, constraints, distance_matrix, address_index)
+    workers = min(workers or os.cpu_count() or 1, len(scenarios))
+    if workers == 1:
+        return rank_results(run_scenario(scenario, *shared) for scenario in scenarios)
+
+    global _shared
+    if 'fork' in multiprocessing.get_all_start_methods():
+        _shared = shared
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'))
+    else:
+        pool = ProcessPoolExecutor(workers, initializer=_install_shared, initargs=(shared,))
+    try:
+        with pool:
+            results = list(pool.map(_run_shared, scenarios))
+    finally:
+        _shared = None
+    return rank_results(results)
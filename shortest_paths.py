@@ -0,0 +1,215 @@
+import os
+
+from distance_matrix import PyDistanceMatrix, cache_path, file_digest, load_distance_matrix, np, write_cache
+from metrics import PHASE_SECONDS
+
+
+# Rows of the matrix relaxed together per intermediate location; bounds the temporary arrays to
+# BLOCK_ROWS x size, so large tables are processed a cache-sized block at a time
+BLOCK_ROWS = 64
+
+# A path through another location must be shorter by more than this to replace the direct distance,
+# so sums like 0.7 + 0.2 < 0.9 that differ only in floating point rounding are not taken as shortcuts
+EPSILON = 1e-9
+
+# Compiled closures are cached next to the compiled distance matrix under these variant names
+DISTANCES_VARIANT = 'shortest'
+NEXT_HOP_VARIANT = 'next_hop'
+NEXT_HOP_DTYPE = 'int32'
+
+
+class ShortestPaths:
+    """
+    Shortest driving distances between every pair of locations, and the route behind each.
+
+    The distance table's direct distances do not always satisfy the triangle
+    inequality: driving through another address can be shorter. distances[i, j]
+    is the length of the shortest route from i to j, and next_hop[i, j] is the
+    first location that route drives to, so path() expands a leg into the
+    addresses a driver passes through.
+    """
+
+    __slots__ = ('direct', 'distances', 'next_hop')
+
+    def __init__(self, direct, distances, next_hop):
+        """
+        Args:
+            direct (numpy.ndarray or PyDistanceMatrix): Distances as given in the distance table
+            distances (numpy.ndarray or PyDistanceMatrix): Shortest route lengths
+            next_hop (numpy.ndarray or PyDistanceMatrix): First location on each shortest route
+        """
+        self.direct = direct
+        self.distances = distances
+        self.next_hop = next_hop
+
+    def __len__(self):
+        return len(self.distances)
+
+    def path(self, from_location, to_location):
+        """
+        Expand a leg into the locations the truck drives through.
+
+        Returns:
+            list: Location IDs from from_location to to_location, both included
+        """
+        locations = [from_location]
+        location = from_location
+        while location != to_location:
+            location = int(self.next_hop[location, to_location])
+            locations.append(location)
+        return locations
+
+    def waypoints(self, from_location, to_location):
+        """Get the locations a leg passes through between its two ends (empty for a direct leg)."""
+        return self.path(from_location, to_location)[1:-1]
+
+    def shortcut_count(self):
+        """Count the location pairs whose shortest route is shorter than their direct distance."""
+        size = len(self.distances)
+        if np is not None and isinstance(self.distances, np.ndarray):
+            return int(np.count_nonzero(np.triu(np.asarray(self.direct) - self.distances > EPSILON, 1)))
+        return sum(1 for i in range(size) for j in range(i + 1, size)
+                   if self.direct[i, j] - self.distances[i, j] > EPSILON)
+
+
+def _floyd_warshall_numpy(matrix, block_rows):
+    size = len(matrix)
+    distances = np.array(matrix, dtype=np.float64)
+    next_hop = np.tile(np.arange(size, dtype=NEXT_HOP_DTYPE), (size, 1))
+    rows = min(block_rows, size)
+    candidate = np.empty((rows, size))
+    shorter = np.empty((rows, size), dtype=bool)
+    for k in range(size):
+        # Row k is final for this k (distances[k, k] is 0), so every block reads the same row
+        through = distances[k].copy()
+        for start in range(0, size, rows):
+            stop = min(start + rows, size)
+            count = stop - start
+            to_k = distances[start:stop, k]
+
+            # Adding EPSILON to the short column instead of the whole block keeps the scan to two passes
+            np.add((to_k + EPSILON)[:, None], through, out=candidate[:count])
+            np.less(candidate[:count], distances[start:stop], out=shorter[:count])
+
+            # Few pairs improve per intermediate location, so they are updated by index
+            if shorter[:count].any():
+                improved = np.flatnonzero(shorter[:count])
+                block_rows_of, columns = np.divmod(improved, size)
+                matrix_rows = block_rows_of + start
+                distances[matrix_rows, columns] = to_k[block_rows_of] + through[columns]
+                next_hop[matrix_rows, columns] = next_hop[matrix_rows, k]
+    return distances, next_hop
+
+
+def _floyd_warshall_python(matrix):
+    size = len(matrix)
+    distances = [matrix[i, j] for i in range(size) for j in range(size)]
+    next_hop = [j for _ in range(size) for j in range(size)]
+    for k in range(size):
+        through = distances[k * size:(k + 1) * size]
+        for i in range(size):
+            offset = i * size
+            to_k = distances[offset + k]
+            hop = next_hop[offset + k]
+            for j in range(size):
+                candidate = to_k + through[j]
+                if distances[offset + j] - candidate > EPSILON:
+                    distances[offset + j] = candidate
+                    next_hop[offset + j] = hop
+    return PyDistanceMatrix(size, distances), PyDistanceMatrix(size, next_hop)
+
+
+@PHASE_SECONDS.timed('shortest_paths')
+def floyd_warshall(matrix, block_rows=BLOCK_ROWS):
+    """
+    Compute shortest route lengths and next hops between every pair of locations.
+
+    With NumPy each intermediate location relaxes the whole matrix a block of
+    rows at a time with array operations, so the O(n^3) work runs as O(n)
+    passes of vectorized O(n^2) updates. The pure-Python fallback runs the
+    textbook triple loop.
+
+    Args:
+        matrix (numpy.ndarray or PyDistanceMatrix): Mirrored direct distance matrix
+        block_rows (int): Rows relaxed together per intermediate location
+
+    Returns:
+        tuple: (distances, next_hop) matrices of the same kind as the input
+    """
+    if np is not None and isinstance(matrix, np.ndarray):
+        distances, next_hop = _floyd_warshall_numpy(matrix, block_rows)
+        distances.setflags(write=False)
+        next_hop.setflags(write=False)
+        return distances, next_hop
+    return _floyd_warshall_python(matrix)
+
+
+def load_shortest_paths(filename, dtype='float64', use_numpy=True, cache=True, cache_dir=None):
+    """
+    Load the distance table and its shortest-path closure.
+
+    The closure is cached next to the compiled distance matrix, under the same
+    content hash of the CSV, and memory-mapped on later loads, so Floyd-Warshall
+    only runs again when the CSV changes.
+
+    Args:
+        filename (str): Path to the distance CSV file
+        dtype (str): NumPy dtype of the distance matrices ('float64' or 'float32')
+        use_numpy (bool): Set False to force the pure-Python fallback
+        cache (bool): Set False to always recompute and skip the compiled caches
+        cache_dir (str): Where compiled matrices are kept (default: next to the CSV)
+
+    Returns:
+        ShortestPaths: Direct distances, shortest distances and next hops
+    """
+    use_numpy = use_numpy and np is not None
+    # The CSV is hashed once here and the digest shared by the three cache paths
+    digest = file_digest(filename) if use_numpy and cache else None
+    direct = load_distance_matrix(filename, dtype, use_numpy, cache, cache_dir, digest)
+    if not use_numpy or not cache:
+        distances, next_hop = floyd_warshall(direct)
+        if use_numpy:
+            distances = distances.astype(dtype, copy=False)
+        return ShortestPaths(direct, distances, next_hop)
+
+    distances_path = cache_path(filename, dtype, cache_dir, DISTANCES_VARIANT, digest)
+    next_hop_path = cache_path(filename, NEXT_HOP_DTYPE, cache_dir, NEXT_HOP_VARIANT, digest)
+    if os.path.exists(distances_path) and os.path.exists(next_hop_path):
+        try:
+            return ShortestPaths(direct, np.load(distances_path, mmap_mode='r'),
+                                 np.load(next_hop_path, mmap_mode='r'))
+        except (OSError, ValueError):
+            pass  # Unreadable or truncated cache, rebuild it below
+
+    distances, next_hop = floyd_warshall(direct)
+    distances = distances.astype(dtype, copy=False)
+    try:
+        write_cache(distances_path, distances)
+        write_cache(next_hop_path, next_hop)
+        return ShortestPaths(direct, np.load(distances_path, mmap_mode='r'), np.load(next_hop_path, mmap_mode='r'))
+    except OSError:
+        return ShortestPaths(direct, distances, next_hop)  # Read-only location, keep the in-memory matrices
+
+
+def expand_legs(visits, paths, start_location):
+    """
+    Expand each leg of a route into the locations driven through, for driver manifests.
+
+    Args:
+        visits (list): Visit objects in delivery order
+        paths (ShortestPaths): Closure the route was planned on, or None to list direct legs
+        start_location (int): Location ID the route starts from
+
+    Returns:
+        list: (Visit, location IDs from the previous stop to the visit's location, both included) pairs
+    """
+    legs = []
+    previous_location = start_location
+    for visit in visits:
+        if paths is None:
+            path = [previous_location, visit.location] if previous_location != visit.location else [visit.location]
+        else:
+            path = paths.path(previous_location, visit.location)
+        legs.append((visit, path))
+        previous_location = visit.location
+    return legs
@@ -0,0 +1,364 @@
+import datetime
+import heapq
+
+from address_index import UnknownAddressError
+from constraints import ConstraintError
+from metrics import PHASE_SECONDS, registry
+from package_store import UNRESOLVED_ADDRESS
+from routing import DEADLINE_INSERTION, NEAREST_NEIGHBOR, deadline_insertion_route, improve_route, \
+    nearest_neighbor_route
+
+
+# Event kinds, in the order they are handled when they share a timestamp
+FLIGHT_ARRIVAL = 'flight_arrival'
+ADDRESS_CORRECTION = 'address_correction'
+ROUTE_COMPLETE = 'route_complete'
+DRIVER_HANDOFF = 'driver_handoff'
+DEPARTURE = 'departure'
+ARRIVAL = 'arrival'
+DELIVERY = 'delivery'
+
+_PRIORITY = {
+    FLIGHT_ARRIVAL: 0,
+    ADDRESS_CORRECTION: 1,
+    ROUTE_COMPLETE: 2,
+    DRIVER_HANDOFF: 3,
+    DEPARTURE: 4,
+    ARRIVAL: 5,
+    DELIVERY: 6,
+}
+
+# Time spent routing each truck load, split into the first tour (nearest neighbor or deadline insertion)
+# and the optional improvement
+ROUTE_SECONDS = registry.histogram('wgups_route_seconds', "Seconds spent routing one truck load, by stage", ('stage',))
+
+
+class Event:
+    """
+    One timestamped entry in the simulation's event log.
+    truck_id is None for fleet-wide events (flight arrivals, address corrections).
+    """
+
+    __slots__ = ('time', 'kind', 'truck_id', 'location', 'package_ids', 'driver', 'distance')
+
+    def __init__(self, time, kind, truck_id=None, location=None, package_ids=(), driver=None, distance=0.0):
+        self.time = time
+        self.kind = kind
+        self.truck_id = truck_id
+        self.location = location
+        self.package_ids = package_ids
+        self.driver = driver
+        self.distance = distance
+
+    def __repr__(self):
+        return (f"Event({self.time}, {self.kind}, truck={self.truck_id}, "
+                f"location={self.location}, packages={list(self.package_ids)})")
+
+
+class SimulatedTruck:
+    """State of one truck during the simulated day."""
+
+    __slots__ = ('id', 'packages', 'mileage', 'unimproved_mileage', 'current_location', 'departure_time',
+                 'completion_time', 'driver', 'speed', 'visits', '_next_visit', 'breakdown_time')
+
+    def __init__(self, truck_id, package_ids, speed=18, hub=0):
+        self.id = truck_id
+        self.packages = package_ids
+        self.mileage = 0.0
+        self.unimproved_mileage = 0.0  # Miles the nearest neighbor route alone would travel
+        self.current_location = hub
+        self.departure_time = None
+        self.completion_time = None  # Time of the last delivery
+        self.driver = None
+        self.speed = speed
+        self.visits = []
+        self._next_visit = 0
+        self.breakdown_time = None  # Set by rerouting when the truck breaks down
+
+
+class SimulationResult:
+    """Trucks and the time-ordered event log produced by DeliverySimulation.run."""
+
+    def __init__(self, trucks, events):
+        self.trucks = trucks
+        self.events = events
+
+    @property
+    def total_mileage(self):
+        return sum(truck.mileage for truck in self.trucks)
+
+    @property
+    def unimproved_mileage(self):
+        return sum(truck.unimproved_mileage for truck in self.trucks)
+
+    def truck(self, truck_id):
+        """Get the SimulatedTruck with the given ID, or None."""
+        for truck in self.trucks:
+            if truck.id == truck_id:
+                return truck
+        return None
+
+    def late_packages(self, package_store):
+        """
+        Find deliveries after their deadline.
+
+        Returns:
+            tuple: (late package IDs in ID order, total minutes late); undelivered packages count as late
+        """
+        late = {}
+        undelivered = set(package_store.ids)
+        for event in self.events:
+            if event.kind != DELIVERY:
+                continue
+            for package_id in event.package_ids:
+                undelivered.discard(package_id)
+                overdue = event.time.total_seconds() / 60 - package_store.lookup(package_id).deadline_minutes
+                if overdue > 0:
+                    late[package_id] = overdue
+        return sorted(late.keys() | undelivered), sum(late.values())
+
+
+def route_stops(package_ids, package_store, constraints, address_index):
+    """
+    Turn a truck load into the stop lists nearest_neighbor_route and improve_route take.
+
+    Args:
+        package_ids (list): Package IDs on the truck, in load order
+        package_store (PackageStore): Store containing package data
+        constraints (PackageConstraints): Compiled special-notes constraints
+        address_index (AddressIndex): Address lookup used for corrected addresses
+
+    Returns:
+        tuple: (stops, gated, deadlines, releases) where stops are (package ID, location) pairs,
+               gated are (package ID, location, release time, load order) for packages waiting on
+               an address correction, and deadlines/releases map package IDs to times
+
+    Raises:
+        UnknownAddressError: If a package's location cannot be resolved
+    """
+    stops = []
+    gated = []
+    deadlines = {}
+    releases = {}
+    for order, package_id in enumerate(package_ids):
+        package_data = package_store.lookup(package_id)
+        if not package_data:
+            continue
+        deadlines[package_id] = datetime.timedelta(minutes=package_data.deadline_minutes)
+
+        # Wrong-address packages can only be routed once the correction arrives
+        correction = constraints.address_correction(package_id)
+        if correction is not None:
+            correction_time, corrected_address = correction
+            gated.append((package_id, address_index.resolve(corrected_address), correction_time, order))
+            releases[package_id] = correction_time
+            continue
+
+        if package_data.address_index == UNRESOLVED_ADDRESS:
+            raise UnknownAddressError(package_data.address)
+        stops.append((package_id, package_data.address_index))
+    return stops, gated, deadlines, releases
+
+
+class DeliverySimulation:
+    """
+    Discrete-event simulation of the delivery day.
+    Events sit in a heap keyed by (time, kind priority, sequence), so every truck
+    advances concurrently in time order. Each truck only ever has its next event
+    in the heap, so the heap holds O(trucks) entries and each event costs O(log trucks).
+    """
+
+    def __init__(self, plan, package_store, constraints, distance_matrix, address_index, driver_count=2,
+                 speed=18, hub=0, improve=False, time_budget=1.0, routing=NEAREST_NEIGHBOR):
+        """
+        Set up the simulation for an assignment plan.
+
+        Args:
+            plan (AssignmentPlan): Truck loads produced by assign_packages
+            package_store (PackageStore): Store containing package data
+            constraints (PackageConstraints): Compiled special-notes constraints
+            distance_matrix (numpy.ndarray or PyDistanceMatrix): Mirrored distance matrix
+            address_index (AddressIndex): Address lookup used for corrected addresses
+            driver_count (int): Number of drivers shared by the trucks
+            speed (float): Truck speed in miles per hour
+            hub (int): Location ID of the hub
+            improve (bool): Run the 2-opt/Or-opt improvement stage on each route
+            time_budget (float): Seconds the improvement stage may spend per truck
+            routing (str): How each first tour is built, a mode from routing.ROUTING_MODES
+        """
+        self.plan = plan
+        self.package_store = package_store
+        self.constraints = constraints
+        self.distance_matrix = distance_matrix
+        self.address_index = address_index
+        self.speed = speed
+        self.hub = hub
+        self.improve = improve
+        self.time_budget = time_budget
+        self.routing = routing
+        self.trucks = [SimulatedTruck(load.truck_id, load.package_ids, speed, hub) for load in plan.loads]
+        self._trucks_by_id = {truck.id: truck for truck in self.trucks}
+        self.events = []
+        self._queue = []
+        self._sequence = 0
+        self._free_drivers = list(range(driver_count, 0, -1))
+        self._waiting_for_driver = []  # Loads ready to leave with no driver free
+        self._waiting_for_truck = {}  # Truck ID -> loads taking over that truck's driver
+
+    def schedule(self, time, kind, truck=None, load=None, package_ids=()):
+        """Push an event onto the queue."""
+        self._sequence += 1
+        heapq.heappush(self._queue, (time, _PRIORITY[kind], self._sequence, kind, truck, load, package_ids))
+
+    def _log(self, time, kind, truck=None, package_ids=(), location=None, distance=0.0):
+        self.events.append(Event(time, kind, truck.id if truck is not None else None, location,
+                                 package_ids, truck.driver if truck is not None else None, distance))
+
+    def _schedule_fleet_events(self):
+        """Queue flight arrivals and address corrections for every package on a truck."""
+        flights = {}
+        for load in self.plan.loads:
+            for package_id in load.package_ids:
+                delayed_until = self.constraints.delayed_until(package_id)
+                if delayed_until is not None:
+                    flights.setdefault(delayed_until, []).append(package_id)
+                correction = self.constraints.address_correction(package_id)
+                if correction is not None:
+                    self.schedule(correction[0], ADDRESS_CORRECTION, package_ids=(package_id,))
+        for arrival_time, package_ids in flights.items():
+            self.schedule(arrival_time, FLIGHT_ARRIVAL, package_ids=tuple(sorted(package_ids)))
+
+    def _plan_route(self, truck, departure_time):
+        """Route a truck's packages from the hub, leaving at departure_time."""
+        violations = self.constraints.check_truck_load(truck.id, truck.packages, departure_time)
+        if violations:
+            raise ConstraintError("; ".join(violations))
+
+        stops, gated, deadlines, releases = route_stops(truck.packages, self.package_store, self.constraints,
+                                                        self.address_index)
+        if self.routing == DEADLINE_INSERTION:
+            with ROUTE_SECONDS.time('deadline_insertion'):
+                visits, _ = deadline_insertion_route(self.distance_matrix, truck.current_location, departure_time,
+                                                     truck.speed, stops, gated, deadlines, releases)
+        else:
+            with ROUTE_SECONDS.time('nearest_neighbor'):
+                visits = nearest_neighbor_route(self.distance_matrix, truck.current_location, departure_time,
+                                                truck.speed, stops, gated)
+        truck.unimproved_mileage += sum(visit.distance for visit in visits)
+        if self.improve:
+            with ROUTE_SECONDS.time('improve'):
+                visits = improve_route(visits, self.distance_matrix, truck.current_location, departure_time,
+                                       truck.speed, deadlines, releases, time_budget=self.time_budget)
+        return visits
+
+    def _schedule_next_stop(self, truck, time):
+        """Queue the truck's next arrival, or its route completion after the last stop."""
+        if truck._next_visit < len(truck.visits):
+            visit = truck.visits[truck._next_visit]
+            self.schedule(visit.arrival_time, ARRIVAL, truck)
+        else:
+            self.schedule(time, ROUTE_COMPLETE, truck)
+
+    def _depart(self, truck, time):
+        truck.departure_time = time
+        for package_id in truck.packages:
+            package_data = self.package_store.lookup(package_id)
+            if package_data:
+                package_data.departure_time = time
+                package_data.status = "En route"
+        truck.visits = self._plan_route(truck, time)
+        self._log(time, DEPARTURE, truck, tuple(truck.packages), truck.current_location)
+        self._schedule_next_stop(truck, time)
+
+    def _arrive(self, truck, time):
+        visit = truck.visits[truck._next_visit]
+        truck._next_visit += 1
+        truck.mileage += visit.distance
+        truck.current_location = visit.location
+        self._log(time, ARRIVAL, truck, location=visit.location, distance=visit.distance)
+        for package_id in visit.package_ids:
+            package_data = self.package_store.lookup(package_id)
+            package_data.status = "Delivered"
+            package_data.delivery_time = time
+        self._log(time, DELIVERY, truck, tuple(visit.package_ids), visit.location)
+        self._schedule_next_stop(truck, time)
+
+    def _complete(self, truck, time):
+        truck.completion_time = time
+        self._log(time, ROUTE_COMPLETE, truck, location=truck.current_location)
+        driver = truck.driver
+        waiting = self._waiting_for_truck.pop(truck.id, [])
+        if waiting:
+            # Hand this driver to the truck that was waiting for them
+            self.schedule(time, DRIVER_HANDOFF, self._truck_for(waiting[0]), waiting[0], (driver,))
+            for load in waiting[1:]:
+                self._waiting_for_driver.append(load)
+        elif self._waiting_for_driver:
+            load = self._waiting_for_driver.pop(0)
+            self.schedule(time, DRIVER_HANDOFF, self._truck_for(load), load, (driver,))
+        else:
+            self._free_drivers.append(driver)
+
+    def _truck_for(self, load):
+        return self._trucks_by_id[load.truck_id]
+
+    def run(self):
+        """
+        Simulate the day until every truck has finished its route.
+
+        Returns:
+            SimulationResult: Trucks with mileage and times, and the event log in time order
+
+        Raises:
+            ConstraintError: If a truck load breaks a truck, delay or group constraint
+            UnknownAddressError: If a package's location cannot be resolved
+        """
+        self._schedule_fleet_events()
+        for truck, load in zip(self.trucks, self.plan.loads):
+            if load.driver_from is not None:
+                self._waiting_for_truck.setdefault(load.driver_from, []).append(load)
+            else:
+                self.schedule(load.departure_time or load.ready_time, DEPARTURE, truck, load)
+
+        while self._queue:
+            time, _, _, kind, truck, load, package_ids = heapq.heappop(self._queue)
+            if kind == FLIGHT_ARRIVAL:
+                self._log(time, kind, package_ids=package_ids, location=self.hub)
+            elif kind == ADDRESS_CORRECTION:
+                package_id = package_ids[0]
+                corrected_address = self.constraints.address_correction(package_id)[1]
+                package_data = self.package_store.lookup(package_id)
+                package_data.address = corrected_address
+                package_data.address_index = self.address_index.resolve(corrected_address)
+                self._log(time, kind, package_ids=package_ids, location=package_data.address_index)
+            elif kind == DEPARTURE:
+                if truck.driver is None:
+                    if not self._free_drivers:
+                        self._waiting_for_driver.append(load)
+                        continue
+                    truck.driver = self._free_drivers.pop()
+                self._depart(truck, time)
+            elif kind == DRIVER_HANDOFF:
+                truck.driver = package_ids[0]
+                self._log(time, kind, truck, location=self.hub)
+                self.schedule(max(time, load.ready_time), DEPARTURE, truck, load)
+            elif kind == ARRIVAL:
+                self._arrive(truck, time)
+            elif kind == ROUTE_COMPLETE:
+                self._complete(truck, time)
+
+        return SimulationResult(self.trucks, self.events)
+
+
+@PHASE_SECONDS.timed('simulate_day')
+def simulate_day(plan, package_store, constraints, distance_matrix, address_index, driver_count=2,
+                 speed=18, hub=0, improve=False, time_budget=1.0, routing=NEAREST_NEIGHBOR):
+    """
+    Run the discrete-event simulation for an assignment plan.
+
+    Returns:
+        SimulationResult: Trucks with mileage and times, and the event log in time order
+    """
+    simulation = DeliverySimulation(plan, package_store, constraints, distance_matrix, address_index,
+                                    driver_count, speed, hub, improve, time_budget, routing)
+    return simulation.run()
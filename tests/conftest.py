@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session')
+def sample_plan():
+    """The sample day's plan, built from the CSV files in the repository root."""
+    import app
+    return app.build_plan({field: os.path.join(ROOT, filename) for field, filename in app.DATA_FILES.items()})
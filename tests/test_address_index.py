@@ -0,0 +1,17 @@
+from address_index import AddressIndex
+
+
+def test_street_names_starting_like_unit_words_are_not_stripped():
+    index = AddressIndex(['4001 South 700 East', '100 Sterling Dr', '200 United Ave'])
+    assert index.find('100 Stewart St') is None
+    assert index.find('200 Unity Ave') is None
+    assert index.find('100 Sterling Drive') == 1
+
+
+def test_unit_designators_are_stripped():
+    index = AddressIndex(['4001 South 700 East', '5383 South 900 East #104', '300 State St'])
+    assert index.find('5383 S 900 E') == 1
+    assert index.find('300 State St Apt 3') == 2
+    assert index.find('300 State St Suite 200') == 2
+    assert index.find('300 State St Ste200') == 2
+    assert index.find('300 State St Unit 7') == 2
@@ -0,0 +1,53 @@
+import pytest
+
+import app
+from assignment import assign_packages
+from constraints import compile_constraints
+from hash_table import ChainingHashTable
+from package_store import PackageStore
+
+
+def check_assignment(package_store, constraints, assignment, capacity):
+    """Assert a set of truck loads keeps every special-notes constraint."""
+    assigned = [package_id for load in assignment.loads for package_id in load.package_ids]
+    assert sorted(assigned) == package_store.package_ids()  # Every package exactly once
+
+    for load in assignment.loads:
+        assert len(load.package_ids) <= capacity
+        for package_id in load.package_ids:
+            required = constraints.required_truck(package_id)
+            assert required is None or required == load.truck_id
+            delayed_until = constraints.delayed_until(package_id)
+            assert delayed_until is None or load.departure_time >= delayed_until
+            for member in constraints.group_members(package_id):
+                assert assignment.truck_of(member) == load.truck_id
+
+
+def test_sample_assignment_keeps_every_constraint(sample_plan):
+    check_assignment(sample_plan.package_store, sample_plan.constraints, sample_plan.assignment,
+                     app.app.config['FLEET']['capacity'])
+
+
+@pytest.mark.parametrize('truck_count, capacity', [(3, 14), (4, 10), (5, 8)])
+def test_tight_fleets_keep_every_constraint(sample_plan, truck_count, capacity):
+    assignment = assign_packages(sample_plan.package_store, sample_plan.constraints, sample_plan.address_index,
+                                 sample_plan.distance_matrix, truck_count=truck_count, capacity=capacity,
+                                 time_budget=0.2)
+    assert len(assignment.loads) <= truck_count
+    check_assignment(sample_plan.package_store, sample_plan.constraints, assignment, capacity)
+
+
+def test_same_stop_bundle_is_split_when_no_truck_has_room_for_it(sample_plan):
+    # Stops of 3, 3 and 2 packages on two trucks of 4: the pair must ride one package per truck
+    package_store = PackageStore(ChainingHashTable())
+    package_id = 1
+    for location, count in ((1, 3), (2, 3), (3, 2)):
+        for _ in range(count):
+            package = package_store.add(package_id, sample_plan.address_index[location], 'EOD', 'Salt Lake City',
+                                        '84115', 1)
+            package.address_index = location
+            package_id += 1
+    constraints = compile_constraints(package_store)
+    assignment = assign_packages(package_store, constraints, sample_plan.address_index, sample_plan.distance_matrix,
+                                 truck_count=2, capacity=4, time_budget=0.05)
+    check_assignment(package_store, constraints, assignment, 4)
@@ -0,0 +1,49 @@
+import datetime
+
+import pytest
+
+from constraints import SAMPLE_ADDRESS_CORRECTIONS, _parse_time, compile_constraints
+from hash_table import ChainingHashTable
+from package_store import PackageStore
+
+
+@pytest.mark.parametrize('text, minutes', [
+    ('9:05 am', 9 * 60 + 5),
+    ('9:05am', 9 * 60 + 5),
+    ('10:20 a.m.', 10 * 60 + 20),
+    ('12:15pm', 12 * 60 + 15),
+    ('1:30 PM', 13 * 60 + 30),
+    ('12:00am', 0),
+    ('14:45', 14 * 60 + 45),
+])
+def test_parse_time(text, minutes):
+    assert _parse_time(text) == minutes
+
+
+def test_times_without_a_space_before_the_meridiem_compile():
+    package_store = PackageStore(ChainingHashTable())
+    package_store.add(1, '195 W Oakland Ave', 'EOD', 'Salt Lake City', '84115', 21,
+                      'Delayed on flight---will not arrive to depot until 9:05am')
+    package_store.add(2, '2530 S 500 E', 'EOD', 'Salt Lake City', '84106', 44,
+                      'Wrong address listed, corrected at 10:20am to 410 S State St')
+    constraints = compile_constraints(package_store)
+    assert constraints.delayed_until(1) == datetime.timedelta(hours=9, minutes=5)
+    assert constraints.address_correction(2) == (datetime.timedelta(hours=10, minutes=20), '410 S State St')
+
+
+def _package_with_bare_wrong_address_note():
+    package_store = PackageStore(ChainingHashTable())
+    package_store.add(9, '300 State St', 'EOD', 'Salt Lake City', '84103', 2, 'Wrong address listed')
+    return package_store
+
+
+def test_bare_wrong_address_note_is_reported_without_a_known_correction():
+    constraints = compile_constraints(_package_with_bare_wrong_address_note())
+    assert constraints.address_correction(9) is None
+    assert constraints.problems == ["Package 9: wrong address listed but no correction is known"]
+
+
+def test_sample_correction_applies_when_passed_in():
+    constraints = compile_constraints(_package_with_bare_wrong_address_note(), SAMPLE_ADDRESS_CORRECTIONS)
+    assert constraints.address_correction(9) == (datetime.timedelta(hours=10, minutes=20), '410 S State St')
+    assert constraints.problems == []
@@ -0,0 +1,40 @@
+import pytest
+
+
+def _brute_force(plan, truck, deadline_before):
+    store = plan.package_store
+    rows = [row for row in plan.indexes.rows_by_id()
+            if (plan.assignment.truck_of(store.ids[row]) or 0) == truck
+            and store.deadline_minutes[row] <= deadline_before]
+    return sorted(rows, key=lambda row: (store.deadline_minutes[row], store.ids[row]))
+
+
+@pytest.mark.parametrize('truck', [1, 2, 3])
+def test_deadline_query_pages_match_a_full_filter(sample_plan, truck):
+    expected = _brute_force(sample_plan, truck, 17 * 60)
+    rows, cursor = [], None
+    while True:
+        page, cursor, _ = sample_plan.indexes.query(truck=truck, deadline_before=17 * 60, cursor=cursor, limit=3)
+        rows.extend(page)
+        if cursor is None:
+            break
+    assert rows == expected
+
+
+def test_smaller_truck_index_drives_a_deadline_query(sample_plan, monkeypatch):
+    index = sample_plan.indexes
+    truck_rows = index.truck_rows(2)
+    due_rows = index.deadline_rows(17 * 60)[1]
+    assert len(truck_rows) < due_rows
+
+    tested = []
+    original_check = type(index)._check
+
+    def counting_check(self, *args):
+        check = original_check(self, *args)
+        return lambda row: tested.append(row) or check(row)
+
+    monkeypatch.setattr(type(index), '_check', counting_check)
+    rows, _, _ = index.query(truck=2, deadline_before=17 * 60, limit=100)
+    assert rows == _brute_force(sample_plan, 2, 17 * 60)
+    assert len(tested) <= len(truck_rows)
@@ -0,0 +1,38 @@
+import datetime
+
+import pytest
+
+from rerouting import RouteChange, RouteChangeConflict, apply_change
+
+
+def in_flight_package(plan):
+    """A package on a visit that is not the first of its route, with a time while its truck drives there."""
+    for truck in plan.simulation_result.trucks:
+        for previous, visit in zip(truck.visits, truck.visits[1:]):
+            if visit.arrival_time - previous.arrival_time > datetime.timedelta(minutes=2):
+                return visit.package_ids[0], visit.location, previous.arrival_time + datetime.timedelta(minutes=1)
+    raise AssertionError("No leg longer than two minutes in the sample plan")
+
+
+def test_address_change_rejects_package_on_the_leg_being_driven(sample_plan):
+    package_id, location, change_time = in_flight_package(sample_plan)
+    new_address = next(address for location_id, address in enumerate(sample_plan.address_index)
+                       if location_id not in (0, location))
+    change = RouteChange('address_change', change_time, package_id=package_id, address=new_address)
+    with pytest.raises(RouteChangeConflict):
+        apply_change(sample_plan, change)
+
+
+def test_address_change_before_departure_is_rerouted(sample_plan):
+    truck = max(sample_plan.simulation_result.trucks, key=lambda truck: truck.departure_time)
+    package_id = truck.packages[0]
+    location = sample_plan.package_store.lookup(package_id).address_index
+    new_address = next(address for location_id, address in enumerate(sample_plan.address_index)
+                       if location_id not in (0, location))
+    change = RouteChange('address_change', datetime.timedelta(hours=8, minutes=30), package_id=package_id,
+                         address=new_address)
+    new_plan, _ = apply_change(sample_plan, change)
+    assert new_plan.timeline.address_at(package_id, datetime.timedelta(hours=17)) == new_address
+    delivered_at = [visit.location for visit in new_plan.simulation_result.truck(truck.id).visits
+                    if package_id in visit.package_ids]
+    assert delivered_at == [sample_plan.address_index.resolve(new_address)]
@@ -0,0 +1,69 @@
+import datetime
+import random
+
+import pytest
+
+from routing import deadline_insertion_route, improve_route, nearest_neighbor_route
+
+START_TIME = datetime.timedelta(hours=8)
+SPEED = 18
+
+
+def route_miles(visits, distance_matrix, start_location=0):
+    """Recompute a route's mileage from the distance matrix, leg by leg."""
+    miles = 0.0
+    previous = start_location
+    for visit in visits:
+        miles += distance_matrix[previous, visit.location]
+        previous = visit.location
+    return miles
+
+
+def on_time(visits, deadlines):
+    """Package IDs a route delivers by their deadline."""
+    return {package_id for visit in visits for package_id in visit.package_ids
+            if package_id not in deadlines or visit.arrival_time <= deadlines[package_id]}
+
+
+def random_day(distance_matrix, seed, stop_count=14):
+    """One package per random stop of the sample table, a few of them due early in the day."""
+    rng = random.Random(seed)
+    locations = rng.sample(range(1, len(distance_matrix)), stop_count)
+    stops = list(enumerate(locations, start=1))
+    deadlines = {package_id: START_TIME + datetime.timedelta(minutes=rng.randrange(20, 120))
+                 for package_id, _ in stops if rng.random() < 0.4}
+    return stops, deadlines
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_improve_route_keeps_stops_miles_and_met_deadlines(sample_plan, seed):
+    distance_matrix = sample_plan.distance_matrix
+    stops, deadlines = random_day(distance_matrix, seed)
+    visits = nearest_neighbor_route(distance_matrix, 0, START_TIME, SPEED, stops)
+    improved = improve_route(visits, distance_matrix, 0, START_TIME, SPEED, deadlines=deadlines)
+
+    assert sorted((visit.location, tuple(visit.package_ids)) for visit in improved) == \
+        sorted((visit.location, tuple(visit.package_ids)) for visit in visits)
+    assert route_miles(improved, distance_matrix) <= route_miles(visits, distance_matrix) + 1e-9
+    assert sum(visit.distance for visit in improved) == pytest.approx(route_miles(improved, distance_matrix))
+    assert on_time(visits, deadlines) <= on_time(improved, deadlines)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_deadline_insertion_meets_a_tight_deadline(sample_plan, seed):
+    distance_matrix = sample_plan.distance_matrix
+    stops, _ = random_day(distance_matrix, seed)
+
+    # Nearest neighbor leaves the package on its last stop until the end; due a minute after a direct drive, it
+    # can only be on time if the route goes there first
+    nearest = nearest_neighbor_route(distance_matrix, 0, START_TIME, SPEED, stops)
+    package_id = nearest[-1].package_ids[0]
+    direct = datetime.timedelta(hours=distance_matrix[0, nearest[-1].location] / SPEED)
+    deadlines = {package_id: START_TIME + direct + datetime.timedelta(minutes=1)}
+    assert nearest[-1].arrival_time > deadlines[package_id]
+
+    visits, late = deadline_insertion_route(distance_matrix, 0, START_TIME, SPEED, stops, deadlines=deadlines)
+    assert late == []
+    assert package_id in on_time(visits, deadlines)
+    assert sorted(package for visit in visits for package in visit.package_ids) == [package for package, _ in stops]
+    assert sum(visit.distance for visit in visits) == pytest.approx(route_miles(visits, distance_matrix))
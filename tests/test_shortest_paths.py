@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+import distance_matrix
+import shortest_paths
+from conftest import ROOT
+
+DISTANCE_FILE = os.path.join(ROOT, 'WGUPS_Distance_Table.csv')
+
+
+@pytest.mark.skipif(distance_matrix.np is None, reason="compiled caches need NumPy")
+def test_load_hashes_the_csv_once(tmp_path, monkeypatch):
+    calls = []
+    original_digest = distance_matrix.file_digest
+
+    def counting_digest(filename):
+        calls.append(filename)
+        return original_digest(filename)
+
+    monkeypatch.setattr(distance_matrix, 'file_digest', counting_digest)
+    monkeypatch.setattr(shortest_paths, 'file_digest', counting_digest)
+    for _ in range(2):  # A cold load that writes the caches, then a warm one that maps them
+        calls.clear()
+        paths = shortest_paths.load_shortest_paths(DISTANCE_FILE, cache_dir=str(tmp_path))
+        assert calls == [DISTANCE_FILE]
+        assert paths.path(0, 0) == [0]
@@ -0,0 +1,48 @@
+import pytest
+
+import app
+from simulation import DELIVERY, DEPARTURE, simulate_day
+
+SAMPLE_MILEAGE = 66.80
+
+
+def rerun(plan):
+    """Simulate the sample plan's truck loads again on copies of its store and constraints."""
+    package_store = plan.package_store.copy()
+    constraints = plan.constraints.copy(package_store)
+    result = simulate_day(plan.assignment, package_store, constraints, plan.distance_matrix, plan.address_index,
+                          driver_count=app.app.config['FLEET']['driver_count'])
+    return result, package_store
+
+
+def test_sample_day_mileage(sample_plan):
+    assert sample_plan.simulation_result.total_mileage == pytest.approx(SAMPLE_MILEAGE)
+
+
+def test_simulation_reproduces_the_sample_day(sample_plan):
+    result, package_store = rerun(sample_plan)
+    assert result.total_mileage == pytest.approx(SAMPLE_MILEAGE)
+    for package_id in package_store.package_ids():
+        expected = sample_plan.package_store.lookup(package_id).delivery_time
+        assert package_store.lookup(package_id).delivery_time == expected
+
+    # The event log agrees with the delivery times written to the store
+    for event in result.events:
+        if event.kind == DELIVERY:
+            for package_id in event.package_ids:
+                assert package_store.lookup(package_id).delivery_time == event.time
+
+
+def test_no_truck_leaves_before_its_delayed_packages_arrive(sample_plan):
+    constraints = sample_plan.constraints
+    result = sample_plan.simulation_result
+    delayed_trucks = 0
+    for event in result.events:
+        if event.kind != DEPARTURE:
+            continue
+        packages = result.truck(event.truck_id).packages
+        arrivals = [constraints.delayed_until(package_id) for package_id in packages]
+        arrivals = [arrival for arrival in arrivals if arrival is not None]
+        delayed_trucks += bool(arrivals)
+        assert all(event.time >= arrival for arrival in arrivals)
+    assert delayed_trucks > 0  # The sample day has packages on the 9:05 flight
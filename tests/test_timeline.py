@@ -0,0 +1,60 @@
+import copy
+import datetime
+import threading
+
+import timeline as timeline_module
+from constraints import compile_constraints
+from package_store import PackageStore
+from simulation import Event, SimulationResult
+from timeline import build_timeline
+
+OFFSET = 40000
+
+
+def _shifted(result):
+    """The simulated day with every truck ID moved past the range of a signed short."""
+    trucks = []
+    for truck in result.trucks:
+        truck = copy.copy(truck)
+        truck.id += OFFSET
+        trucks.append(truck)
+    events = [Event(event.time, event.kind, None if event.truck_id is None else event.truck_id + OFFSET,
+                    event.location, event.package_ids, event.driver, event.distance)
+              for event in result.events]
+    return SimulationResult(trucks, events)
+
+
+def test_timeline_holds_large_truck_ids(sample_plan):
+    timeline = build_timeline(_shifted(sample_plan.simulation_result), sample_plan.package_store,
+                              sample_plan.constraints)
+    expected = sample_plan.timeline.truck_ids
+    assert list(timeline.truck_ids) == [truck_id + OFFSET if truck_id else 0 for truck_id in expected]
+
+
+def test_constraints_hold_large_required_trucks():
+    package_store = PackageStore()
+    package_store.add(1, '195 W Oakland Ave', 'EOD', 'Salt Lake City', '84115', 21, f'Can only be on truck {OFFSET}')
+    constraints = compile_constraints(package_store)
+    assert constraints.required_truck(1) == OFFSET
+
+
+def test_snapshot_cache_is_safe_across_threads(sample_plan, monkeypatch):
+    monkeypatch.setattr(timeline_module, 'SNAPSHOT_CACHE_SIZE', 2)  # Evict on nearly every miss
+    timeline = build_timeline(sample_plan.simulation_result, sample_plan.package_store, sample_plan.constraints)
+    times = [datetime.timedelta(hours=8, minutes=minute) for minute in range(0, 600, 7)]
+    expected = {query_time: bytes(timeline.snapshot(query_time)) for query_time in times}
+    errors = []
+
+    def query(offset):
+        try:
+            for query_time in times[offset:] + times[:offset]:
+                assert bytes(timeline.snapshot(query_time)) == expected[query_time]
+        except Exception as error:  # Collected here, since pytest does not see worker thread failures
+            errors.append(error)
+
+    workers = [threading.Thread(target=query, args=(offset,)) for offset in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert errors == []
@@ -0,0 +1,316 @@
+import bisect
+import datetime
+import threading
+from array import array
+from collections import OrderedDict
+
+from metrics import PHASE_SECONDS, registry
+from simulation import ARRIVAL, DELIVERY, DEPARTURE, FLIGHT_ARRIVAL, ROUTE_COMPLETE
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, snapshots fall back to a Python comparison loop
+    np = None
+
+
+# Package status codes; a package's code at time t is the number of its
+# boundaries (release, departure, delivery) that are <= t
+DELAYED = 0
+AT_HUB = 1
+EN_ROUTE = 2
+DELIVERED = 3
+
+STATUS_NAMES = ("Delayed on flight", "At the hub", "En route", "Delivered")
+
+# Times used for packages the simulation never moved
+DEFAULT_DEPARTURE_SECONDS = 8 * 3600.0
+DEFAULT_DELIVERY_SECONDS = 17 * 3600.0
+
+# Number of whole-fleet snapshots kept before the oldest is dropped
+SNAPSHOT_CACHE_SIZE = 256
+
+# Snapshot build times and cache hits, to show how often queries land on a new fleet transition
+SNAPSHOT_SECONDS = registry.histogram('wgups_snapshot_seconds', "Seconds spent building one status snapshot")
+SNAPSHOT_LOOKUPS = registry.counter('wgups_snapshot_lookups_total', "Status snapshot lookups, by cache result",
+                                    ('result',))
+
+
+def _seconds(query_time):
+    return query_time.total_seconds() if isinstance(query_time, datetime.timedelta) else float(query_time)
+
+
+class DeliveryTimeline:
+    """
+    Sorted state transitions for every package and truck, built once from the
+    simulation's event log.
+
+    Each package has three boundaries stored side by side in one flat array
+    (release from the flight, departure, delivery), so its status at any time is
+    a bisect over three values. The same boundaries sorted across the whole fleet
+    act as prefix arrays: the number of packages past each boundary at time t is
+    one bisect, and a full snapshot is computed once per distinct transition and
+    reused for every query that falls between the same two transitions.
+    """
+
+    def __init__(self, package_store, constraints):
+        """
+        Create a timeline where every package sits at the hub all day.
+
+        Args:
+            package_store (PackageStore): Store whose rows the boundaries follow
+            constraints (PackageConstraints): Compiled special-notes constraints
+        """
+        self.package_store = package_store
+        self.constraints = constraints
+        rows = len(package_store)
+        self.boundaries = array('d', [0.0, DEFAULT_DEPARTURE_SECONDS, DEFAULT_DELIVERY_SECONDS]) * rows
+        self.truck_ids = array('i', [0]) * rows
+        self._fleet_times = []  # Every boundary in the fleet, sorted
+        self._sorted_boundaries = ([], [], [])  # Release, departure and delivery times, each sorted
+        self._lock = threading.Lock()  # Guards the snapshot cache, which request threads share
+        self._snapshots = OrderedDict()
+        self._trucks = {}  # Truck ID -> (times, locations, cumulative miles, departure, completion)
+
+    def updated(self, package_store, constraints, rows, trucks=None):
+        """
+        Get a timeline with some packages' and trucks' transitions replaced.
+
+        The boundary arrays are copied whole (a memory copy), and each changed
+        boundary is moved within the sorted arrays with a bisect, so the cost
+        grows with the changed rows rather than with a rebuild of the fleet.
+        Times that no longer occur are left in the fleet transition list; they
+        only split the snapshot cache more finely.
+
+        Args:
+            package_store (PackageStore): Store the new timeline follows; rows past this timeline's are added
+            constraints (PackageConstraints): Constraints for that store
+            rows (dict): Row -> (release, departure, delivery seconds, truck ID); must cover every added row
+            trucks (dict): Truck ID -> (times, locations, cumulative miles, departure, completion) to replace
+
+        Returns:
+            DeliveryTimeline: New timeline; this one is left unchanged
+        """
+        timeline = DeliveryTimeline.__new__(DeliveryTimeline)
+        timeline.package_store = package_store
+        timeline.constraints = constraints
+        timeline.boundaries = array('d', self.boundaries)
+        timeline.truck_ids = array('i', self.truck_ids)
+        old_rows = len(self.truck_ids)
+        added = len(package_store) - old_rows
+        if added > 0:
+            timeline.boundaries.extend(array('d', [0.0, DEFAULT_DEPARTURE_SECONDS, DEFAULT_DELIVERY_SECONDS]) * added)
+            timeline.truck_ids.extend(array('i', [0]) * added)
+
+        boundaries = timeline.boundaries
+        sorted_boundaries = tuple(list(times) for times in self._sorted_boundaries)
+        fleet_times = list(self._fleet_times)
+        for row, (release, departure, delivery, truck_id) in rows.items():
+            departure = max(departure, release)
+            delivery = max(delivery, departure)
+            start = row * 3
+            for offset, seconds in enumerate((release, departure, delivery)):
+                times = sorted_boundaries[offset]
+                if row < old_rows:
+                    del times[bisect.bisect_left(times, boundaries[start + offset])]
+                bisect.insort(times, seconds)
+                boundaries[start + offset] = seconds
+                position = bisect.bisect_left(fleet_times, seconds)
+                if position == len(fleet_times) or fleet_times[position] != seconds:
+                    fleet_times.insert(position, seconds)
+            timeline.truck_ids[row] = truck_id
+
+        timeline._sorted_boundaries = sorted_boundaries
+        timeline._fleet_times = fleet_times
+        timeline._lock = threading.Lock()
+        timeline._snapshots = OrderedDict()
+        timeline._trucks = dict(self._trucks)
+        timeline._trucks.update(trucks or {})
+        return timeline
+
+    def status_code(self, package_id, query_time):
+        """
+        Get a package's status code at a time.
+
+        Args:
+            package_id (int): Package ID
+            query_time (datetime.timedelta or float): Time, or seconds after midnight
+
+        Returns:
+            int: DELAYED, AT_HUB, EN_ROUTE or DELIVERED, or None if the package is unknown
+        """
+        row = self.package_store.row_of(package_id)
+        if row is None:
+            return None
+        start = row * 3
+        return bisect.bisect_right(self.boundaries, _seconds(query_time), start, start + 3) - start
+
+    def delivery_time(self, row):
+        """Get the time a package row is delivered."""
+        return datetime.timedelta(seconds=self.boundaries[row * 3 + 2])
+
+    def describe(self, row, code):
+        """Format a status code the way the CLI and API display it."""
+        if code == DELIVERED:
+            return f"Delivered at {self.delivery_time(row)}"
+        return STATUS_NAMES[code]
+
+    def status_at(self, package_id, query_time):
+        """
+        Get a package's status text at a time.
+
+        Returns:
+            str: "Delayed on flight", "At the hub", "En route" or "Delivered at H:MM:SS",
+                 or None if the package is unknown
+        """
+        code = self.status_code(package_id, query_time)
+        if code is None:
+            return None
+        return self.describe(self.package_store.row_of(package_id), code)
+
+    def address_at(self, package_id, query_time):
+        """Get the address a package is going to at a time (listed before a correction, corrected after)."""
+        package = self.package_store.lookup(package_id)
+        return self.constraints.delivery_address_at(package_id, query_time, package.address)
+
+    def transition(self, query_time):
+        """
+        Get the number of fleet transitions at or before a time.
+        Times with the same number have the same status for every package.
+        """
+        return bisect.bisect_right(self._fleet_times, _seconds(query_time))
+
+    def snapshot(self, query_time):
+        """
+        Get every package's status code at a time.
+
+        Returns:
+            sequence: Status codes indexed by package row (shared, do not modify)
+        """
+        seconds = _seconds(query_time)
+        position = self.transition(seconds)
+        with self._lock:
+            codes = self._snapshots.get(position)
+        if codes is not None:
+            SNAPSHOT_LOOKUPS.inc('hit')
+        else:
+            SNAPSHOT_LOOKUPS.inc('miss')
+            with SNAPSHOT_SECONDS.time():
+                if np is not None:
+                    bounds = np.frombuffer(self.boundaries, dtype=np.float64).reshape(-1, 3)
+                    codes = (bounds <= seconds).sum(axis=1, dtype=np.int8)
+                    codes.setflags(write=False)
+                else:
+                    bounds = self.boundaries
+                    codes = bytes((bounds[i] <= seconds) + (bounds[i + 1] <= seconds) + (bounds[i + 2] <= seconds)
+                                  for i in range(0, len(bounds), 3))
+            with self._lock:
+                if len(self._snapshots) >= SNAPSHOT_CACHE_SIZE:
+                    self._snapshots.popitem(last=False)
+                self._snapshots[position] = codes
+        return codes
+
+    def status_counts(self, query_time):
+        """
+        Count packages in each status at a time from the sorted boundary arrays.
+
+        Returns:
+            dict: Status name -> number of packages
+        """
+        seconds = _seconds(query_time)
+        released, departed, delivered = (bisect.bisect_right(times, seconds) for times in self._sorted_boundaries)
+        return {
+            STATUS_NAMES[DELAYED]: len(self.package_store) - released,
+            STATUS_NAMES[AT_HUB]: released - departed,
+            STATUS_NAMES[EN_ROUTE]: departed - delivered,
+            STATUS_NAMES[DELIVERED]: delivered,
+        }
+
+    def truck_state(self, truck_id, query_time):
+        """
+        Get where a truck is and how far it has driven at a time.
+
+        Returns:
+            dict: status, location (last stop reached) and mileage so far, or None for an unknown truck
+        """
+        timeline = self._trucks.get(truck_id)
+        if timeline is None:
+            return None
+        times, locations, miles, departure, completion = timeline
+        seconds = _seconds(query_time)
+        stop = bisect.bisect_right(times, seconds) - 1
+        if departure is None or seconds < departure:
+            status = "At the hub"
+        elif completion is not None and seconds >= completion:
+            status = "Route complete"
+        else:
+            status = "En route"
+        return {
+            'status': status,
+            'location': locations[stop],
+            'mileage': miles[stop],
+        }
+
+
+@PHASE_SECONDS.timed('build_timeline')
+def build_timeline(simulation_result, package_store, constraints, hub=0):
+    """
+    Build the delivery timeline from a simulation's event log.
+
+    Args:
+        simulation_result (SimulationResult): Result of simulate_day
+        package_store (PackageStore): Store containing package data
+        constraints (PackageConstraints): Compiled special-notes constraints
+        hub (int): Location ID of the hub
+
+    Returns:
+        DeliveryTimeline: Timeline ready for status queries
+    """
+    timeline = DeliveryTimeline(package_store, constraints)
+    boundaries = timeline.boundaries
+    row_of = package_store.row_of
+
+    # Delayed packages that never left on a truck still wait for their flight
+    for package in package_store:
+        delayed_until = constraints.delayed_until(package.id)
+        if delayed_until is not None:
+            boundaries[package.row * 3] = delayed_until.total_seconds()
+
+    trucks = {}
+    for truck in simulation_result.trucks:
+        trucks[truck.id] = ([0.0], [hub], [0.0], None, None)
+
+    for event in simulation_result.events:
+        seconds = event.time.total_seconds()
+        if event.kind == FLIGHT_ARRIVAL:
+            for package_id in event.package_ids:
+                boundaries[row_of(package_id) * 3] = seconds
+        elif event.kind == DEPARTURE:
+            for package_id in event.package_ids:
+                row = row_of(package_id)
+                boundaries[row * 3 + 1] = seconds
+                timeline.truck_ids[row] = event.truck_id
+            times, locations, miles, _, completion = trucks[event.truck_id]
+            trucks[event.truck_id] = (times, locations, miles, seconds, completion)
+        elif event.kind == DELIVERY:
+            for package_id in event.package_ids:
+                boundaries[row_of(package_id) * 3 + 2] = seconds
+        elif event.kind == ARRIVAL:
+            times, locations, miles, _, _ = trucks[event.truck_id]
+            times.append(seconds)
+            locations.append(event.location)
+            miles.append(miles[-1] + event.distance)
+        elif event.kind == ROUTE_COMPLETE:
+            times, locations, miles, departure, _ = trucks[event.truck_id]
+            trucks[event.truck_id] = (times, locations, miles, departure, seconds)
+    timeline._trucks = trucks
+
+    # Keep every package's boundaries non-decreasing so a bisect gives its status
+    for start in range(0, len(boundaries), 3):
+        if boundaries[start + 1] < boundaries[start]:
+            boundaries[start + 1] = boundaries[start]
+        if boundaries[start + 2] < boundaries[start + 1]:
+            boundaries[start + 2] = boundaries[start + 1]
+
+    timeline._sorted_boundaries = tuple(sorted(boundaries[offset::3]) for offset in range(3))
+    timeline._fleet_times = sorted(set(boundaries))
+    return timeline
@@ -1,4 +1,5 @@
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
+import axios from 'axios';
 import {
   Card,
   CardContent,
@@ -23,6 +24,12 @@ const FileUpload = () => {
   });
   const [uploadStatus, setUploadStatus] = useState({});
   const [uploading, setUploading] = useState(false);
+  const [job, setJob] = useState(null);
+  const [error, setError] = useState(null);
+  const pollTimer = useRef(null);
+
+  // Stop polling if the component goes away mid-job
+  useEffect(() => () => clearTimeout(pollTimer.current), []);
 
   const fileTypes = [
     { key: 'packages', label: 'Package Data (WGUPS_Package_File.csv)', accept: '.csv' },
@@ -32,7 +39,7 @@ const FileUpload = () => {
 
   const handleFileSelect = (fileType, event) => {
     const file = event.target.files[0];
-    if (file && file.type === 'text/csv') {
+    if (file && (file.type === 'text/csv' || file.name.toLowerCase().endsWith('.csv'))) {
       setFiles(prev => ({
         ...prev,
         [fileType]: file
@@ -49,35 +56,50 @@ const FileUpload = () => {
     }
   };
 
+  const markAll = (status) => {
+    setUploadStatus(Object.fromEntries(Object.keys(files).map(key => [key, status])));
+  };
+
+  const pollJob = async (statusUrl) => {
+    try {
+      const response = await axios.get(`http://localhost:5000${statusUrl}`);
+      setJob(response.data);
+      if (response.data.state === 'succeeded') {
+        markAll('success');
+        setUploading(false);
+      } else if (response.data.state === 'failed') {
+        markAll('selected');
+        setError(`Processing failed: ${response.data.error}`);
+        setUploading(false);
+      } else {
+        pollTimer.current = setTimeout(() => pollJob(statusUrl), 500);
+      }
+    } catch (err) {
+      markAll('selected');
+      setError('Lost contact with the server while processing. Please check that the Flask server is running.');
+      setUploading(false);
+    }
+  };
+
   const handleUpload = async () => {
     setUploading(true);
-    
-    // Simulate file upload process
-    const fileKeys = Object.keys(files);
-    for (let i = 0; i < fileKeys.length; i++) {
-      const key = fileKeys[i];
-      if (files[key]) {
-        setUploadStatus(prev => ({
-          ...prev,
-          [key]: 'uploading'
-        }));
-        
-        // Simulate upload delay
-        await new Promise(resolve => setTimeout(resolve, 1500));
-        
-        setUploadStatus(prev => ({
-          ...prev,
-          [key]: 'success'
-        }));
-      }
+    setError(null);
+    setJob(null);
+    markAll('uploading');
+
+    const formData = new FormData();
+    Object.entries(files).forEach(([key, file]) => formData.append(key, file));
+
+    try {
+      // The server answers as soon as the files are saved; routing runs in a background job
+      const response = await axios.post('http://localhost:5000/api/upload', formData);
+      setJob(response.data.job);
+      pollJob(response.data.status_url);
+    } catch (err) {
+      markAll('selected');
+      setError(err.response?.data?.error || 'Upload failed. Please check that the Flask server is running.');
+      setUploading(false);
     }
-    
-    setUploading(false);
-    
-    // In a real implementation, you would:
-    // 1. Upload files to the server
-    // 2. Trigger reinitialization of the routing algorithm
-    // 3. Update the UI to reflect new data
   };
 
   const getStatusIcon = (status) => {
@@ -101,7 +123,7 @@ const FileUpload = () => {
       case 'uploading':
         return 'Uploading...';
       case 'success':
-        return 'Upload successful';
+        return 'Uploaded and processed';
       case 'error':
         return 'Error: Please select a valid CSV file';
       default:
@@ -170,23 +192,26 @@ const FileUpload = () => {
           </Button>
         </Box>
 
-        {uploading && (
+        {job && job.state !== 'succeeded' && job.state !== 'failed' && (
           <Box mt={2}>
+            <LinearProgress variant="determinate" value={job.progress * 100} sx={{ mb: 1 }} />
             <Typography variant="body2" color="textSecondary" textAlign="center">
-              Processing files and updating routing data...
+              {job.phase} ({Math.round(job.progress * 100)}%). The current routing plan is served until this finishes.
             </Typography>
           </Box>
         )}
 
-        <Alert severity="warning" sx={{ mt: 3 }}>
-          <Typography variant="body2">
-            <strong>Note:</strong> This is a demo interface. In a production environment, uploading new files would:
-            <br />• Validate file formats and data integrity
-            <br />• Update the database with new package and route information
-            <br />• Reinitialize the routing algorithm with the new data
-            <br />• Refresh all displayed information
-          </Typography>
-        </Alert>
+        {job && job.state === 'succeeded' && (
+          <Alert severity="success" sx={{ mt: 3 }}>
+            New routing plan is live: {job.result.packages} packages, {job.result.total_mileage.toFixed(1)} miles total.
+          </Alert>
+        )}
+
+        {error && (
+          <Alert severity="error" sx={{ mt: 3 }}>
+            {error}
+          </Alert>
+        )}
       </CardContent>
     </Card>
   );
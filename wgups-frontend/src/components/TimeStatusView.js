@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import {
   Card,
   CardContent,
@@ -20,7 +20,7 @@ import {
   AccordionSummary,
   AccordionDetails
 } from '@mui/material';
-import { Timeline, ExpandMore, LocalShipping } from '@mui/icons-material';
+import { Timeline, ExpandMore, LocalShipping, PlayArrow, Stop } from '@mui/icons-material';
 import axios from 'axios';
 
 const TimeStatusView = () => {
@@ -28,6 +28,11 @@ const TimeStatusView = () => {
   const [packagesData, setPackagesData] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const [live, setLive] = useState(false);
+  const streamRef = useRef(null);
+
+  // Close the live stream when the view unmounts
+  useEffect(() => () => streamRef.current && streamRef.current.close(), []);
 
   // Preset times for required screenshots
   const presetTimes = [
@@ -36,6 +41,40 @@ const TimeStatusView = () => {
     { label: 'Between 12:03-1:12 PM', time: '12:30' }
   ];
 
+  const clock = (minutes) => `${Math.floor(minutes / 60)}:${String(minutes % 60).padStart(2, '0')}`;
+  const clockSeconds = (seconds) => `${clock(Math.floor(seconds / 60))}:${String(seconds % 60).padStart(2, '0')}`;
+
+  // The columnar payload lists each field once per response instead of once per package;
+  // rebuild the package objects the tables render from it
+  const fromColumns = (data) => {
+    const { columns, status_names: statusNames } = data;
+    return {
+      query_time: data.query_time,
+      status_counts: data.status_counts,
+      packages: columns.id.map((id, i) => {
+        const status = statusNames[columns.status[i]];
+        const deliverySeconds = columns.delivery_seconds[i];
+        const deadline = columns.deadline_minutes[i];
+        return {
+          id,
+          delivery_address: columns.delivery_address[i],
+          delivery_deadline: deadline === 17 * 60 ? 'EOD' : formatTime(clock(deadline)),
+          truck_number: columns.truck_number[i],
+          delivery_status: status === 'Delivered' ? `Delivered at ${clockSeconds(deliverySeconds)}` : status,
+          delivery_time: deliverySeconds === null ? null : clockSeconds(deliverySeconds),
+          city: columns.city[i],
+          zip: columns.zip[i],
+          weight: columns.weight[i]
+        };
+      })
+    };
+  };
+
+  const fetchStatus = async (time) => {
+    const response = await axios.get(`http://localhost:5000/api/packages/status?time=${time}&format=columns`);
+    return fromColumns(response.data);
+  };
+
   const handleSearch = async (time = queryTime) => {
     if (!time) {
       setError('Please select a time');
@@ -46,8 +85,7 @@ const TimeStatusView = () => {
       setLoading(true);
       setError(null);
 
-      const response = await axios.get(`http://localhost:5000/api/packages/status?time=${time}`);
-      setPackagesData(response.data);
+      setPackagesData(await fetchStatus(time));
       setQueryTime(time);
 
     } catch (err) {
@@ -58,6 +96,64 @@ const TimeStatusView = () => {
     }
   };
 
+  const stopLive = () => {
+    if (streamRef.current) {
+      streamRef.current.close();
+      streamRef.current = null;
+    }
+    setLive(false);
+  };
+
+  const applyDelta = (data, delta) => {
+    const changed = new Map(delta.changes.map(change => [change.id, change.status]));
+    return {
+      ...data,
+      query_time: delta.time,
+      packages: changed.size === 0 ? data.packages : data.packages.map(pkg =>
+        changed.has(pkg.id) ? { ...pkg, delivery_status: changed.get(pkg.id) } : pkg)
+    };
+  };
+
+  // Replay the day from the server's event stream: one snapshot, then only the packages that change
+  const startLive = () => {
+    stopLive();
+    setError(null);
+    const start = queryTime || '08:00';
+    const source = new EventSource(`http://localhost:5000/api/stream?start=${start}&speed=300`);
+    streamRef.current = source;
+    setLive(true);
+
+    // Deltas that arrive while the full rows for the snapshot are loading are applied once they are in
+    let pending = [];
+    let loaded = false;
+    source.addEventListener('snapshot', async (event) => {
+      const snapshot = JSON.parse(event.data);
+      loaded = false;
+      pending = [];
+      try {
+        const data = await fetchStatus(snapshot.time.slice(0, -3));
+        setPackagesData(pending.reduce(applyDelta, data));
+        loaded = true;
+      } catch (err) {
+        setError(err.response?.data?.error || 'Failed to fetch packages data');
+        stopLive();
+      }
+    });
+    source.addEventListener('delta', (event) => {
+      const delta = JSON.parse(event.data);
+      if (loaded) {
+        setPackagesData(previous => applyDelta(previous, delta));
+      } else {
+        pending.push(delta);
+      }
+    });
+    source.addEventListener('end', stopLive);
+    source.onerror = () => {
+      setError('Live stream disconnected');
+      stopLive();
+    };
+  };
+
   const getStatusColor = (status) => {
     if (!status) return 'default';
     if (status === 'At the hub') return 'default';
@@ -112,12 +208,22 @@ const TimeStatusView = () => {
               fullWidth
               variant="contained"
               onClick={() => handleSearch()}
-              disabled={loading}
+              disabled={loading || live}
               sx={{ height: '56px' }}
             >
               {loading ? 'Loading...' : 'View Status at Time'}
             </Button>
           </Grid>
+          <Grid item xs={12}>
+            <Button
+              variant="outlined"
+              color={live ? 'error' : 'primary'}
+              startIcon={live ? <Stop /> : <PlayArrow />}
+              onClick={live ? stopLive : startLive}
+            >
+              {live ? 'Stop Live Replay' : 'Play Day Live (from query time)'}
+            </Button>
+          </Grid>
         </Grid>
 
         {/* Preset time buttons for screenshots */}
@@ -132,7 +238,7 @@ const TimeStatusView = () => {
                   variant="outlined"
                   size="small"
                   onClick={() => handleSearch(preset.time)}
-                  disabled={loading}
+                  disabled={loading || live}
                 >
                   {preset.label}
                 </Button>